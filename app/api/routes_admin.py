@@ -0,0 +1,52 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.core import profiler
+from app.core.config import get_settings
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Admin endpoints need the X-Admin-Token header to match ADMIN_TOKEN."""
+    expected = get_settings().admin_token
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+# ---------- Profiling ----------
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_process(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    include_idle: bool = False,
+):
+    """
+    Sample every thread's stack for `seconds` and return collapsed stacks
+    (`thread;outer;...;inner count` per line, ready for flamegraph.pl or speedscope).
+    """
+    if seconds > get_settings().profile_max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {get_settings().profile_max_seconds}")
+    if profiler.profile_running():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+    result = await profiler.profile(seconds, interval_ms / 1000, include_idle)
+    return PlainTextResponse(
+        result.collapsed(), headers={"X-Profile-Samples": str(result.samples)}
+    )
+
+
+@router.get("/loop-stalls")
+def loop_stalls():
+    """Recent event-loop stalls above LOOP_LAG_THRESHOLD_MS, with the loop's stack while it was blocked."""
+    monitor = profiler.loop_monitor
+    return {
+        "running": monitor.running,
+        "threshold_ms": monitor.threshold * 1000,
+        "stalls": list(monitor.stalls),
+    }
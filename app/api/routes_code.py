@@ -1,23 +1,75 @@
 # app/api/routes_code.py
 import os
+import re
+import json
 import uuid
 import shutil
 import tempfile
 import subprocess
-from typing import List, Optional
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Literal, Optional
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
+from app.core import metrics
+from app.core.config import get_settings
+from app.services import code_executor, file_store, test_runner
+from app.services.snapshots import SnapshotNotFound
+from app.services.workspaces import QuotaExceeded, Workspace, WorkspaceRegistry
+
 # Router
 router = APIRouter()
 
-# Workspace: all file operations are constrained to this directory.
-BASE_DIR = Path(__file__).resolve().parents[2]  # up two levels to 'app'
-WORKSPACE = BASE_DIR / "workspace"
+# Workspace: all file operations are constrained to the caller's workspace directory.
+WORKSPACE = get_settings().workspace_path  # shared workspace for requests without a user
 WORKSPACE.mkdir(parents=True, exist_ok=True)
 
+# Per-user workspaces, sharded as <user_workspaces>/ab/cd/<sha256(user id)>
+USER_WORKSPACES = get_settings().user_workspaces_path
+
+# Snapshot history: compressed content-addressed blobs + manifests
+SNAPSHOTS = get_settings().snapshots_path
+
+# Per-workspace server state such as test durations from earlier /test runs
+STATE_DIR = get_settings().state_path
+
+# Each workspace bundles its file index (kept current by the endpoints below and
+# a watcher), trigram search index, symbol index, snapshots and quota. Started
+# and closed by the app lifespan in app/main.py.
+workspaces = WorkspaceRegistry(WORKSPACE, USER_WORKSPACES, STATE_DIR, SNAPSHOTS)
+
+# Workspace of the request being handled, for code outside this router (voice navigation)
+current_workspace: ContextVar[Optional[Workspace]] = ContextVar("current_workspace", default=None)
+
+# Bootstrap script that runs user code under the profiler (see /profile)
+PROFILE_RUNNER = str(Path(code_executor.__file__).with_name("profile_runner.py"))
+
+# Bootstrap script that runs an entry script from its staged bytecode (see /run)
+PYC_RUNNER = str(Path(code_executor.__file__).with_name("pyc_runner.py"))
+
+
+def get_workspace(request: Request) -> Iterator[Workspace]:
+    """
+    Dependency resolving the caller's workspace: the signed-in user's own
+    (`request.state.user_id`, set from the verified session cookie), or the
+    shared workspace for anonymous requests. Nothing the client sends
+    otherwise picks the workspace. It stays pinned until the response
+    (streams included) is finished, so eviction cannot close it mid-request.
+    """
+    ws = workspaces.acquire(getattr(request.state, "user_id", None))
+    try:
+        yield ws
+    finally:
+        workspaces.release(ws)
+
 
 # ---------- Pydantic models ----------
 class FileCreate(BaseModel):
@@ -29,22 +81,66 @@ class FileUpdate(BaseModel):
     content: str
 
 
+class FileOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    filename: str
+    content: Optional[str] = None  # required for create/update
+
+
+class FileBatch(BaseModel):
+    operations: List[FileOperation]
+
+
+class SnapshotCreate(BaseModel):
+    message: str = ""
+
+
+class SyntaxErrorInfo(BaseModel):
+    filename: str  # relative to the script's directory
+    line: int
+    col: int  # 0-based
+    end_line: Optional[int] = None
+    end_col: Optional[int] = None
+    message: str
+    text: Optional[str] = None
+
+
 class RunResult(BaseModel):
     stdout: str
     stderr: str
     returncode: int
     timed_out: bool = False
+    syntax_error: Optional[SyntaxErrorInfo] = None  # set when the code was rejected before running
+
+
+class ProfileEntry(BaseModel):
+    function: str
+    filename: str
+    line: int
+    calls: int
+    primitive_calls: int
+    self_time: float
+    cumulative_time: float
+
+
+class ProfileResult(RunResult):
+    wall_time: Optional[float] = None
+    total_calls: int = 0
+    by_cumulative: List[ProfileEntry] = []
+    by_self: List[ProfileEntry] = []
+    collapsed: Optional[str] = None  # flame-graph "frame;frame count" lines
+    overhead: dict = {}
 
 
 # ---------- Helpers ----------
-def _resolve_safe_path(rel_path: str) -> Path:
+def _resolve_safe_path(rel_path: str, root: Path = WORKSPACE) -> Path:
     """
-    Resolve a user-supplied relative path to an absolute Path inside WORKSPACE.
-    Prevents path traversal attacks by ensuring the final path is contained in WORKSPACE.
+    Resolve a user-supplied relative path to an absolute Path inside `root` (a workspace).
+    Prevents path traversal attacks by ensuring the final path is contained in `root`.
     """
-    requested = (WORKSPACE / rel_path).resolve()
+    requested = (root / rel_path).resolve()
     try:
-        requested.relative_to(WORKSPACE.resolve())
+        requested.relative_to(root.resolve())
     except Exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid filename/path")
     return requested
@@ -55,85 +151,324 @@ def _ensure_parent_dir(path: Path):
         path.parent.mkdir(parents=True, exist_ok=True)
 
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+
+def _file_etag(ws: Workspace, rel: str, path: Path) -> str:
+    """Strong ETag from the indexed content hash, re-indexing if the file changed on disk."""
+    entry = ws.index.get(rel)
+    st = path.stat()
+    if entry is None or (entry.size, entry.mtime_ns) != (st.st_size, st.st_mtime_ns):
+        entry = ws.index.refresh(rel)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return f'"{entry.sha256[:32]}"'
+
+
+@contextmanager
+def _quota_checked(ws: Workspace, changes):
+    """
+    Check the quota for `changes` and hold the workspace's write lock while
+    the block applies them and refreshes the index.
+    """
+    with ws.write_lock:
+        try:
+            ws.check_quota(changes)
+        except QuotaExceeded as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        yield
+
+
 # ---------- File endpoints ----------
 @router.get("/files", response_model=List[str])
-def list_files():
-    """Return list of files under workspace (relative paths)."""
-    files = []
-    for root, _, filenames in os.walk(WORKSPACE):
-        for f in filenames:
-            full = Path(root) / f
-            rel = full.relative_to(WORKSPACE)
-            files.append(str(rel))
+def list_files(
+    request: Request,
+    response: Response,
+    prefix: str = "",
+    glob: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    ws: Workspace = Depends(get_workspace),
+):
+    """
+    Return list of files under workspace (relative paths), served from the index.
+    Optional `prefix` / `glob` filters and `offset` / `limit` pagination; the
+    total match count is in the X-Total-Count header. The ETag changes whenever
+    any file does, so clients can poll with If-None-Match and get a 304.
+    """
+    etag = ws.index.etag
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    with metrics.FILE_IO_SECONDS.labels("list").time():
+        files, total = ws.index.list(prefix=prefix, pattern=glob, offset=max(0, offset), limit=limit)
+    response.headers["ETag"] = etag
+    response.headers["X-Total-Count"] = str(total)
     return files
 
 
+@router.get("/usage")
+def workspace_usage(ws: Workspace = Depends(get_workspace)):
+    """Bytes and files used by the caller's workspace, with its quotas."""
+    return ws.usage()
+
+
 @router.get("/files/{file_path:path}")
-def read_file(file_path: str):
-    """Read file contents. `file_path` is relative to workspace."""
-    path = _resolve_safe_path(file_path)
+def read_file(
+    file_path: str, request: Request, response: Response, raw: bool = False, ws: Workspace = Depends(get_workspace)
+):
+    """
+    Read file contents. `file_path` is relative to workspace.
+    Responses carry a strong ETag (content hash); a matching If-None-Match gets
+    a 304 without the file being read. With `raw=true` the bytes are served
+    directly as a file response, which honours Range requests.
+    """
+    path = _resolve_safe_path(file_path, ws.root)
     if not path.exists() or not path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
-    return {"filename": str(path.relative_to(WORKSPACE)), "content": path.read_text(encoding="utf-8")}
+    rel = str(path.relative_to(ws.root))
+    etag = _file_etag(ws, rel, path)
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    if raw:
+        return FileResponse(path, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    with metrics.FILE_IO_SECONDS.labels("read").time():
+        content = path.read_text(encoding="utf-8")
+    return {"filename": rel, "content": content}
 
 
 @router.post("/files", status_code=status.HTTP_201_CREATED)
-def create_file(payload: FileCreate):
+def create_file(payload: FileCreate, ws: Workspace = Depends(get_workspace)):
     """
     Create a new file. If file exists, return 409 (conflict) to avoid accidental overwrite.
     Use update endpoint to modify.
     """
-    path = _resolve_safe_path(payload.filename)
+    path = _resolve_safe_path(payload.filename, ws.root)
     if path.exists():
         raise HTTPException(status_code=409, detail="File already exists")
-    _ensure_parent_dir(path)
-    path.write_text(payload.content, encoding="utf-8")
-    return {"filename": str(path.relative_to(WORKSPACE)), "detail": "created"}
+    rel = str(path.relative_to(ws.root))
+    data = payload.content.encode("utf-8")
+    with _quota_checked(ws, [(rel, len(data))]):
+        _ensure_parent_dir(path)
+        with metrics.FILE_IO_SECONDS.labels("write").time():
+            file_store.atomic_write(path, data)
+        ws.index.refresh(rel)
+    return {"filename": rel, "detail": "created"}
 
 
 @router.put("/files/{file_path:path}")
-def update_file(file_path: str, payload: FileUpdate):
+def update_file(file_path: str, payload: FileUpdate, ws: Workspace = Depends(get_workspace)):
     """Create or overwrite the file at path with provided content."""
-    path = _resolve_safe_path(file_path)
-    _ensure_parent_dir(path)
-    path.write_text(payload.content, encoding="utf-8")
-    return {"filename": str(path.relative_to(WORKSPACE)), "detail": "written"}
+    path = _resolve_safe_path(file_path, ws.root)
+    rel = str(path.relative_to(ws.root))
+    data = payload.content.encode("utf-8")
+    with _quota_checked(ws, [(rel, len(data))]):
+        _ensure_parent_dir(path)
+        with metrics.FILE_IO_SECONDS.labels("write").time():
+            file_store.atomic_write(path, data)
+        ws.index.refresh(rel)
+    return {"filename": rel, "detail": "written"}
 
 
 @router.delete("/files/{file_path:path}")
-def delete_file(file_path: str):
-    path = _resolve_safe_path(file_path)
+def delete_file(file_path: str, ws: Workspace = Depends(get_workspace)):
+    path = _resolve_safe_path(file_path, ws.root)
     if not path.exists():
         raise HTTPException(status_code=404, detail="File not found")
-    path.unlink()
+    with metrics.FILE_IO_SECONDS.labels("delete").time():
+        path.unlink()
+    ws.index.remove(str(path.relative_to(ws.root)))
     # if empty parent directories remain, optionally remove them (here we keep them)
-    return {"filename": str(path.relative_to(WORKSPACE)), "detail": "deleted"}
+    return {"filename": str(path.relative_to(ws.root)), "detail": "deleted"}
+
+
+@router.post("/files/batch")
+def batch_files(payload: FileBatch, ws: Workspace = Depends(get_workspace)):
+    """
+    Apply many creates/updates/deletes in one request ("save all", refactors).
+    All operations are validated before anything is written; each file is then
+    replaced atomically and touched directories are synced once for the batch.
+    """
+    writes, deletes, results, changes = [], [], [], []
+    seen = set()
+    for op in payload.operations:
+        path = _resolve_safe_path(op.filename, ws.root)
+        rel = str(path.relative_to(ws.root))
+        if path in seen:
+            raise HTTPException(status_code=400, detail=f"Duplicate operation for {rel}")
+        seen.add(path)
+        if op.op == "delete":
+            if not path.is_file():
+                raise HTTPException(status_code=404, detail=f"File not found: {rel}")
+            deletes.append(path)
+            changes.append((rel, None))
+        else:
+            if op.content is None:
+                raise HTTPException(status_code=400, detail=f"Missing content for {rel}")
+            if op.op == "create" and path.exists():
+                raise HTTPException(status_code=409, detail=f"File already exists: {rel}")
+            if path.is_dir():
+                raise HTTPException(status_code=409, detail=f"Is a directory: {rel}")
+            data = op.content.encode("utf-8")
+            writes.append((path, data))
+            changes.append((rel, len(data)))
+        results.append({"filename": rel, "detail": {"create": "created", "update": "written", "delete": "deleted"}[op.op]})
+
+    with _quota_checked(ws, changes), metrics.FILE_IO_SECONDS.labels("batch").time():
+        # the index follows each file as it changes, also when a later one fails
+        file_store.apply_batch(writes, deletes, on_applied=lambda path: ws.index.refresh(str(path.relative_to(ws.root))))
+    return {"results": results}
+
+
+@router.get("/search")
+def search_files(
+    q: str,
+    regex: bool = False,
+    case_sensitive: bool = False,
+    context: int = 2,
+    limit: int = 100,
+    prefix: str = "",
+    ws: Workspace = Depends(get_workspace),
+):
+    """
+    Search file contents across the workspace. `q` is a literal string unless
+    `regex=true`. Each match has file, 1-based line and column, the line text and
+    `context` lines before/after.
+    """
+    if not q:
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    ws.index.ensure_built()
+    try:
+        return ws.search.search(
+            q, regex=regex, case_sensitive=case_sensitive,
+            context=max(0, context), limit=max(1, limit), prefix=prefix,
+        )
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regex: {e}")
+
+
+@router.get("/symbols")
+def find_symbols(q: str, kind: Optional[str] = None, limit: int = 20, ws: Workspace = Depends(get_workspace)):
+    """
+    Look up function/class/method/variable definitions by name: exact matches
+    first, then prefix, then fuzzy. Optional `kind` filter.
+    """
+    ws.index.ensure_built()
+    return [sym._asdict() for sym in ws.symbols.lookup(q, kind=kind, limit=max(1, limit))]
+
+
+# ---------- Snapshots ----------
+def _get_snapshot(ws: Workspace, snapshot_id: str) -> dict:
+    try:
+        return ws.snapshots.get(snapshot_id)
+    except SnapshotNotFound:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+
+
+def _current_manifest(ws: Workspace) -> dict:
+    return {rel: entry.sha256 for rel, entry in ws.index.items()}
+
+
+@router.post("/snapshots", status_code=status.HTTP_201_CREATED)
+def create_snapshot(payload: Optional[SnapshotCreate] = None, ws: Workspace = Depends(get_workspace)):
+    """Record the current workspace. Only content not already stored is written."""
+    return ws.snapshots.create(ws.index.items(), message=payload.message if payload else "")
+
+
+@router.get("/snapshots")
+def list_snapshots(ws: Workspace = Depends(get_workspace)):
+    """Snapshots, newest first."""
+    return ws.snapshots.list()
+
+
+@router.get("/snapshots/{snapshot_id}")
+def get_snapshot(snapshot_id: str, ws: Workspace = Depends(get_workspace)):
+    return _get_snapshot(ws, snapshot_id)
+
+
+@router.get("/snapshots/{snapshot_id}/diff")
+def diff_snapshot(
+    snapshot_id: str, against: str = "workspace", patch: bool = False, ws: Workspace = Depends(get_workspace)
+):
+    """
+    Files added/removed/modified going from `snapshot_id` to `against`
+    (another snapshot id, or "workspace" for the current files). With
+    `patch=true` a unified diff is included for each modified file.
+    """
+    old = _get_snapshot(ws, snapshot_id)["files"]
+    new = _current_manifest(ws) if against == "workspace" else _get_snapshot(ws, against)["files"]
+    changes = ws.snapshots.diff_manifests(old, new)
+    if patch:
+        changes["patches"] = {
+            rel: ws.snapshots.unified_diff(
+                rel, old[rel], new[rel], ws.root / rel if against == "workspace" else None
+            )
+            for rel in changes["modified"]
+        }
+    return changes
+
+
+@router.post("/snapshots/{snapshot_id}/restore")
+def restore_snapshot(snapshot_id: str, delete_extra: bool = True, ws: Workspace = Depends(get_workspace)):
+    """
+    Bring the workspace back to `snapshot_id`. Only files that differ are
+    rewritten; files created since are removed unless `delete_extra=false`.
+    """
+    _get_snapshot(ws, snapshot_id)
+    writes, deletes = ws.snapshots.restore_plan(snapshot_id, _current_manifest(ws), delete_extra=delete_extra)
+    written = [str(path.relative_to(ws.root)) for path, _ in writes]
+    deleted = [str(path.relative_to(ws.root)) for path in deletes]
+    changes = [(rel, len(data)) for rel, (_, data) in zip(written, writes)] + [(rel, None) for rel in deleted]
+    with _quota_checked(ws, changes):
+        file_store.apply_batch(writes, deletes, on_applied=lambda path: ws.index.refresh(str(path.relative_to(ws.root))))
+    return {"id": snapshot_id, "written": written, "deleted": deleted}
 
 
 # ---------- Code execution (cautious) ----------
-def _run_python_file_safely(file_path: Path, timeout_seconds: int = 5) -> RunResult:
+def _run_python_file_safely(
+    file_path: Path, timeout_seconds: int = 5, project: bool = False, wrapper: Optional[List[str]] = None
+) -> RunResult:
     """
     Run a python file in a temporary isolated working directory.
     NOTE: This is NOT a full sandbox. For production, run inside a container or use
     a dedicated sandbox service. Here we:
-      - copy the file to a temp dir
-      - run `python <file>` with subprocess and a timeout
+      - compile the file (with `project`, also the local modules it imports) in this
+        process, returning syntax errors without starting python; bytecode is cached
+      - copy the sources to a temp dir, on tmpfs when available, with their .pyc files in __pycache__
+      - run `python pyc_runner.py <file>` (or `python <wrapper...> <file>`) with subprocess and a timeout
       - limit runtime with timeout and return captured stdout/stderr
     """
+    try:
+        compiled = code_executor.compile_closure(file_path, project)
+    except code_executor.CompileFailed as e:
+        stderr = "".join(traceback.format_exception_only(type(e.error), e.error))
+        return RunResult(stdout="", stderr=stderr, returncode=1, syntax_error=SyntaxErrorInfo(**e.info()))
+
     # create temporary dir per run, copy the user's file
-    temp_dir = Path(tempfile.mkdtemp(prefix="run_workspace_"))
+    temp_dir = code_executor.make_run_dir()
     try:
-        # copy only that file (preserve relative filename)
-        target = temp_dir / file_path.name
-        shutil.copy2(file_path, target)
+        if project:
+            # stage the import closure, preserving layout relative to the script's dir
+            target = code_executor.stage_project(file_path, temp_dir)
+        else:
+            # copy only that file (preserve relative filename)
+            target = temp_dir / file_path.name
+            shutil.copy2(file_path, target)
+        # the sources stay for tracebacks and __file__; python loads the bytecode
+        code_executor.stage_bytecode(temp_dir, compiled)
 
-        # Build command. Use the same Python interpreter running this process.
-        cmd = [shutil.which("python") or "python", str(target)]
+        # Build command. Use the same Python interpreter running this process (the .pyc magic must match).
+        cmd = [sys.executable, *(wrapper or [PYC_RUNNER]), str(target)]
 
         try:
             proc = subprocess.run(
                 cmd,
-                cwd=str(temp_dir),
+                cwd=str(target.parent),
                 capture_output=True,
                 text=True,
                 timeout=timeout_seconds,
@@ -150,16 +485,35 @@ def _run_python_file_safely(file_path: Path, timeout_seconds: int = 5) -> RunRes
             pass
 
 
+async def _run_in_executor(kind: str, func, *args, **kwargs):
+    """Run blocking code execution on the threadpool, recording queue wait and run time."""
+    submitted = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        metrics.EXECUTOR_QUEUE_SECONDS.labels(kind).observe(started - submitted)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.EXECUTOR_RUN_SECONDS.labels(kind).observe(time.perf_counter() - started)
+
+    return await run_in_threadpool(job)
+
+
 @router.post("/run/{file_path:path}", response_model=RunResult)
-def run_file(file_path: str, timeout: Optional[int] = 5):
+async def run_file(
+    file_path: str, timeout: Optional[int] = None, project: bool = False, ws: Workspace = Depends(get_workspace)
+):
     """
     Execute a python file stored in the workspace.
-    Query param `timeout` (seconds) controls max execution time (default=5s).
+    Query param `timeout` (seconds) controls max execution time (default: settings.run_timeout, 5s).
+    Query param `project` also stages the workspace modules the file imports, so
+    scripts split across several files can run.
     Security notes:
       - This endpoint executes arbitrary python code. Only use in trusted/local environments.
       - For production, containerize runs, use OS resource limits, drop privileges, or use a sandbox service.
     """
-    path = _resolve_safe_path(file_path)
+    path = _resolve_safe_path(file_path, ws.root)
     if not path.exists() or not path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
 
@@ -167,5 +521,97 @@ def run_file(file_path: str, timeout: Optional[int] = 5):
     if path.suffix != ".py":
         raise HTTPException(status_code=400, detail="Only python (.py) files can be executed via this endpoint")
 
-    result = _run_python_file_safely(path, timeout_seconds=timeout)
+    result = await _run_in_executor(
+        "run", _run_python_file_safely, path, timeout_seconds=timeout or get_settings().run_timeout, project=project
+    )
     return result
+
+
+@router.post("/profile/{file_path:path}", response_model=ProfileResult)
+async def profile_file(
+    file_path: str,
+    timeout: Optional[int] = None,
+    top: int = 20,
+    collapsed: bool = False,
+    project: bool = False,
+    ws: Workspace = Depends(get_workspace),
+):
+    """
+    Execute a python file like /run, but under cProfile plus a stack sampler.
+    Returns the `top` hotspots by cumulative and self time with call counts, and
+    with `collapsed=true` the sampled stacks in flame-graph collapsed format.
+    `overhead` estimates how much of the wall time the profiler itself added.
+    """
+    path = _resolve_safe_path(file_path, ws.root)
+    if not path.exists() or not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    if path.suffix != ".py":
+        raise HTTPException(status_code=400, detail="Only python (.py) files can be profiled via this endpoint")
+
+    fd, report_path = tempfile.mkstemp(prefix="profile_", suffix=".json", dir=code_executor.ram_temp_root())
+    os.close(fd)
+    try:
+        wrapper = [PROFILE_RUNNER, "--out", report_path, "--top", str(max(1, top))]
+        result = await _run_in_executor(
+            "profile", _run_python_file_safely,
+            path, timeout_seconds=timeout or get_settings().profile_timeout, project=project, wrapper=wrapper,
+        )
+        try:
+            with open(report_path, encoding="utf-8") as fh:
+                report = json.load(fh)
+        except (OSError, ValueError):
+            # timed out or crashed before the report was written
+            report = {}
+    finally:
+        try:
+            os.unlink(report_path)
+        except OSError:
+            pass
+
+    if not collapsed:
+        report.pop("collapsed", None)
+    return ProfileResult(**result.model_dump(), **report)
+
+
+@router.post("/test")
+async def run_tests(
+    path: Optional[str] = None,
+    workers: Optional[int] = None,
+    timeout: Optional[int] = None,
+    ws: Workspace = Depends(get_workspace),
+):
+    """
+    Discover and run the workspace tests (optionally only under `path`) across
+    `workers` processes (default: settings.test_workers, else one per core). Streams newline-delimited JSON:
+    one {"type": "result"} object per test as it finishes, then a {"type": "summary"}.
+    """
+    base = _resolve_safe_path(path, ws.root) if path else ws.root
+    if not base.exists():
+        raise HTTPException(status_code=404, detail="Path not found")
+
+    def discover():
+        rel = str(base.relative_to(ws.root)) if base != ws.root else ""
+        if base.is_file():
+            rel_paths = [rel]
+        else:
+            rel_paths, _ = ws.index.list(prefix=os.path.join(rel, "") if rel else "")
+        return test_runner.discover_tests(ws.root, rel_paths)
+
+    test_ids = await run_in_threadpool(discover)
+
+    async def stream():
+        if not test_ids:
+            yield json.dumps({"type": "summary", "total": 0}) + "\n"
+            return
+        settings = get_settings()
+        events = test_runner.run_tests(
+            ws.root,
+            test_ids,
+            workers or settings.test_workers or os.cpu_count() or 1,
+            timeout or settings.test_timeout,
+            ws.test_durations,
+        )
+        async for event in events:
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
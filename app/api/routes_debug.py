@@ -0,0 +1,62 @@
+# app/api/routes_debug.py
+import json
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.api import routes_code
+from app.core.config import get_settings
+from app.services.static_analysis import analyzer
+from app.services.workspaces import Workspace
+
+# Router
+router = APIRouter()
+
+
+class SourceCheck(BaseModel):
+    code: str
+    filename: str = "main.py"  # only the name matters (e.g. __init__.py); nothing is saved
+
+
+@router.post("/analyze")
+async def analyze_workspace(path: Optional[str] = None, ws: Workspace = Depends(routes_code.get_workspace)):
+    """
+    Syntax, compile and lint checks over the workspace's Python files
+    (optionally only under `path`), run in a process pool. Streams
+    newline-delimited JSON: one {"type": "result"} object per file as it is
+    done, then a {"type": "summary"}. Unchanged files come from the cache.
+    """
+    base = routes_code._resolve_safe_path(path, ws.root) if path else ws.root
+    if not base.exists():
+        raise HTTPException(status_code=404, detail="Path not found")
+
+    def discover():
+        rel = str(base.relative_to(ws.root)) if base != ws.root else ""
+        if base.is_file():
+            rel_paths = [rel]
+        else:
+            rel_paths, _ = ws.index.list(prefix=os.path.join(rel, "") if rel else "")
+        return [p for p in rel_paths if p.endswith(".py")]
+
+    rel_paths = await run_in_threadpool(discover)
+
+    async def stream():
+        async for event in analyzer.analyze_files(ws.root, rel_paths):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post("/check")
+async def check_source(payload: SourceCheck):
+    """The same checks for unsaved editor contents"""
+    source = payload.code.encode("utf-8")
+    limit = get_settings().max_file_bytes
+    if len(source) > limit:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Source is larger than {limit} bytes, not analyzed")
+    return await analyzer.check(os.path.basename(payload.filename), source)
@@ -1,8 +1,19 @@
-from fastapi import APIRouter, HTTPException
+from contextvars import ContextVar
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional, List
 import json
-import requests
+import re
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.api import routes_code
+from app.core import http, metrics, tracing
+from app.core.config import get_settings
+from app.core.shared_state import get_state
+from app.services import prompt_builder, speculation, tokens
+from app.services.workspaces import Workspace
 
 router = APIRouter()
 
@@ -10,6 +21,12 @@ class VoiceCommand(BaseModel):
     command: str
     language: Optional[str] = "python"
     action_type: Optional[str] = "code"  # "code", "navigation", "feature", "file"
+    session_id: Optional[str] = None  # per page load; pairs /voice/partial with /voice/process
+
+class VoicePartial(BaseModel):
+    transcript: str
+    language: Optional[str] = "python"
+    session_id: Optional[str] = None
 
 class VoiceResponse(BaseModel):
     received_command: str
@@ -24,20 +41,46 @@ class VoiceStatus(BaseModel):
     last_command: Optional[str] = None
 
 # In-memory storage for demo purposes
-voice_status = VoiceStatus(is_listening=False, last_command=None)
+# Listening state lives in the shared state store so every worker sees the same value
+VOICE_STATUS_KEY = "voice:status"
+
+
+async def load_voice_status() -> VoiceStatus:
+    return VoiceStatus(**await get_state().get(VOICE_STATUS_KEY, {"is_listening": False}))
+
+
+async def save_voice_status(status: VoiceStatus):
+    await get_state().set(VOICE_STATUS_KEY, status.model_dump())
+
+# OpenRouter API configuration (key, model, timeouts) lives in app/core/config.py
+
+# Speculation session of the voice command being handled (see app/services/speculation.py)
+current_voice_session: ContextVar[Optional[str]] = ContextVar("current_voice_session", default=None)
+
+
+def voice_session_id(request: Request, session_id: Optional[str]) -> Optional[str]:
+    """The caller's speculation session: the page's session id, scoped to the signed-in user"""
+    if not session_id:
+        return None
+    user_id = getattr(request.state, "user_id", None)
+    return f"{user_id}:{session_id}" if user_id else f"anon:{session_id}"
 
-# OpenRouter API Configuration
-OPENROUTER_API_KEY = "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"
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 
 @router.post("/process", response_model=VoiceResponse)
-async def process_voice(command: VoiceCommand):
+async def process_voice(command: VoiceCommand, request: Request, ws: Workspace = Depends(routes_code.get_workspace)):
     """
     Process voice commands with hands-free automation support
     """
+    routes_code.current_workspace.set(ws)  # navigation resolves symbols in the caller's workspace
+    current_voice_session.set(voice_session_id(request, command.session_id))
+    with tracing.span("process_voice", language=command.language) as span:
+        return await _process_voice(command, span)
+
+
+async def _process_voice(command: VoiceCommand, span):
     try:
-        voice_status.last_command = command.command
-        voice_status.is_listening = True
+        with tracing.span("save_voice_status"):
+            await save_voice_status(VoiceStatus(is_listening=True, last_command=command.command))
         
         command_lower = command.command.lower().strip()
         
@@ -45,6 +88,7 @@ async def process_voice(command: VoiceCommand):
         action_type, action_data, response_text, code_generated = await process_command_type(
             command_lower, command.language, command.action_type
         )
+        tracing.set_attribute("action_type", action_type)
         
         return VoiceResponse(
             received_command=command.command,
@@ -56,6 +100,9 @@ async def process_voice(command: VoiceCommand):
         )
         
     except Exception as e:
+        metrics.ERRORS.labels("voice_process").inc()
+        if span is not None:
+            span.error = f"{type(e).__name__}: {e}"
         return VoiceResponse(
             received_command=command.command,
             status="success", 
@@ -65,31 +112,56 @@ async def process_voice(command: VoiceCommand):
             action_data={"error": str(e)}
         )
 
+class _Phrases:
+    """Matches any of the phrases as whole words ("back" but not "background", "ide" but not "divide")"""
+
+    def __init__(self, *phrases: str):
+        self.phrases = phrases
+        self.pattern = re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in phrases) + r")\b")
+
+    def search(self, text: str) -> bool:
+        # substring tests are cheap; the regex only confirms word boundaries when one hits
+        return any(phrase in text for phrase in self.phrases) and self.pattern.search(text) is not None
+
+# Checked in this order by substring, first match wins. "voice search" and
+# "open file" come before the bare verb "open", which would otherwise take
+# "open voice search for x" and "open file x" to navigation.
+COMMAND_GROUPS = [
+    ("voice_control", ("open voice input", "close voice input", "activate voice", "deactivate voice")),
+    ("feature", ("voice search",)),
+    ("file", ("open file",)),
+    ("navigation", ("go to", "navigate to", "open", "show", "switch to")),
+    ("feature", ("voice search", "analytics", "debug", "shortcuts", "explain")),
+    ("file", ("create file", "new file", "save file", "open file", "delete file")),
+]
+
+def classify_command(command_lower: str) -> str:
+    """Which handler a (lower-cased) voice command goes to; anything unmatched is code generation"""
+    for kind, phrases in COMMAND_GROUPS:
+        if any(phrase in command_lower for phrase in phrases):
+            return kind
+    return "code"
+
+@tracing.traced()
 async def process_command_type(command_lower: str, language: str, action_type: str):
     """
     Process different types of voice commands
     """
-    
-    # === VOICE CONTROL COMMANDS ===
-    if any(voice in command_lower for voice in ["open voice input", "close voice input", "activate voice", "deactivate voice"]):
+    started = time.perf_counter()
+    kind = classify_command(command_lower)
+    metrics.VOICE_INTENT_SECONDS.labels(kind).observe(time.perf_counter() - started)  # routing only, not handling
+    if kind == "voice_control":
         return await handle_voice_control_command(command_lower)
-    
-    # === NAVIGATION COMMANDS ===
-    elif any(nav in command_lower for nav in ["go to", "navigate to", "open", "show", "switch to"]):
+    elif kind == "navigation":
         return await handle_navigation_command(command_lower)
-    
-    # === FEATURE COMMANDS ===
-    elif any(feat in command_lower for feat in ["voice search", "analytics", "debug", "shortcuts", "explain"]):
+    elif kind == "feature":
         return await handle_feature_command(command_lower)
-    
-    # === FILE MANAGEMENT COMMANDS ===
-    elif any(file in command_lower for file in ["create file", "new file", "save file", "open file", "delete file"]):
+    elif kind == "file":
         return await handle_file_command(command_lower, language)
-    
-    # === CODE GENERATION COMMANDS ===
     else:
         return await handle_code_command(command_lower, language)
 
+@tracing.traced()
 async def handle_voice_control_command(command_lower: str):
     """Handle voice input control commands"""
     
@@ -102,29 +174,46 @@ async def handle_voice_control_command(command_lower: str):
     else:
         return "voice_control", {"action": "unknown"}, f"I heard '{command_lower}'. Say 'open voice input' or 'close voice input'.", ""
 
+# UI targets of navigation commands, as whole words: "go to divide" is not the IDE
+NAVIGATION_TARGETS = [
+    ("go_to_home", _Phrases("home", "landing"), "Taking you back to the home page"),
+    ("go_to_ide", _Phrases("ide", "editor"), "Opening the IDE interface"),
+    ("toggle_menu", _Phrases("menu", "hamburger"), "Opening the feature menu"),
+    ("go_back", _Phrases("back"), "Going back to previous view"),
+]
+
+@tracing.traced()
 async def handle_navigation_command(command_lower: str):
     """Handle navigation and UI commands"""
     
-    if "home" in command_lower or "landing" in command_lower:
-        return "navigation", {"action": "go_to_home"}, "Taking you back to the home page", ""
-    
-    elif "ide" in command_lower or "editor" in command_lower:
-        return "navigation", {"action": "go_to_ide"}, "Opening the IDE interface", ""
-    
-    elif "menu" in command_lower or "hamburger" in command_lower:
-        return "navigation", {"action": "toggle_menu"}, "Opening the feature menu", ""
-    
-    elif "back" in command_lower:
-        return "navigation", {"action": "go_back"}, "Going back to previous view", ""
-    
-    else:
-        return "navigation", {"action": "unknown"}, f"I heard '{command_lower}'. What would you like me to navigate to?", ""
+    # "go to factorial" -> jump to a definition in the workspace. A symbol with
+    # exactly the spoken name wins over the UI targets; close matches come after them.
+    symbol = find_symbol_from_command(command_lower)
+    if symbol and symbol_matches_exactly(symbol, command_lower):
+        return go_to_symbol(symbol)
+
+    for action, phrases, message in NAVIGATION_TARGETS:
+        if phrases.search(command_lower):
+            return "navigation", {"action": action}, message, ""
+
+    if symbol:
+        return go_to_symbol(symbol)
+    return "navigation", {"action": "unknown"}, f"I heard '{command_lower}'. What would you like me to navigate to?", ""
+
+def go_to_symbol(symbol):
+    action_data = {"action": "go_to_symbol", **symbol._asdict()}
+    return "navigation", action_data, f"Going to {symbol.kind} {symbol.name} in {symbol.file} line {symbol.line}", ""
 
+@tracing.traced()
 async def handle_feature_command(command_lower: str):
     """Handle feature-specific commands"""
     
     if "voice search" in command_lower:
-        return "feature", {"action": "open_voice_search"}, "Opening voice search feature", ""
+        # "open voice search for bubble sort" -> prefill the query (see /code/search)
+        action_data = {"action": "open_voice_search"}
+        if " for " in command_lower:
+            action_data["query"] = command_lower.split(" for ", 1)[1].strip()
+        return "feature", action_data, "Opening voice search feature", ""
     
     elif "analytics" in command_lower or "dashboard" in command_lower:
         return "feature", {"action": "open_analytics"}, "Opening analytics dashboard", ""
@@ -141,6 +230,7 @@ async def handle_feature_command(command_lower: str):
     else:
         return "feature", {"action": "unknown"}, f"I heard '{command_lower}'. Which feature would you like to open?", ""
 
+@tracing.traced()
 async def handle_file_command(command_lower: str, language: str):
     """Handle file management commands"""
     
@@ -162,86 +252,81 @@ async def handle_file_command(command_lower: str, language: str):
     else:
         return "file", {"action": "unknown"}, f"I heard '{command_lower}'. What file operation would you like?", ""
 
+async def request_code_completion(command_lower: str, language: str, caller: str) -> dict:
+    """Ask the LLM for code; the parsed JSON response"""
+    # Static, cacheable system prompt first; language, command and token budget per request
+    prompt = prompt_builder.build_code_prompt(command_lower, language)
+    data = {
+        "model": get_settings().llm_model,
+        "messages": prompt.messages,
+        "max_tokens": prompt.max_tokens,
+        "temperature": 0.7
+    }
+
+    # Call the OpenRouter API over the shared connection pool, off the event loop
+    response = await run_in_threadpool(http.post_llm, data, caller)
+    response.raise_for_status()
+
+    result = response.json()
+    usage = tokens.record_usage(caller, prompt.prompt_tokens, result["choices"][0]["message"]["content"], result.get("usage"))
+    for kind, count in usage.items():
+        tracing.set_attribute(f"{kind}_tokens", count)
+    return result
+
+@tracing.traced()
 async def handle_code_command(command_lower: str, language: str):
     """Handle code generation commands using AI"""
-    
     try:
-        # Prepare the prompt for the AI
-        system_prompt = f"""You are a helpful coding assistant. When given voice commands, generate appropriate code snippets in {language} language.
-
-Rules:
-1. Always provide clean, working code
-2. Include helpful comments
-3. Use proper syntax for the specified language
-4. If the command is unclear, ask for clarification
-5. Keep responses concise but informative
-
-Common voice commands and their expected outputs:
-- "create function" → Generate a function template
-- "add loop" → Generate a loop structure
-- "print something" → Generate print/output statements
-- "if statement" → Generate conditional logic
-- "fix errors" → Provide debugging suggestions
-- "add comments" → Add explanatory comments
-- "for loop" → Generate a for loop
-- "while loop" → Generate a while loop
-- "class" → Generate a class template
-- "import" → Generate import statements
-
-Language: {language}
-Command: {command_lower}"""
-
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-        }
-
-        data = {
-            "model": "openai/gpt-4-turbo",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user", 
-                    "content": f"Voice command: '{command_lower}'. Please generate appropriate {language} code and provide a brief explanation."
-                }
-            ],
-            "max_tokens": 500,
-            "temperature": 0.7
-        }
-
-        # Call the OpenRouter API
-        response = requests.post(OPENROUTER_URL, headers=headers, json=data)
-        response.raise_for_status()
-        
-        ai_response = response.json()["choices"][0]["message"]["content"]
+        tracing.set_attribute("intent", prompt_builder.classify_intent(command_lower)[0])
+
+        # Started early from a partial transcript of this same command?
+        session_id = current_voice_session.get()
+        result = None
+        if session_id:
+            try:
+                result = await speculation.speculator.claim(session_id, command_lower, language)
+            except Exception as claim_error:
+                # shared state timed out or dropped: just ask the LLM ourselves
+                metrics.ERRORS.labels("speculation_claim").inc()
+                print(f"⚠️ Speculation claim failed ({type(claim_error).__name__}: {claim_error}), calling the LLM directly")
+        tracing.set_attribute("speculative", result is not None)
+        if result is None:
+            result = await request_code_completion(command_lower, language, "voice")
+        ai_response = result["choices"][0]["message"]["content"]
         
         # Parse the AI response to extract code and explanation
-        response_text = ""
-        code_generated = ""
-        
-        # Check if the response contains code blocks
-        if "```" in ai_response:
-            parts = ai_response.split("```")
-            if len(parts) >= 3:
-                # Extract code from code blocks
-                code_generated = parts[1].strip()
-                if code_generated.startswith(language):
-                    code_generated = code_generated[len(language):].strip()
-                response_text = parts[0].strip() + (parts[2].strip() if len(parts) > 2 else "")
-            else:
-                response_text = ai_response
-        else:
-            response_text = ai_response
+        with tracing.span("parse_code_blocks", response_chars=len(ai_response)):
+            response_text, code_generated = parse_code_response(ai_response, language)
             
         return "code", {}, response_text, code_generated
         
     except Exception as api_error:
         # Fallback to simple rule-based responses if AI fails
+        metrics.LLM_FALLBACKS.labels(type(api_error).__name__).inc()
         return await handle_code_fallback(command_lower, language)
 
+def parse_code_response(ai_response: str, language: str):
+    """Split an AI reply into (explanation, code) on its first ``` code block"""
+    response_text = ""
+    code_generated = ""
+    
+    # Check if the response contains code blocks
+    if "```" in ai_response:
+        parts = ai_response.split("```")
+        if len(parts) >= 3:
+            # Extract code from code blocks
+            code_generated = parts[1].strip()
+            if code_generated.startswith(language):
+                code_generated = code_generated[len(language):].strip()
+            response_text = parts[0].strip() + (parts[2].strip() if len(parts) > 2 else "")
+        else:
+            response_text = ai_response
+    else:
+        response_text = ai_response
+    
+    return response_text, code_generated
+
+@tracing.traced()
 async def handle_code_fallback(command_lower: str, language: str):
     """Fallback code generation when AI API fails"""
     
@@ -532,28 +617,87 @@ def extract_filename_from_command(command: str):
             return words[i + 1]
     return "new_file.py"
 
+NAVIGATION_VERBS = [re.compile(rf"\b{verb}\b") for verb in ["go to", "navigate to", "switch to", "open", "show"]]
+# Words around the name in "go to the definition of bubble sort", matched as whole words
+NAVIGATION_FILLERS = re.compile(r"\b(?:the|function|class|method|definition of|definition)\b")
+
+def navigation_target(command: str) -> str:
+    """The words after a navigation verb, without fillers ("go to the function bubble sort" -> "bubble sort")"""
+    for verb in NAVIGATION_VERBS:
+        match = verb.search(command)
+        if match:
+            target = command[match.end():]
+            break
+    else:
+        return ""
+    return " ".join(NAVIGATION_FILLERS.sub(" ", target).split())
+
+def find_symbol_from_command(command: str):
+    """
+    Resolve the words after a navigation verb against the workspace symbol
+    index. Fuzzy matches must be close (a few skipped characters), so an
+    unrelated name that merely contains the letters is not a jump target.
+    """
+    target = navigation_target(command)
+    if not target:
+        return None
+    ws = routes_code.current_workspace.get() or routes_code.workspaces.default
+    matches = ws.symbols.lookup(target, limit=1, max_fuzzy_score=2 + len(target) // 4)
+    return matches[0] if matches else None
+
+def symbol_matches_exactly(symbol, command: str) -> bool:
+    """Whether the spoken name is the symbol's name ("bubble sort" for bubble_sort, BubbleSort)"""
+    spoken = "".join(navigation_target(command).split()).replace("_", "")
+    return symbol.name.lower().replace("_", "") == spoken
+
+@router.post("/partial")
+async def process_partial(partial: VoicePartial, request: Request):
+    """
+    Interim transcript while the user is still speaking. Clear code requests
+    start their LLM call now; /voice/process with the same session_id picks
+    up the result when the command is final.
+    """
+    session_id = voice_session_id(request, partial.session_id)
+    command_lower = partial.transcript.lower().strip()
+    language = partial.language
+    if session_id is None:
+        status = "no_session"
+    elif classify_command(command_lower) != "code" or not prompt_builder.is_code_request(command_lower):
+        status = "not_code"
+    else:
+        status = await speculation.speculator.offer(
+            session_id, command_lower, language,
+            lambda: request_code_completion(command_lower, language, "speculative"),
+        )
+    return {"status": status}
+
+@router.get("/speculation")
+async def get_speculation_stats():
+    """Speculative prefetch outcomes and hit rate of this worker"""
+    return speculation.stats()
+
 @router.get("/status", response_model=VoiceStatus)
 async def get_voice_status():
     """Get current voice recognition status"""
-    return voice_status
+    return await load_voice_status()
 
 @router.post("/toggle")
 async def toggle_voice():
     """Toggle voice recognition on/off"""
+    voice_status = await load_voice_status()
     voice_status.is_listening = not voice_status.is_listening
+    await save_voice_status(voice_status)
     return {"is_listening": voice_status.is_listening, "message": "Voice recognition toggled"}
 
 @router.get("/test-api")
 async def test_api():
     """Test if the OpenRouter API is working"""
-    try:
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-        }
+    import requests
 
+    settings = get_settings()
+    try:
         data = {
-            "model": "openai/gpt-4-turbo",
+            "model": settings.llm_model,
             "messages": [
                 {
                     "role": "user", 
@@ -564,7 +708,7 @@ async def test_api():
             "temperature": 0.1
         }
 
-        response = requests.post(OPENROUTER_URL, headers=headers, json=data)
+        response = await run_in_threadpool(http.post_llm, data, "test-api")
         response.raise_for_status()
         
         ai_response = response.json()["choices"][0]["message"]["content"]
@@ -2,13 +2,24 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from typing import List
 import json
 import asyncio
+import time
+
+from app.core import metrics
+from app.core.shared_state import get_state
 
 router = APIRouter()
 
+# Broadcasts go through the shared state so clients connected to other workers get them too
+BROADCAST_CHANNEL = "ws:broadcast"
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
 
+    async def start(self):
+        """Deliver broadcasts published by any worker to this worker's connections."""
+        await get_state().subscribe(BROADCAST_CHANNEL, self.broadcast_local)
+
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
@@ -17,12 +28,19 @@ class ConnectionManager:
         self.active_connections.remove(websocket)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
+        started = time.perf_counter()
         await websocket.send_text(message)
+        metrics.WEBSOCKET_SEND_SECONDS.labels("personal").observe(time.perf_counter() - started)
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
+        await get_state().publish(BROADCAST_CHANNEL, message)
+
+    async def broadcast_local(self, message: str):
+        for connection in list(self.active_connections):
             try:
+                started = time.perf_counter()
                 await connection.send_text(message)
+                metrics.WEBSOCKET_SEND_SECONDS.labels("broadcast").observe(time.perf_counter() - started)
             except:
                 # Remove dead connections
                 self.active_connections.remove(connection)
@@ -58,5 +76,6 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
+        metrics.ERRORS.labels("websocket").inc()
         print(f"WebSocket error: {e}")
         manager.disconnect(websocket)
@@ -0,0 +1,158 @@
+# app/core/config.py
+"""
+Application settings.
+
+Every tunable lives on `Settings`. Values come from, in increasing priority:
+the defaults below, a JSON file (SETTINGS_FILE, default `settings.json` in
+the project root, optional), and environment variables named after the field
+in upper case (`MONGO_URI`, `HTTP_POOL_MAXSIZE`, `UVICORN_WORKERS`, ...).
+pydantic converts and validates the values, so a typo fails at startup
+rather than on the first request that needs it.
+
+Read them with `get_settings()`; the object is built once per process.
+"""
+import json
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+
+class Settings(BaseModel):
+    # ---------- Paths (relative paths are under the project root) ----------
+    workspace_dir: Path = Path("workspace")  # shared workspace for anonymous requests
+    user_workspaces_dir: Path = Path("user_workspaces")  # per-user workspaces, sharded by user id hash
+    snapshots_dir: Path = Path(".snapshots")  # compressed blobs and manifests
+    state_dir: Path = Path(".cache")  # per-workspace server state such as test durations
+
+    # ---------- MongoDB ----------
+    mongo_uri: Optional[str] = None  # required; `memory://` for an in-process stand-in
+    mongo_db: str = "project"
+    mongo_max_pool_size: int = Field(50, ge=1)
+    mongo_min_pool_size: int = Field(0, ge=0)
+    mongo_server_selection_timeout_ms: int = 3000
+    mongo_connect_timeout_ms: int = 5000
+
+    # ---------- LLM (OpenRouter) ----------
+    openrouter_api_key: Optional[str] = None  # required
+    openrouter_url: str = "https://openrouter.ai/api/v1/chat/completions"
+    llm_model: str = "openai/gpt-4-turbo"
+    llm_connect_timeout: float = 5.0
+    llm_read_timeout: float = 60.0
+    chat_max_tokens: int = 200
+    voice_max_tokens: int = 500
+
+    # ---------- Speculative prefetch (app/services/speculation.py) ----------
+    speculation_enabled: bool = True
+    speculation_min_words: int = Field(3, ge=1)  # shorter partial transcripts are not worth a call
+    speculation_ttl: float = 30.0  # unclaimed speculations are dropped after this
+    speculation_max_wasted: int = Field(5, ge=0)  # per session and window, then speculation pauses
+    speculation_wasted_window: int = 3600
+
+    # ---------- Chat memory (app/services/chat_history.py) ----------
+    chat_message_tokens: int = Field(1000, ge=1)  # longer messages are cut to this
+    chat_history_tokens: int = Field(1500, ge=0)  # earlier turns kept verbatim in the prompt
+    chat_summary_tokens: int = Field(200, ge=0)  # one-line notes of turns older than that
+    chat_history_ttl: int = 24 * 3600
+
+    # ---------- Outbound HTTP pool ----------
+    http_pool_connections: int = Field(10, ge=1)  # distinct hosts kept pooled
+    http_pool_maxsize: int = Field(20, ge=1)  # connections per host
+    http_max_retries: int = Field(1, ge=0)
+
+    # ---------- Code execution ----------
+    run_timeout: int = 5
+    profile_timeout: int = 10
+    test_timeout: int = 60
+    test_workers: Optional[int] = None  # default: one per core
+    analysis_workers: Optional[int] = None  # /debug process pool; default: one per core
+    analysis_cache_size: int = Field(4096, ge=1)  # files' issues kept by content hash
+    max_file_bytes: int = Field(1024 * 1024, ge=1)  # larger sources are not compiled or analyzed in the server
+
+    # ---------- Workspaces ----------
+    fsync_policy: Literal["always", "file", "never"] = "file"
+    workspace_quota_bytes: int = 100 * 1024 * 1024
+    workspace_quota_files: int = 5000
+    max_loaded_workspaces: int = Field(64, ge=1)
+
+    # ---------- Auth ----------
+    session_secret: Optional[str] = None  # per-process random key when unset
+    session_ttl: int = 7 * 24 * 3600
+    scrypt_n: int = 2 ** 14
+    hash_workers: int = Field(default_factory=lambda: min(4, os.cpu_count() or 1), ge=1)
+
+    # ---------- Server ----------
+    host: str = "0.0.0.0"
+    port: int = 8000
+    uvicorn_workers: int = Field(1, ge=1)
+
+    # ---------- Shared state across workers (app/core/shared_state.py) ----------
+    state_backend: Literal["auto", "local", "socket", "redis"] = "auto"  # auto: socket when workers > 1
+    state_url: str = Field(default_factory=lambda: _default_state_url())
+    redis_url: str = "redis://localhost:6379/0"
+    state_timeout: float = Field(5.0, gt=0)  # per socket/redis backend call; a dead server fails calls, not hangs them
+
+    # ---------- Tracing (app/core/tracing.py) ----------
+    trace_exporter: Literal["jsonl", "stdout", "none"] = "jsonl"
+    trace_file: Path = Path(".cache/traces.jsonl")  # relative paths are under the project root
+    trace_sample_rate: float = Field(0.01, ge=0, le=1)
+    trace_slow_ms: float = 1000.0  # traces at least this slow are always kept
+
+    # ---------- Diagnostics (app/core/profiler.py) ----------
+    admin_token: Optional[str] = None  # /admin endpoints are disabled when unset
+    profile_max_seconds: int = Field(60, ge=1)
+    loop_lag_threshold_ms: float = 100.0  # log loop stalls at least this long; 0 disables
+
+    @property
+    def workspace_path(self) -> Path:
+        return _under_root(self.workspace_dir)
+
+    @property
+    def user_workspaces_path(self) -> Path:
+        return _under_root(self.user_workspaces_dir)
+
+    @property
+    def snapshots_path(self) -> Path:
+        return _under_root(self.snapshots_dir)
+
+    @property
+    def state_path(self) -> Path:
+        return _under_root(self.state_dir)
+
+    def missing_required(self) -> List[str]:
+        """Environment names of the REQUIRED settings that are unset"""
+        return [name.upper() for name in REQUIRED if not getattr(self, name)]
+
+
+# Secrets have no defaults: the server refuses to start without them
+REQUIRED = ("mongo_uri", "openrouter_api_key")
+
+
+def _under_root(path: Path) -> Path:
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def _default_state_url() -> str:
+    if os.name == "posix":
+        return f"unix://{os.path.join(tempfile.gettempdir(), f'voicecode-state-{os.getuid()}.sock')}"
+    return "tcp://127.0.0.1:8765"
+
+
+def load_settings(path: Optional[Path] = None) -> Settings:
+    """Build Settings from the optional JSON file overlaid with the environment."""
+    path = path or Path(os.environ.get("SETTINGS_FILE", BASE_DIR / "settings.json"))
+    values = json.loads(path.read_text(encoding="utf-8")) if path.is_file() else {}
+    for name in Settings.model_fields:
+        if name.upper() in os.environ:
+            values[name] = os.environ[name.upper()]
+    return Settings(**values)
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    return load_settings()
@@ -0,0 +1,117 @@
+# app/core/database.py
+"""
+MongoDB access for user accounts.
+
+The client is created when the app starts (not at import time) using motor,
+so queries never block the event loop, with a bounded connection pool and
+short server-selection timeouts (see Settings.mongo_*) so an unreachable cluster fails fast instead
+of hanging requests. A unique index on `email` makes the database the
+authority on duplicate signups: an insert that loses the race raises
+DuplicateKeyError, which callers treat as "already registered".
+
+pymongo and motor are imported on connect, not with this module, to keep
+app imports light. Setting MONGO_URI to `memory://` swaps in an in-process stand-in with the
+same async interface, for local runs and tests without a cluster.
+"""
+import asyncio
+import copy
+from typing import Optional
+
+from app.core.config import get_settings
+
+USERS_COLLECTION = "database"
+
+
+class InMemoryCollection:
+    """The subset of motor's collection API the app uses, kept in a dict."""
+
+    def __init__(self):
+        self._docs = []
+        self._unique = set()  # field names with a unique index
+        self._lock = asyncio.Lock()
+
+    async def create_index(self, field: str, unique: bool = False, **kwargs):
+        if unique:
+            self._unique.add(field)
+        return f"{field}_1"
+
+    async def find_one(self, query: dict):
+        for doc in self._docs:
+            if all(doc.get(k) == v for k, v in query.items()):
+                return copy.deepcopy(doc)
+        return None
+
+    async def insert_one(self, document: dict):
+        from pymongo.errors import DuplicateKeyError
+
+        async with self._lock:
+            for field in self._unique:
+                if field in document and any(doc.get(field) == document[field] for doc in self._docs):
+                    raise DuplicateKeyError(f"E11000 duplicate key error index: {field}_1")
+            document.setdefault("_id", len(self._docs) + 1)
+            self._docs.append(copy.deepcopy(document))
+        return document["_id"]
+
+    async def update_one(self, query: dict, update: dict):
+        for doc in self._docs:
+            if all(doc.get(k) == v for k, v in query.items()):
+                doc.update(copy.deepcopy(update.get("$set", {})))
+                return
+
+
+class Database:
+    def __init__(self, uri: Optional[str] = None, db_name: Optional[str] = None):
+        settings = get_settings()
+        self.uri = uri or settings.mongo_uri
+        self.db_name = db_name or settings.mongo_db
+        self.client = None
+        self.users = None
+
+    async def connect(self):
+        from pymongo.errors import PyMongoError
+
+        if self.uri.startswith("memory://"):
+            self.users = InMemoryCollection()
+        else:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            settings = get_settings()
+            self.client = AsyncIOMotorClient(
+                self.uri,
+                maxPoolSize=settings.mongo_max_pool_size,
+                minPoolSize=settings.mongo_min_pool_size,
+                serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+                connectTimeoutMS=settings.mongo_connect_timeout_ms,
+            )
+            self.users = self.client[self.db_name][USERS_COLLECTION]
+        try:
+            await self.users.create_index("email", unique=True, name="email_unique")
+            print("✅ Connected to MongoDB")
+        except PyMongoError as e:
+            # existing duplicate emails or an unreachable cluster: keep serving, inserts still work
+            print("❌ Could not create the unique email index:", e)
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+        self.users = None
+
+    async def find_user(self, email: str) -> Optional[dict]:
+        return await self.users.find_one({"email": email})
+
+    async def create_user(self, user: dict) -> bool:
+        """Insert a user; False if the email is already registered."""
+        from pymongo.errors import DuplicateKeyError
+
+        try:
+            await self.users.insert_one(user)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def set_password(self, email: str, password_hash: str):
+        await self.users.update_one({"email": email}, {"$set": {"password": password_hash}})
+
+
+db = Database()
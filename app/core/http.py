@@ -0,0 +1,107 @@
+# app/core/http.py
+"""
+Shared outbound HTTP client.
+
+One requests.Session per process keeps TCP and TLS connections to the LLM
+provider alive between calls instead of reconnecting each time. Pool size,
+retries and timeouts come from Settings.
+"""
+import json
+import threading
+import time
+
+from app.core import metrics, tracing
+from app.core.config import get_settings
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests  # loaded on first use, not at server start
+                from requests.adapters import HTTPAdapter
+
+                settings = get_settings()
+                adapter = HTTPAdapter(
+                    pool_connections=settings.http_pool_connections,
+                    pool_maxsize=settings.http_pool_maxsize,
+                    max_retries=settings.http_max_retries,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def llm_timeout():
+    """(connect, read) timeout for LLM calls."""
+    settings = get_settings()
+    return (settings.llm_connect_timeout, settings.llm_read_timeout)
+
+
+def llm_headers() -> dict:
+    return {
+        "Authorization": f"Bearer {get_settings().openrouter_api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+def post_llm(data: dict, caller: str):
+    """
+    POST a chat completion request to OpenRouter over the pooled session,
+    recording time to first byte (response headers) and total time.
+    Blocking: call it from a worker thread in async code.
+    """
+    start = time.perf_counter()
+    with tracing.span("openrouter", caller=caller, model=data.get("model")) as span:
+        response = get_session().post(
+            get_settings().openrouter_url, headers=llm_headers(), json=data, timeout=llm_timeout()
+        )
+        if span is not None:
+            span.set_attribute("status", response.status_code)
+    metrics.LLM_REQUEST_SECONDS.labels(caller, "first_byte").observe(response.elapsed.total_seconds())
+    metrics.LLM_REQUEST_SECONDS.labels(caller, "total").observe(time.perf_counter() - start)
+    return response
+
+
+def stream_llm(data: dict, caller: str):
+    """
+    Like post_llm with `"stream": true`: yields the reply's content pieces as
+    OpenRouter sends them (server-sent events), recording time to the first
+    token and total time. A blocking generator: iterate it from a worker thread.
+    """
+    start = time.perf_counter()
+    response = get_session().post(
+        get_settings().openrouter_url, headers=llm_headers(), json={**data, "stream": True},
+        timeout=llm_timeout(), stream=True,
+    )
+    with response:
+        response.raise_for_status()
+        first = True
+        for line in response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue  # blank separators and ": keep-alive" comments
+            payload = line[len(b"data: "):]
+            if payload == b"[DONE]":
+                break
+            choices = json.loads(payload).get("choices") or [{}]
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                if first:
+                    metrics.LLM_REQUEST_SECONDS.labels(caller, "first_token").observe(time.perf_counter() - start)
+                    first = False
+                yield content
+    metrics.LLM_REQUEST_SECONDS.labels(caller, "total").observe(time.perf_counter() - start)
+
+
+def close_session():
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
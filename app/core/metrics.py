@@ -0,0 +1,244 @@
+# app/core/metrics.py
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are plain Python objects: recording a value is a
+bisect into the bucket bounds plus a few additions under a lock, so they are
+cheap enough for hot paths. Label combinations are created on first use and
+cached. GET /metrics renders everything registered here.
+
+Each worker process keeps its own numbers; with several workers, scrape them
+individually or aggregate by the `pid` label the renderer adds.
+"""
+import abc
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def labels(self, *values: str):
+        child = self._children.get(values)  # fast path: label values already strings
+        if child is None:
+            key = tuple(str(v) for v in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """A fresh series for one combination of label values"""
+
+    @property
+    def family(self) -> str:
+        return self.name
+
+    def render(self, pid: Tuple[Tuple[str, str], ...]) -> List[str]:
+        lines = [f"# HELP {self.family} {self.documentation}", f"# TYPE {self.family} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.family, self.labelnames, values, pid))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, values, pid):
+        return [f"{name}{_label_str(labelnames, values, pid)} {self.value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    @property
+    def family(self) -> str:
+        return self.name + "_total"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name, labelnames, values, pid):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{_label_str(labelnames + ('le',), values + (le,), pid)} {cumulative}")
+        lines.append(f"{name}_sum{_label_str(labelnames, values, pid)} {total}")
+        lines.append(f"{name}_count{_label_str(labelnames, values, pid)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+def render() -> str:
+    pid = (("pid", str(os.getpid())),)
+    with _registry_lock:
+        metrics = list(_registry)
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render(pid))
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request, labelled by route template (not raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = ["500"]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, status[0]).observe(time.perf_counter() - start)
+
+# ---------- Application metrics ----------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+VOICE_INTENT_SECONDS = Histogram(
+    "voice_intent_routing_seconds", "Time to classify a voice command, by the type it was routed to", ("type",),
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01),  # pure string matching: microseconds
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_seconds", "OpenRouter call latency: to first byte (or first streamed token) and in total", ("caller", "stage")
+)
+LLM_TOKENS = Counter(
+    "llm_tokens", "Tokens sent to and received from OpenRouter", ("caller", "kind")  # prompt, completion, cached_prompt
+)
+LLM_FALLBACKS = Counter("llm_fallback", "Voice code commands answered by the offline fallback", ("reason",))
+FILE_IO_SECONDS = Histogram(
+    "workspace_file_io_seconds", "Workspace file operation latency", ("op",)
+)
+EXECUTOR_QUEUE_SECONDS = Histogram(
+    "executor_queue_wait_seconds", "Time a code run waited for a worker thread", ("kind",)
+)
+EXECUTOR_RUN_SECONDS = Histogram(
+    "executor_run_seconds", "Code run / profile subprocess time", ("kind",)
+)
+TRANSCRIBE_SECONDS = Histogram(
+    "whisper_transcribe_seconds", "Whisper transcription time per audio chunk"
+)
+WEBSOCKET_SEND_SECONDS = Histogram(
+    "websocket_send_seconds", "Latency of sending one WebSocket message", ("kind",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a scheduled heartbeat"
+)
+SPECULATION = Counter(
+    "voice_speculation", "Speculative LLM calls from partial transcripts by outcome", ("outcome",)
+)
+ANALYSIS_FILES = Counter(
+    "static_analysis_files", "Files checked by /debug, by whether the content-hash cache had them", ("cache",)
+)
+BYTECODE_CACHE = Counter(
+    "bytecode_cache", "Compiles before /run and /profile: cache hit, miss, syntax error or rejected (too large or deep)", ("result",)
+)
+ERRORS = Counter("app_errors", "Errors caught and reported instead of raised", ("where",))
@@ -0,0 +1,176 @@
+# app/core/profiler.py
+"""
+Live-server diagnostics: an on-demand sampling profiler and an event-loop
+lag monitor.
+
+The profiler is a thread that snapshots every other thread's Python stack
+(`sys._current_frames()`) at a fixed interval and counts identical stacks.
+The result is in the collapsed format flamegraph tools read, one
+`thread;outer;...;inner count` line per distinct stack. The thread name is the
+root frame, so time spent blocking the event loop (MainThread) is easy to tell
+apart from threadpool work (AnyIO worker threads) or password hashing.
+
+The lag monitor keeps a heartbeat coroutine on the loop. A watchdog thread
+notices when the heartbeat is overdue and captures the loop thread's stack
+while it is still stuck, so the report names the callback that blocked the
+loop, not whatever ran after it.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import get_settings
+
+# Leaf frames of a thread that is waiting rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+STALL_STACK_DEPTH = 20  # innermost frames kept in a loop-stall report
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _collapse(frame) -> Tuple[str, bool]:
+    """(`outer;...;inner`, is_idle) for a thread's current frame."""
+    leaf = frame.f_code
+    idle = (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels)), idle
+
+
+# ---------- Sampling profiler ----------
+class SamplingProfiler:
+    def __init__(self, seconds: float, interval: float = 0.005, include_idle: bool = False):
+        self.seconds = seconds
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+    def run(self):
+        """Sample for `seconds` from the calling thread (blocking)."""
+        me = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack, idle = _collapse(frame)
+                if idle and not self.include_idle:
+                    continue
+                self.stacks[f"{names.get(ident, ident)};{stack}"] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+_profile_lock = asyncio.Lock()
+
+
+def profile_running() -> bool:
+    return _profile_lock.locked()
+
+
+async def profile(seconds: float, interval: float = 0.005, include_idle: bool = False) -> SamplingProfiler:
+    """
+    Profile the whole process for `seconds`. Sampling runs on its own thread,
+    not the shared threadpool, so it still works when that pool is starved.
+    One profile at a time.
+    """
+    async with _profile_lock:
+        profiler = SamplingProfiler(seconds, interval, include_idle)
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def run():
+            try:
+                profiler.run()
+            finally:
+                loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None))
+
+        threading.Thread(target=run, name="sampling-profiler", daemon=True).start()
+        await done
+        return profiler
+
+
+# ---------- Event-loop lag ----------
+class LoopLagMonitor:
+    def __init__(self, history: int = 50):
+        self.threshold = 0.0
+        self.interval = 0.05
+        self.stalls: Deque[Dict] = deque(maxlen=history)
+        self._beat = 0.0
+        self._captured: Optional[Tuple[float, str]] = None  # (beat, loop stack) seen by the watchdog
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        threshold_ms = get_settings().loop_lag_threshold_ms
+        if threshold_ms <= 0:
+            return
+        self.threshold = threshold_ms / 1000
+        self.interval = min(0.05, self.threshold / 2)
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True).start()
+
+    async def close(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            beat = self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - beat - self.interval
+            metrics.EVENT_LOOP_LAG_SECONDS.observe(max(lag, 0.0))
+            captured, self._captured = self._captured, None
+            if lag >= self.threshold:
+                stack = captured[1] if captured and captured[0] == beat else None
+                self._report(lag, stack)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue >= self.threshold and (self._captured is None or self._captured[0] != beat):
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._captured = (beat, "".join(traceback.format_stack(frame, limit=STALL_STACK_DEPTH)))
+
+    def _report(self, lag: float, stack: Optional[str]):
+        self.stalls.append({"timestamp": time.time(), "blocked_ms": round(lag * 1000, 1), "stack": stack})
+        print(f"🐢 Event loop blocked for {lag * 1000:.0f}ms")
+        if stack:
+            print(stack.rstrip())
+
+
+loop_monitor = LoopLagMonitor()
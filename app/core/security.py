@@ -0,0 +1,145 @@
+# app/core/security.py
+"""
+Password hashing and session tokens.
+
+Passwords are hashed with scrypt (memory-hard, in the standard library). A
+hash costs tens of milliseconds of CPU on purpose, so it runs in a small
+dedicated thread pool (hashlib releases the GIL while hashing): the event loop
+keeps serving other requests, and the pool size bounds how much CPU a burst of
+logins can take.
+
+After login the server issues a stateless session token,
+`base64(claims).base64(HMAC-SHA256 signature)`, in a cookie. Verifying it is a
+single HMAC, so authenticated requests need no database round trip. Logout
+records the token id as revoked in the shared state (app/core/shared_state.py),
+where every worker sees it, until the token would have expired anyway.
+run_server.py gives all workers the same SESSION_SECRET.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.core.config import get_settings
+from app.core.shared_state import get_state
+
+_settings = get_settings()
+
+SCRYPT_N = _settings.scrypt_n
+SCRYPT_R = 8
+SCRYPT_P = 1
+HASH_WORKERS = _settings.hash_workers
+
+SESSION_COOKIE = "session"
+SESSION_TTL = _settings.session_ttl
+REVOKED_KEY = "session:revoked:{}"
+# Without SESSION_SECRET tokens are signed with a per-process key and do not survive a restart
+# (run_server.py generates one for all workers when it starts several)
+SESSION_SECRET = (_settings.session_secret or "").encode() or secrets.token_bytes(32)
+if not _settings.session_secret:
+    print("⚠️ SESSION_SECRET not set, sessions will not survive a restart")
+
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+# ---------- Passwords ----------
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+
+
+def hash_password(password: str) -> str:
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return "$".join([
+        "scrypt", str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P),
+        base64.b64encode(salt).decode(), base64.b64encode(digest).decode(),
+    ])
+
+
+def is_password_hash(stored: str) -> bool:
+    return stored.startswith("scrypt$")
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """
+    Check `password` against a stored hash. Accounts created before hashing
+    hold the plaintext; those still verify (in constant time) so callers can
+    upgrade them, see `is_password_hash`.
+    """
+    if not is_password_hash(stored):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        expected = base64.b64decode(digest)
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, hash_password, password)
+
+
+async def verify_password_async(password: str, stored: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, verify_password, password, stored)
+
+
+# ---------- Session tokens ----------
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(user_id: str, email: str, ttl: int = SESSION_TTL) -> str:
+    now = int(time.time())
+    claims = {"sub": user_id, "email": email, "iat": now, "exp": now + ttl, "jti": secrets.token_urlsafe(12)}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token: Optional[str]) -> Optional[dict]:
+    """Claims of a validly signed, unexpired token, else None. Revocation is checked by `authenticate`."""
+    if not token or "." not in token:
+        return None
+    payload, signature = token.rsplit(".", 1)
+    # bytes: compare_digest refuses str with non-ASCII characters, and cookies are client input
+    if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict):
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+
+async def authenticate(token: Optional[str]) -> Optional[dict]:
+    """Claims of a valid, unexpired, unrevoked token, else None."""
+    claims = verify_token(token)
+    if claims is None or await get_state().get(REVOKED_KEY.format(claims.get("jti"))):
+        return None
+    return claims
+
+
+async def revoke_token(token: Optional[str]):
+    claims = verify_token(token)
+    if claims is not None:
+        # kept until the token would have expired anyway
+        await get_state().set(REVOKED_KEY.format(claims["jti"]), True, ttl=max(claims["exp"] - time.time(), 1))
@@ -0,0 +1,504 @@
+# app/core/shared_state.py
+"""
+State shared by every server worker.
+
+With several uvicorn workers each request may land in a different process, so
+anything that must look the same from all of them (voice listening state,
+cache entries, WebSocket broadcasts) goes through a SharedState backend
+instead of a module global:
+
+    local   in-process dict; correct only with a single worker
+    socket  a small store served over a unix (or localhost TCP) socket by one
+            process, that every worker connects to (default with workers > 1)
+    redis   any Redis-compatible server (needs the optional `redis` package)
+
+All backends expose the same async interface: get/set/delete for JSON values
+with an optional TTL, an atomic incr for counters, and publish/subscribe for
+fan-out between workers.
+"""
+import abc
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core import metrics
+from app.core.config import get_settings
+
+Listener = Callable[[Any], Awaitable[None]]
+
+
+class SharedState(abc.ABC):
+    """Interface of every backend."""
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abc.abstractmethod
+    async def get(self, key: str, default: Any = None) -> Any:
+        """The value stored under `key`, or `default` when missing or expired"""
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serializable value, expiring after `ttl` seconds if given"""
+
+    @abc.abstractmethod
+    async def delete(self, key: str):
+        """Remove `key`; missing keys are ignored"""
+
+    @abc.abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """
+        Atomically add `amount` to the integer under `key` (missing counts as 0)
+        and return the new value. `ttl` applies only when this call creates the
+        key, so a counter's window starts at its first increment and is not
+        extended by later ones.
+        """
+
+    @abc.abstractmethod
+    async def publish(self, channel: str, message: Any):
+        """Send `message` to the subscribers of `channel` in every worker"""
+
+    @abc.abstractmethod
+    async def subscribe(self, channel: str, listener: Listener):
+        """Call `listener(message)` for every message published on `channel`, by any worker."""
+
+
+class _Store:
+    """Key/value data with expiry, used by LocalState and the socket server."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, expires = item
+        if expires is not None and expires < time.monotonic():
+            del self._data[key]
+            return default
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        value = self.get(key)
+        if value is None:
+            self.set(key, amount, ttl)
+            return amount
+        self._data[key] = (value + amount, self._data[key][1])
+        return value + amount
+
+
+# ---------- local ----------
+class LocalState(SharedState):
+    def __init__(self):
+        self._store = _Store()
+        self._listeners: Dict[str, List[Listener]] = {}
+
+    async def get(self, key, default=None):
+        return self._store.get(key, default)
+
+    async def set(self, key, value, ttl=None):
+        # round-trip through JSON so values behave the same as with the shared backends
+        self._store.set(key, json.loads(json.dumps(value)), ttl)
+
+    async def delete(self, key):
+        self._store.delete(key)
+
+    async def incr(self, key, amount=1, ttl=None):
+        return self._store.incr(key, amount, ttl)
+
+    async def publish(self, channel, message):
+        for listener in list(self._listeners.get(channel, [])):
+            await _deliver(listener, message)
+
+    async def subscribe(self, channel, listener):
+        self._listeners.setdefault(channel, []).append(listener)
+
+
+async def _deliver(listener: Listener, message: Any):
+    try:
+        await listener(message)
+    except Exception as e:
+        print(f"Shared state listener error: {e}")
+
+
+# ---------- socket ----------
+def _parse_address(url: str):
+    if url.startswith("unix://"):
+        return "unix", url[len("unix://"):]
+    if url.startswith("tcp://"):
+        host, _, port = url[len("tcp://"):].rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError(f"Unsupported shared state address {url!r}, expected unix://path or tcp://host:port")
+
+
+class StateServer:
+    """
+    Serves a _Store over newline-delimited JSON. Requests are
+    {"id", "op", ...}; replies {"id", "result"}; published messages are pushed
+    to subscribers as {"channel", "message"}.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._store = _Store()
+        self._subscribers: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        kind, address = _parse_address(self.url)
+        if kind == "unix":
+            os.makedirs(os.path.dirname(address) or ".", exist_ok=True)
+            if os.path.exists(address):
+                os.unlink(address)  # left behind by a server that did not shut down cleanly
+            self._server = await asyncio.start_unix_server(self._handle, path=address)
+        else:
+            self._server = await asyncio.start_server(self._handle, *address)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()  # handlers see EOF and finish
+            await asyncio.sleep(0)
+            await self._server.wait_closed()
+            self._server = None
+
+    def serve_in_thread(self) -> threading.Thread:
+        """Run the server on its own event loop in a daemon thread (for run_server.py)."""
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name="shared-state-server", daemon=True)
+        thread.start()
+        started.wait(5)
+        return thread
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                op = request.get("op")
+                result = None
+                if op == "get":
+                    result = self._store.get(request["key"])
+                elif op == "set":
+                    self._store.set(request["key"], request["value"], request.get("ttl"))
+                elif op == "delete":
+                    self._store.delete(request["key"])
+                elif op == "incr":
+                    result = self._store.incr(request["key"], request.get("amount", 1), request.get("ttl"))
+                elif op == "subscribe":
+                    self._subscribers.setdefault(request["channel"], set()).add(writer)
+                elif op == "publish":
+                    push = (json.dumps({"channel": request["channel"], "message": request["message"]}) + "\n").encode()
+                    for subscriber in list(self._subscribers.get(request["channel"], ())):
+                        subscriber.write(push)
+                writer.write((json.dumps({"id": request.get("id"), "result": result}) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            for subscribers in self._subscribers.values():
+                subscribers.discard(writer)
+            writer.close()
+
+
+class SocketState(SharedState):
+    """
+    Client of a StateServer. One connection per worker; replies are matched by
+    id. Every call times out after STATE_TIMEOUT seconds. When the connection
+    drops, calls in flight fail with ConnectionError and the client reconnects
+    (serving the store itself if nobody else does, as on start) on the next
+    call, or in the background while it has subscriptions to restore.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._listeners: Dict[str, List[Listener]] = {}
+        self._next_id = 0
+        self._reader_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._server: Optional[StateServer] = None
+        self._closed = False
+
+    async def start(self):
+        self._closed = False
+        await self._ensure_connected()
+
+    async def _ensure_connected(self):
+        if self._writer is not None:
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is None:
+                await self._connect()
+
+    async def _connect(self):
+        kind, address = _parse_address(self.url)
+        try:
+            await self._open(kind, address)
+        except (ConnectionError, FileNotFoundError):
+            # nobody serves the store (started without run_server.py, or its worker exited): serve it from this worker
+            if self._server is None:
+                self._server = StateServer(self.url)
+                try:
+                    await self._server.start()
+                except OSError:
+                    self._server = None  # another worker won the race
+            await self._open(kind, address)
+        for channel in self._listeners:
+            await self._call("subscribe", channel=channel)
+
+    async def _open(self, kind, address):
+        if kind == "unix":
+            self._reader, self._writer = await asyncio.open_unix_connection(address)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(*address)
+        self._reader_task = asyncio.create_task(self._read_loop(self._reader))
+
+    async def close(self):
+        self._closed = True
+        for task in (self._reader_task, self._reconnect_task):
+            if task is not None:
+                task.cancel()
+        self._reader_task = self._reconnect_task = None
+        self._disconnect(ConnectionError("shared state client closed"))
+        if self._server is not None:
+            await self._server.close()
+            self._server = None
+
+    def _disconnect(self, error: Exception):
+        """Drop the connection and fail every call still waiting for a reply."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                if "channel" in reply:
+                    for listener in list(self._listeners.get(reply["channel"], [])):
+                        asyncio.create_task(_deliver(listener, reply["message"]))
+                    continue
+                future = self._pending.pop(reply["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(reply["result"])
+        except (ConnectionError, ValueError) as e:
+            metrics.ERRORS.labels("shared_state").inc()
+            print(f"⚠️ Shared state connection error: {e}")
+        if reader is not self._reader or self._closed:
+            return
+        self._disconnect(ConnectionError("shared state server went away"))
+        if self._listeners and self._reconnect_task is None:
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        """Reconnect in the background so subscriptions (WebSocket broadcasts) resume without a call."""
+        delay = 0.1
+        try:
+            while not self._closed:
+                try:
+                    await self._ensure_connected()
+                    print("🔗 Reconnected to the shared state server")
+                    return
+                except OSError as e:
+                    self._disconnect(ConnectionError(f"shared state server unreachable: {e}"))
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 5.0)
+        finally:
+            self._reconnect_task = None
+
+    async def _call(self, op: str, **fields):
+        await self._ensure_connected()
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        writer = self._writer
+        try:
+            try:
+                writer.write((json.dumps({"id": request_id, "op": op, **fields}) + "\n").encode())
+                await writer.drain()
+            except ConnectionError as e:
+                if writer is self._writer:  # not a connection some other call has opened since
+                    self._disconnect(e)
+                raise
+            return await asyncio.wait_for(future, get_settings().state_timeout)
+        except asyncio.TimeoutError:
+            metrics.ERRORS.labels("shared_state").inc()
+            raise asyncio.TimeoutError(f"shared state {op} got no reply in {get_settings().state_timeout}s") from None
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def get(self, key, default=None):
+        value = await self._call("get", key=key)
+        return default if value is None else value
+
+    async def set(self, key, value, ttl=None):
+        await self._call("set", key=key, value=value, ttl=ttl)
+
+    async def delete(self, key):
+        await self._call("delete", key=key)
+
+    async def incr(self, key, amount=1, ttl=None):
+        return await self._call("incr", key=key, amount=amount, ttl=ttl)
+
+    async def publish(self, channel, message):
+        await self._call("publish", channel=channel, message=message)
+
+    async def subscribe(self, channel, listener):
+        first = channel not in self._listeners
+        self._listeners.setdefault(channel, []).append(listener)
+        if first:
+            await self._call("subscribe", channel=channel)
+
+
+# ---------- redis ----------
+class RedisState(SharedState):
+    """
+    Redis client. Calls time out after STATE_TIMEOUT seconds, and failures are
+    raised as SocketState raises them: asyncio.TimeoutError and ConnectionError.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._redis = None
+        self._pubsub = None
+        self._exceptions = None
+        self._listeners: Dict[str, List[Listener]] = {}
+        self._reader_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        import redis.asyncio as redis  # optional dependency
+        from redis import exceptions
+
+        timeout = get_settings().state_timeout
+        self._exceptions = exceptions
+        self._redis = redis.from_url(self.url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._pubsub = self._redis.pubsub()
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        if self._redis is not None:
+            await self._redis.close()
+
+    @contextmanager
+    def _errors(self, op: str):
+        try:
+            yield
+        except self._exceptions.TimeoutError:
+            metrics.ERRORS.labels("shared_state").inc()
+            raise asyncio.TimeoutError(f"shared state {op} got no reply in {get_settings().state_timeout}s") from None
+        except self._exceptions.ConnectionError as e:
+            raise ConnectionError(f"shared state {op} failed: {e}") from e
+
+    async def get(self, key, default=None):
+        with self._errors("get"):
+            raw = await self._redis.get(key)
+        return default if raw is None else json.loads(raw)
+
+    async def set(self, key, value, ttl=None):
+        with self._errors("set"):
+            await self._redis.set(key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, key):
+        with self._errors("delete"):
+            await self._redis.delete(key)
+
+    async def incr(self, key, amount=1, ttl=None):
+        with self._errors("incr"):
+            if ttl:
+                # creates the key with its expiry only if missing; INCRBY keeps the expiry
+                await self._redis.set(key, 0, nx=True, px=int(ttl * 1000))
+            return await self._redis.incrby(key, amount)
+
+    async def publish(self, channel, message):
+        with self._errors("publish"):
+            await self._redis.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channel, listener):
+        first = channel not in self._listeners
+        self._listeners.setdefault(channel, []).append(listener)
+        if first:
+            with self._errors("subscribe"):
+                await self._pubsub.subscribe(channel)
+            if self._reader_task is None:
+                self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        async for item in self._pubsub.listen():
+            if item.get("type") != "message":
+                continue
+            channel = item["channel"].decode() if isinstance(item["channel"], bytes) else item["channel"]
+            for listener in list(self._listeners.get(channel, [])):
+                asyncio.create_task(_deliver(listener, json.loads(item["data"])))
+
+
+# ---------- selection ----------
+def resolve_backend() -> str:
+    settings = get_settings()
+    if settings.state_backend != "auto":
+        return settings.state_backend
+    return "socket" if settings.uvicorn_workers > 1 else "local"
+
+
+def create_state() -> SharedState:
+    backend = resolve_backend()
+    settings = get_settings()
+    if backend == "socket":
+        return SocketState(settings.state_url)
+    if backend == "redis":
+        return RedisState(settings.redis_url)
+    return LocalState()
+
+
+_state: Optional[SharedState] = None
+
+
+def get_state() -> SharedState:
+    """The process-wide backend (started by the app lifespan)."""
+    global _state
+    if _state is None:
+        _state = create_state()
+    return _state
@@ -0,0 +1,79 @@
+# app/core/startup.py
+"""
+Startup-time accounting.
+
+`create_app()` runs its steps inside `report.phase(name)`. While a phase runs,
+`import` statements are timed, so the report shows both how long each phase
+took and which top-level packages it spent that time importing (self time:
+a package is not charged for the packages it imports in turn). Printed once
+the app is up and served at GET /health/startup.
+"""
+import builtins
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+class StartupReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[dict] = []
+        self.imports: Dict[str, float] = defaultdict(float)  # top-level package -> self seconds
+        self._stack: List[float] = []  # child time accumulated per active import
+        self._depth = 0
+
+    def _timed_import(self, original):
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            # already-loaded modules (the common case) take the fast path
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = self._stack.pop()
+                self.imports[name.partition(".")[0]] += elapsed - children
+                if self._stack:
+                    self._stack[-1] += elapsed
+
+        return timed_import
+
+    @contextmanager
+    def phase(self, name: str):
+        original = builtins.__import__
+        if self._depth == 0:
+            builtins.__import__ = self._timed_import(original)
+        self._depth += 1
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                builtins.__import__ = original
+            self.phases.append({
+                "phase": name,
+                "seconds": round(time.perf_counter() - start, 4),
+                "modules_loaded": len(sys.modules) - modules_before,
+            })
+
+    def as_dict(self, top: int = 15) -> dict:
+        heaviest = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "phases": self.phases,
+            "imports": [{"module": name, "seconds": round(seconds, 4)} for name, seconds in heaviest],
+        }
+
+    def print(self, top: int = 10):
+        report = self.as_dict(top)
+        print(f"⏱️ Startup took {report['total_seconds']:.3f}s")
+        for phase in report["phases"]:
+            print(f"   {phase['phase']:<24} {phase['seconds']:>8.3f}s  ({phase['modules_loaded']} modules)")
+        if report["imports"]:
+            print("   slowest imports: " + ", ".join(f"{i['module']} {i['seconds']:.3f}s" for i in report["imports"]))
@@ -0,0 +1,261 @@
+# app/core/tracing.py
+"""
+Request-scoped tracing.
+
+A trace is a tree of timed spans. The current span travels in a contextvar, so
+nested `span()` blocks (and functions wrapped with `@traced()`) become its
+children without passing anything around. That includes work handed to
+`run_in_threadpool`, which copies the context into the worker thread.
+
+Every span is recorded while the request runs. The decision to keep the trace
+is made when the root span ends: a trace slower than TRACE_SLOW_MS is always
+exported, and otherwise a TRACE_SAMPLE_RATE fraction of traces are. Exporters:
+
+    jsonl   one JSON line per trace appended to TRACE_FILE (default) by a
+            writer thread
+    stdout  an indented breakdown printed to the console
+    none    tracing off; spans cost a contextvar lookup
+"""
+import functools
+import inspect
+import json
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.core.config import BASE_DIR, get_settings
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "start", "end", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def as_dict(self) -> dict:
+        item = {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "offset_ms": round((self.start - self.trace.root_start) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+        }
+        if self.attributes:
+            item["attributes"] = self.attributes
+        if self.error:
+            item["error"] = self.error
+        return item
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = secrets.token_hex(8)
+        self.timestamp = time.time()
+        self.root_start = time.perf_counter()
+        self.spans: List[Span] = []  # appended from the loop and worker threads; list.append is atomic
+
+    def as_dict(self) -> dict:
+        root = self.spans[0]
+        return {
+            "trace_id": self.trace_id,
+            "timestamp": self.timestamp,
+            "name": root.name,
+            "duration_ms": round(root.duration_ms, 3),
+            "spans": [span.as_dict() for span in self.spans],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+# ---------- Exporters ----------
+class JsonlExporter:
+    """
+    Appends one JSON line per trace. Traces are handed to a writer thread, so
+    the request that finishes a trace never waits on serializing or the disk.
+    """
+    MAX_PENDING = 1000  # traces waiting to be written; more are dropped
+
+    def __init__(self, path):
+        self.path = path
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(self.MAX_PENDING)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def export(self, trace: Trace):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+                    self._writer.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                if self.dropped == 1:
+                    print(f"⚠️ Trace writer is behind, dropping traces (more than {self.MAX_PENDING} queued)")
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:  # whatever queued up meanwhile goes into the same append
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            traces = [trace for trace in batch if trace is not None]
+            try:
+                if traces:
+                    lines = "".join(json.dumps(trace.as_dict(), default=str) + "\n" for trace in traces)
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(lines)
+            except OSError as e:
+                print(f"Trace export failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(traces) < len(batch):  # close() was called
+                return
+
+    def flush(self):
+        """Wait until every trace exported so far is written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self, timeout: float = 5.0):
+        """Write out the queued traces and stop the writer thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join(timeout)
+
+
+class StdoutExporter:
+    def export(self, trace: Trace):
+        depth = {None: -1}
+        lines = [f"🔎 trace {trace.trace_id}"]
+        for span in trace.spans:  # parents start before their children
+            depth[span.span_id] = depth.get(span.parent_id, 0) + 1
+            error = f"  ❌ {span.error}" if span.error else ""
+            lines.append(f"   {'  ' * depth[span.span_id]}{span.name:<30} {span.duration_ms:9.1f}ms{error}")
+        print("\n".join(lines))
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                settings = get_settings()
+                if settings.trace_exporter == "stdout":
+                    _exporter = StdoutExporter()
+                elif settings.trace_exporter == "jsonl":
+                    path = settings.trace_file
+                    _exporter = JsonlExporter(path if path.is_absolute() else BASE_DIR / path)
+                else:
+                    _exporter = False
+    return _exporter
+
+
+def close():
+    """Write out traces still waiting for the jsonl writer (server shutdown)."""
+    if isinstance(_exporter, JsonlExporter):
+        _exporter.close()
+
+
+def _finish(trace: Trace):
+    exporter = get_exporter()
+    if not exporter:
+        return
+    settings = get_settings()
+    root = trace.spans[0]
+    if root.duration_ms >= settings.trace_slow_ms or random.random() < settings.trace_sample_rate:
+        try:
+            exporter.export(trace)
+        except OSError as e:
+            print(f"Trace export failed: {e}")
+
+
+# ---------- API ----------
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a child of the current span, or as the root of a new trace."""
+    if get_exporter() is False:
+        yield None
+        return
+    parent = _current_span.get()
+    trace = parent.trace if parent is not None else Trace()
+    current = Span(trace, name, parent.span_id if parent is not None else None, attributes)
+    if parent is None:
+        trace.root_start = current.start
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        if parent is None:
+            _finish(trace)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator: run every call of a function (sync or async) inside a span."""
+
+    def decorate(func):
+        span_name = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_attribute(key: str, value: Any):
+    """Attach a value to the current span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes[key] = value
@@ -0,0 +1,85 @@
+# app/services/chat_history.py
+"""
+Per-session chat memory with a token budget.
+
+Each conversation is stored in the shared state (so every worker sees it) as a
+compact record:
+
+    {"summary": ["Asked: ...", ...], "turns": [[user, reply, tokens], ...]}
+
+Token counts are computed once, when a turn is added. After each turn the
+record is compacted: the oldest turns are dropped until the rest fit in
+CHAT_HISTORY_TOKENS, and each dropped turn leaves a one-line note of what was
+asked in the summary, itself capped at CHAT_SUMMARY_TOKENS. Every request
+therefore sends at most the system prompt + summary + history budget + the new
+message, however long the conversation gets.
+"""
+from typing import Dict, List
+
+from app.core.config import get_settings
+from app.core.shared_state import get_state
+from app.services import tokens
+
+HISTORY_KEY = "chat:history:{}"
+SUMMARY_LINE_TOKENS = 30  # how much of a dropped question its summary line keeps
+
+
+def _empty() -> dict:
+    return {"summary": [], "turns": []}
+
+
+async def load(session_id: str) -> dict:
+    return await get_state().get(HISTORY_KEY.format(session_id), None) or _empty()
+
+
+async def clear(session_id: str):
+    await get_state().delete(HISTORY_KEY.format(session_id))
+
+
+async def append(session_id: str, user_message: str, reply: str, history: dict = None) -> dict:
+    """
+    Add a turn and store the compacted history. Pass the `history` the prompt
+    was built from to save a read (concurrent messages in one session: last
+    writer wins).
+    """
+    settings = get_settings()
+    history = history if history is not None else await load(session_id)
+    turn_tokens = tokens.count_tokens(user_message) + tokens.count_tokens(reply) + 2 * tokens.TOKENS_PER_MESSAGE
+    history = {"summary": list(history["summary"]), "turns": history["turns"] + [[user_message, reply, turn_tokens]]}
+    compact(history, settings.chat_history_tokens, settings.chat_summary_tokens)
+    await get_state().set(HISTORY_KEY.format(session_id), history, ttl=settings.chat_history_ttl)
+    return history
+
+
+def compact(history: dict, history_tokens: int, summary_tokens: int):
+    """Fold the oldest turns into summary lines until the turns fit `history_tokens` (in place)."""
+    turns = history["turns"]
+    total = sum(turn[2] for turn in turns)
+    while turns and total > history_tokens:
+        user_message, _, turn_tokens = turns.pop(0)
+        total -= turn_tokens
+        question = " ".join(tokens.truncate_tokens(user_message, SUMMARY_LINE_TOKENS).split())
+        history["summary"].append(f"Asked: {question}")
+    summary = history["summary"]
+    while summary and tokens.count_tokens("\n".join(summary)) > summary_tokens:
+        summary.pop(0)
+
+
+def build_messages(system_prompt: str, history: dict, user_message: str) -> List[Dict[str, str]]:
+    """Chat completion messages: system prompt, summary of older turns, recent turns, new message."""
+    messages = [{"role": "system", "content": system_prompt}]
+    if history["summary"]:
+        messages.append({
+            "role": "system",
+            "content": "Earlier in this conversation the user:\n" + "\n".join(history["summary"]),
+        })
+    for user_message_before, reply, _ in history["turns"]:
+        messages.append({"role": "user", "content": user_message_before})
+        messages.append({"role": "assistant", "content": reply})
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+def as_turns(history: dict) -> List[Dict[str, str]]:
+    """The stored turns for display."""
+    return [{"user": user_message, "reply": reply} for user_message, reply, _ in history["turns"]]
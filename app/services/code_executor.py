@@ -0,0 +1,314 @@
+# app/services/code_executor.py
+"""
+Staging helpers for running workspace code.
+
+A run only needs the entry script plus the local modules it (transitively)
+imports, so instead of copying the workspace we read the import statements
+from the AST and stage just that closure into a scratch directory. The scratch
+directory lives on a RAM-backed filesystem when the platform provides one.
+
+Sources are compiled in this process before a run starts, so a syntax error
+is reported without starting an interpreter. The bytecode is cached by
+content hash and staged as hash-based, unchecked .pyc files (PEP 552) in
+__pycache__: the run loads it as is and never recompiles an unchanged file.
+The entry script is started through pyc_runner.py, which runs its bytecode
+with __file__ and sys.argv[0] still pointing at the staged .py.
+"""
+import ast
+import hashlib
+import importlib.util
+import marshal
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core import metrics
+from app.core.config import get_settings
+
+# (level, module, names) for every import statement in a file
+ImportSpec = Tuple[int, str, Tuple[str, ...]]
+
+# path -> ((mtime_ns, size), imports), least recently used first. Parsing is
+# the expensive part of staging, so unchanged files are never re-parsed.
+_import_cache: "OrderedDict[Path, Tuple[Tuple[int, int], Tuple[ImportSpec, ...]]]" = OrderedDict()
+_import_lock = threading.Lock()
+IMPORT_CACHE_ENTRIES = 4096
+
+# (filename, sha256 of source) -> .pyc contents, least recently used first
+_bytecode_cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+_bytecode_lock = threading.Lock()
+BYTECODE_CACHE_ENTRIES = 1024
+PYC_UNCHECKED_HASH = (0b01).to_bytes(4, "little")  # PEP 552 flags: hash-based, source not checked
+
+_FICLONE = 0x40049409  # linux/fs.h: reflink a whole file (btrfs, xfs, ...)
+
+
+def ram_temp_root() -> Optional[str]:
+    """Return a writable RAM-backed directory for scratch runs, or None to use the default."""
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return None
+
+
+def make_run_dir(prefix: str = "run_workspace_") -> Path:
+    """Create a per-run scratch directory, preferring tmpfs over disk."""
+    return Path(tempfile.mkdtemp(prefix=prefix, dir=ram_temp_root()))
+
+
+def remove_run_dir(run_dir: Path):
+    """Best-effort cleanup of a scratch directory."""
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def parse_imports(path: Path) -> Tuple[ImportSpec, ...]:
+    """Return the import statements of a python file (cached on mtime + size)."""
+    st = path.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    with _import_lock:
+        cached = _import_cache.get(path)
+        if cached is not None and cached[0] == key:
+            _import_cache.move_to_end(path)
+            return cached[1]
+
+    specs: List[ImportSpec] = []
+    try:
+        tree = ast.parse(path.read_bytes(), filename=str(path))
+    except (SyntaxError, ValueError):
+        tree = None
+    if tree is not None:
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    specs.append((0, alias.name, ()))
+            elif isinstance(node, ast.ImportFrom):
+                names = tuple(alias.name for alias in node.names if alias.name != "*")
+                specs.append((node.level, node.module or "", names))
+
+    result = tuple(specs)
+    with _import_lock:
+        _import_cache[path] = (key, result)
+        _import_cache.move_to_end(path)
+        if len(_import_cache) > IMPORT_CACHE_ENTRIES:
+            _import_cache.popitem(last=False)
+    return result
+
+
+def _module_files(base: Path, parts: Iterable[str]) -> List[Path]:
+    """
+    Files python would load for the dotted module `parts` under `base`:
+    every package __init__.py on the way down plus the module itself.
+    """
+    found: List[Path] = []
+    current = base
+    parts = list(parts)
+    for i, part in enumerate(parts):
+        pkg_init = current / part / "__init__.py"
+        if pkg_init.is_file():
+            found.append(pkg_init)
+            current = current / part
+            continue
+        module = current / f"{part}.py"
+        if i == len(parts) - 1 and module.is_file():
+            found.append(module)
+        else:
+            # not a local module (stdlib / site-packages) or namespace package
+            if not (current / part).is_dir():
+                return []
+            current = current / part
+    return found
+
+
+def local_import_closure(entry: Path, root: Optional[Path] = None) -> Set[Path]:
+    """
+    Resolve the set of local python files needed to run `entry`.
+
+    `root` is the directory python puts on sys.path for the script (the
+    script's own directory by default); only files under it are considered.
+    """
+    root = (root or entry.parent).resolve()
+    entry = entry.resolve()
+    needed: Set[Path] = {entry}
+    pending = [entry]
+
+    while pending:
+        current = pending.pop()
+        for level, module, names in parse_imports(current):
+            if level:
+                base = current.parent
+                for _ in range(level - 1):
+                    base = base.parent
+            else:
+                base = root
+            mod_parts = module.split(".") if module else []
+
+            candidates = _module_files(base, mod_parts) if mod_parts else []
+            # `from pkg import name` may name a submodule rather than an attribute
+            for name in names:
+                candidates.extend(_module_files(base, mod_parts + [name]))
+
+            for path in candidates:
+                path = path.resolve()
+                if path in needed:
+                    continue
+                try:
+                    path.relative_to(root)
+                except ValueError:
+                    continue
+                needed.add(path)
+                pending.append(path)
+    return needed
+
+
+def _can_reflink(src_root: Path, run_dir: Path) -> bool:
+    """Reflinks only work within one filesystem; checked once per run directory."""
+    try:
+        return os.stat(src_root).st_dev == os.stat(run_dir).st_dev
+    except OSError:
+        return False
+
+
+def _clone_file(src: Path, dst: Path, reflink: bool = True):
+    """Copy `src` to `dst` with a copy-on-write reflink when `reflink` and possible."""
+    if reflink:
+        try:
+            import fcntl
+
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            return
+        except (ImportError, OSError):
+            # a filesystem without reflink support
+            pass
+    # shutil.copyfile uses sendfile()/copy_file_range() on Linux, so the data
+    # still never passes through userspace.
+    shutil.copyfile(src, dst)
+
+
+def stage_files(entries: Iterable[Path], run_dir: Path, base: Path):
+    """
+    Stage several entry scripts and the union of their local imports into
+    `run_dir`, laid out relative to `base` (which must contain every entry).
+    Imports resolve like test_worker's sys.path: from `base` and from the
+    entry's own directory.
+    """
+    base = base.resolve()
+    needed: Set[Path] = set()
+    for entry in entries:
+        needed |= local_import_closure(entry, base)
+        needed |= local_import_closure(entry)
+    reflink = _can_reflink(base, run_dir)
+    for path in needed:
+        target = run_dir / path.relative_to(base)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _clone_file(path, target, reflink)
+
+
+def stage_project(entry: Path, run_dir: Path, root: Optional[Path] = None) -> Path:
+    """
+    Stage `entry` and its local imports into `run_dir`, preserving their layout
+    relative to the script directory. Returns the staged entry path.
+    """
+    root = (root or entry.parent).resolve()
+    reflink = _can_reflink(root, run_dir)
+    for path in local_import_closure(entry, root):
+        target = run_dir / path.relative_to(root)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _clone_file(path, target, reflink)
+    return run_dir / entry.resolve().relative_to(root)
+
+
+# ---------- Bytecode ----------
+class CompileFailed(Exception):
+    """A staged file does not compile; carries the SyntaxError's position."""
+
+    def __init__(self, error: SyntaxError):
+        super().__init__(error.msg)
+        self.error = error
+
+    def info(self) -> dict:
+        e = self.error
+        return {
+            "filename": e.filename,
+            "line": e.lineno or 1,
+            "col": max((e.offset or 1) - 1, 0),  # 0-based, like ast col_offset
+            "end_line": e.end_lineno,
+            "end_col": e.end_offset - 1 if e.end_offset else None,
+            "message": e.msg,
+            "text": e.text.rstrip("\n") if e.text else None,
+        }
+
+
+def compile_pyc(source: bytes, filename: str) -> bytes:
+    """
+    Contents of a .pyc for `source`, compiled as `filename` (cached on the
+    content hash). Raises CompileFailed on syntax errors, and for sources the
+    server will not compile: larger than settings.max_file_bytes, or nested too deeply
+    or too big for the compiler.
+    """
+    limit = get_settings().max_file_bytes
+    if len(source) > limit:
+        metrics.BYTECODE_CACHE.labels("rejected").inc()
+        raise CompileFailed(SyntaxError(f"file is larger than {limit} bytes, not compiled", (filename, 1, 1, None)))
+    key = (filename, hashlib.sha256(source).hexdigest())
+    with _bytecode_lock:
+        data = _bytecode_cache.get(key)
+        if data is not None:
+            _bytecode_cache.move_to_end(key)
+    if data is not None:
+        metrics.BYTECODE_CACHE.labels("hit").inc()
+        return data
+
+    try:
+        code = compile(source, filename, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        metrics.BYTECODE_CACHE.labels("syntax_error").inc()
+        raise CompileFailed(e) from None
+    except ValueError as e:  # null bytes
+        metrics.BYTECODE_CACHE.labels("syntax_error").inc()
+        raise CompileFailed(SyntaxError(str(e), (filename, 1, 1, None))) from None
+    except (RecursionError, MemoryError):
+        metrics.BYTECODE_CACHE.labels("rejected").inc()
+        raise CompileFailed(SyntaxError("too deeply nested or too large to compile", (filename, 1, 1, None))) from None
+    data = importlib.util.MAGIC_NUMBER + PYC_UNCHECKED_HASH + importlib.util.source_hash(source) + marshal.dumps(code)
+    metrics.BYTECODE_CACHE.labels("miss").inc()
+    with _bytecode_lock:
+        _bytecode_cache[key] = data
+        if len(_bytecode_cache) > BYTECODE_CACHE_ENTRIES:
+            _bytecode_cache.popitem(last=False)
+    return data
+
+
+def compile_closure(entry: Path, project: bool = False) -> Dict[Path, bytes]:
+    """
+    Compile `entry` (and with `project`, the local modules it imports), keyed
+    by path relative to the script directory. Raises CompileFailed for the
+    first file that does not compile.
+    """
+    root = entry.parent.resolve()
+    files = local_import_closure(entry, root) if project else {entry.resolve()}
+    compiled = {}
+    for path in sorted(files):
+        rel = path.relative_to(root)
+        compiled[rel] = compile_pyc(path.read_bytes(), rel.as_posix())
+    return compiled
+
+
+def stage_bytecode(run_dir: Path, compiled: Dict[Path, bytes]):
+    """
+    Write compiled files to __pycache__ beside their staged sources, where the
+    import system finds them for imported modules and pyc_runner for the entry
+    script (which keeps running as its .py, so __file__ and argv[0] are unchanged).
+    """
+    tag = sys.implementation.cache_tag
+    if not tag:
+        return  # no bytecode caching on this implementation; sources are compiled as usual
+    for rel, data in compiled.items():
+        target = run_dir / rel.parent / "__pycache__" / f"{rel.stem}.{tag}.pyc"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
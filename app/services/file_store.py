@@ -0,0 +1,155 @@
+# app/services/file_store.py
+"""
+Crash-safe file writes for the workspace.
+
+Content is written to a temp file in the target directory and renamed over the
+destination, so a reader (or a crash) only ever sees the old or the new file,
+never a truncated one. How hard we push data to disk is the fsync policy:
+
+    "always"  fsync the file before the rename and its directory after it
+    "file"    fsync the file only (the rename may be lost, the data is not torn)
+    "never"   leave flushing to the OS
+
+Batches write every file first, then sync, rename, and sync each touched
+directory once, instead of paying a full round of flushes per file.
+"""
+import os
+import uuid
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+
+FSYNC_POLICIES = ("always", "file", "never")
+
+TEMP_SUFFIX = ".voicecode-tmp"
+
+
+def is_temp_file(name: str) -> bool:
+    """Temp files of in-flight writes; indexes and listings should skip them."""
+    return name.endswith(TEMP_SUFFIX)
+
+
+def _policy(policy: Optional[str]) -> str:
+    policy = policy or get_settings().fsync_policy
+    if policy not in FSYNC_POLICIES:
+        raise ValueError(f"Unknown fsync policy {policy!r}, expected one of {FSYNC_POLICIES}")
+    return policy
+
+
+def fsync_dir(directory: Path):
+    """Persist a rename/unlink in `directory` (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _fsync_file(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_temp(path: Path, data: bytes, sync: bool) -> Path:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}{TEMP_SUFFIX}")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        if sync:
+            os.fsync(fd)
+    except BaseException:
+        os.close(fd)
+        tmp.unlink(missing_ok=True)
+        raise
+    os.close(fd)
+    try:
+        # keep the permissions of the file being replaced
+        os.chmod(tmp, path.stat().st_mode & 0o7777)
+    except OSError:
+        pass
+    return tmp
+
+
+def atomic_write(path: Path, data: bytes, policy: Optional[str] = None):
+    """Atomically replace `path` with `data`."""
+    policy = _policy(policy)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _write_temp(path, data, sync=policy != "never")
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if policy == "always":
+        fsync_dir(path.parent)
+
+
+def apply_batch(
+    writes: Iterable[Tuple[Path, bytes]],
+    deletes: Iterable[Path] = (),
+    policy: Optional[str] = None,
+    on_applied: Optional[Callable[[Path], None]] = None,
+) -> List[Path]:
+    """
+    Atomically write and delete a set of files. Each file individually is
+    all-or-nothing; the batch as a whole is not a transaction: if one rename
+    or delete fails, the files before it stay changed, the rest are left
+    alone and their temp files are removed, and the error is raised.
+    `on_applied` is called with each path as soon as it has changed, so
+    callers can keep indexes in step even then. Every touched directory is
+    synced once at the end under the "always" policy.
+    Returns the paths that were changed.
+    """
+    policy = _policy(policy)
+    sync = policy != "never"
+    staged: List[Tuple[Path, Path]] = []
+    changed: List[Path] = []
+    dirs: Set[Path] = set()
+    try:
+        # write everything before syncing anything so writeback can be coalesced
+        for path, data in writes:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            staged.append((_write_temp(path, data, sync=False), path))
+        if sync:
+            for tmp, _ in staged:
+                _fsync_file(tmp)
+    except BaseException:
+        for tmp, _ in staged:
+            tmp.unlink(missing_ok=True)
+        raise
+
+    def applied(path: Path):
+        changed.append(path)
+        dirs.add(path.parent)
+        if on_applied is not None:
+            on_applied(path)
+
+    pending = list(staged)
+    try:
+        while pending:
+            tmp, path = pending[0]
+            os.replace(tmp, path)
+            pending.pop(0)
+            applied(path)
+        for path in deletes:
+            path.unlink(missing_ok=True)  # deletes may come from a stale index; gone is gone
+            applied(path)
+    finally:
+        for tmp, _ in pending:
+            tmp.unlink(missing_ok=True)
+        if policy == "always":
+            for directory in dirs:
+                fsync_dir(directory)
+    return changed
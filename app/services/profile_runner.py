@@ -0,0 +1,160 @@
+# app/services/profile_runner.py
+"""
+Profiling bootstrap executed *inside* the run subprocess:
+
+    python profile_runner.py --out report.json [--top N] [--interval S] script.py
+
+The script runs as __main__ under cProfile (from its staged bytecode, via
+pyc_runner) while a background thread samples
+the main thread's stack for flame-graph style collapsed output. The report is
+written as JSON to --out so the script's own stdout/stderr stay untouched.
+Only the standard library is used here; this file must stay importable by any
+interpreter that can run the user's code.
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+import pyc_runner  # beside this file, which python put on sys.path
+
+# frames belonging to this bootstrap rather than the user's script
+_SKIP_FILES = {os.path.abspath(__file__), os.path.abspath(pyc_runner.__file__), cProfile.__file__}
+_CALIBRATION_CALLS = 20000
+
+
+def _noop():
+    pass
+
+
+def _calibrate() -> float:
+    """Seconds of profiler overhead added to each profiled function call."""
+
+    def loop():
+        for _ in range(_CALIBRATION_CALLS):
+            _noop()
+
+    start = time.perf_counter()
+    loop()
+    plain = time.perf_counter() - start
+
+    prof = cProfile.Profile()
+    start = time.perf_counter()
+    prof.runcall(loop)
+    profiled = time.perf_counter() - start
+    return max(profiled - plain, 0.0) / _CALIBRATION_CALLS
+
+
+class _StackSampler(threading.Thread):
+    """Periodically records the main thread's stack as a collapsed string."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.busy = 0.0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            start = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename not in _SKIP_FILES:
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+                self.samples += 1
+            self.busy += time.perf_counter() - start
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _entries(stats: pstats.Stats, key: int, top: int):
+    """Top `top` functions ordered by column `key` of the pstats tuple (2=self, 3=cumulative)."""
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _callers) in stats.stats.items():
+        if filename in _SKIP_FILES or "_lsprof.Profiler" in func:
+            continue
+        rows.append({
+            "function": func,
+            "filename": os.path.basename(filename) if filename != "~" else "<built-in>",
+            "line": line,
+            "calls": nc,
+            "primitive_calls": cc,
+            "self_time": round(tt, 6),
+            "cumulative_time": round(ct, 6),
+        })
+    field = "self_time" if key == 2 else "cumulative_time"
+    rows.sort(key=lambda r: r[field], reverse=True)
+    return rows[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.005)
+    parser.add_argument("script")
+    args = parser.parse_args(argv)
+
+    per_call = _calibrate()
+
+    # make the script look like it was started directly
+    script = os.path.abspath(args.script)
+    sys.argv = [script]
+    sys.path[0] = os.path.dirname(script)
+
+    sampler = _StackSampler(threading.get_ident(), args.interval)
+    prof = cProfile.Profile()
+    exit_code = 0
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        prof.runcall(pyc_runner.run_script, script)
+    except SystemExit as exc:
+        exit_code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    stats = pstats.Stats(prof)
+    estimated = per_call * stats.total_calls + sampler.busy
+    report = {
+        "wall_time": round(wall, 6),
+        "total_calls": stats.total_calls,
+        "by_cumulative": _entries(stats, 3, args.top),
+        "by_self": _entries(stats, 2, args.top),
+        "collapsed": "\n".join(f"{stack} {count}" for stack, count in sampler.stacks.most_common()),
+        "overhead": {
+            "per_call_seconds": per_call,
+            "sampler_seconds": round(sampler.busy, 6),
+            "samples": sampler.samples,
+            "estimated_seconds": round(estimated, 6),
+            "estimated_percent": round(100.0 * estimated / wall, 2) if wall else 0.0,
+        },
+    }
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(report, fh)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# app/services/prompt_builder.py
+"""
+Prompts for voice code generation.
+
+The system prompt is a constant: the same bytes start every request, so the
+upstream provider can serve that prefix from its prompt cache, and its token
+count is computed once. Everything that varies (language, command) goes in the
+user message after it.
+
+`max_tokens` follows the intent of the command: a one-line snippet does not
+get the budget of a whole algorithm. The table is ordered, first match wins,
+and every budget is capped at VOICE_MAX_TOKENS.
+"""
+from functools import lru_cache
+from typing import Dict, List, NamedTuple
+
+from app.core.config import get_settings
+from app.services import tokens
+
+SYSTEM_PROMPT = """You are a helpful coding assistant. When given voice commands, generate appropriate code snippets in the language the user names.
+
+Rules:
+1. Always provide clean, working code
+2. Include helpful comments
+3. Use proper syntax for the specified language
+4. If the command is unclear, ask for clarification
+5. Keep responses concise but informative
+
+Common voice commands and their expected outputs:
+- "create function" → Generate a function template
+- "add loop" → Generate a loop structure
+- "print something" → Generate print/output statements
+- "if statement" → Generate conditional logic
+- "fix errors" → Provide debugging suggestions
+- "add comments" → Add explanatory comments
+- "for loop" → Generate a for loop
+- "while loop" → Generate a while loop
+- "class" → Generate a class template
+- "import" → Generate import statements"""
+
+# (intent, keywords, max_tokens); first match wins, "snippet" when nothing matches
+INTENTS = [
+    ("program", ["sort", "search", "fibonacci", "palindrome", "prime", "factorial", "algorithm",
+                 "api", "endpoint", "data structure", "unit test", "error handling", "validation"], 500),
+    ("explain", ["explain", "fix", "debug", "error", "optimize", "why", "review"], 400),
+    ("definition", ["function", "class", "method"], 300),
+]
+SNIPPET_MAX_TOKENS = 150
+# Constructs that make a command unambiguously a request for code (see is_code_request)
+SNIPPET_KEYWORDS = ["loop", "print", "if statement", "variable", "list", "dictionary", "array", "string",
+                    "import", "lambda"]
+COMMAND_TOKENS = 200  # a voice command longer than this is cut
+
+
+class Prompt(NamedTuple):
+    messages: List[Dict[str, str]]
+    max_tokens: int
+    intent: str
+    prompt_tokens: int  # as counted locally; the API's own count is in its `usage`
+
+
+def classify_intent(command_lower: str):
+    """(intent, max_tokens) of a code-generation command"""
+    for intent, keywords, max_tokens in INTENTS:
+        if any(keyword in command_lower for keyword in keywords):
+            return intent, max_tokens
+    return "snippet", SNIPPET_MAX_TOKENS
+
+
+def is_code_request(command_lower: str) -> bool:
+    """Whether a command names something to write, not just falls through to code generation"""
+    keywords = SNIPPET_KEYWORDS + [keyword for _, words, _ in INTENTS for keyword in words]
+    return any(keyword in command_lower for keyword in keywords)
+
+
+@lru_cache(maxsize=None)
+def system_prompt_tokens() -> int:
+    return tokens.count_tokens(SYSTEM_PROMPT)
+
+
+def build_code_prompt(command_lower: str, language: str) -> Prompt:
+    intent, max_tokens = classify_intent(command_lower)
+    command = tokens.truncate_tokens(command_lower, COMMAND_TOKENS)
+    user_content = (
+        f"Language: {language}\n"
+        f"Voice command: '{command}'. Please generate appropriate {language} code and provide a brief explanation."
+    )
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_content},
+    ]
+    prompt_tokens = (
+        tokens.TOKENS_PER_REPLY + 2 * tokens.TOKENS_PER_MESSAGE + system_prompt_tokens() + tokens.count_tokens(user_content)
+    )
+    return Prompt(messages, min(max_tokens, get_settings().voice_max_tokens), intent, prompt_tokens)
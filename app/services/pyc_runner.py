@@ -0,0 +1,70 @@
+# app/services/pyc_runner.py
+"""
+Bootstrap executed *inside* the run subprocess:
+
+    python pyc_runner.py script.py [args...]
+
+Runs `script.py` as __main__ from the bytecode staged for it in
+__pycache__/<name>.<cache tag>.pyc (see code_executor.stage_bytecode), so the
+entry script is not recompiled, while `__file__` and `sys.argv[0]` stay the
+script's own path exactly as with `python script.py`. Without usable bytecode
+the source is compiled as usual. Only the standard library is used here; this
+file must stay importable by any interpreter that can run the user's code.
+"""
+import _imp
+import importlib.util
+import marshal
+import os
+import sys
+import traceback
+import types
+
+_HEADER_BYTES = 16  # magic, flags, source hash (PEP 552)
+
+
+def load_code(script: str) -> types.CodeType:
+    """The code object of `script`, from its staged .pyc when there is a valid one."""
+    try:
+        cached = importlib.util.cache_from_source(script)
+        with open(cached, "rb") as fh:
+            data = fh.read()
+        if data[:4] == importlib.util.MAGIC_NUMBER:
+            code = marshal.loads(data[_HEADER_BYTES:])
+            _imp._fix_co_filename(code, script)  # as the import system does for cached modules
+            return code
+    except (NotImplementedError, OSError, ValueError, EOFError):
+        pass  # no cache tag on this implementation, nothing staged, or a bad file
+    with open(script, "rb") as fh:
+        return compile(fh.read(), script, "exec", dont_inherit=True)
+
+
+def run_script(script: str):
+    """Execute `script` as the __main__ module, like `python script.py` would."""
+    code = load_code(script)
+    main = types.ModuleType("__main__")
+    main.__file__ = script
+    main.__builtins__ = __builtins__
+    sys.modules["__main__"] = main
+    exec(code, main.__dict__)
+
+
+def main():
+    script = os.path.abspath(sys.argv[1])
+    # make the script look like it was started directly
+    sys.argv = [script, *sys.argv[2:]]
+    sys.path[0] = os.path.dirname(script)
+    try:
+        run_script(script)
+    except SystemExit:
+        raise
+    except BaseException as e:
+        # report as python would, without this bootstrap's own frames
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename == __file__:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# app/services/search_index.py
+"""
+Trigram index for full-text search over workspace files.
+
+Every indexed file contributes the set of 3-character substrings of its
+lower-cased text to a posting list. A query is narrowed to the files that
+contain all trigrams of its required literal text, and only those candidates
+are scanned to confirm matches and compute line/column positions. The index is
+fed incrementally by WorkspaceIndex change notifications.
+"""
+import bisect
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+try:  # python 3.11+
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_constants
+    import sre_parse
+
+MAX_FILE_SIZE = 1 << 20  # larger files (and binary files) are not indexed
+
+
+def trigrams(text: str) -> Set[str]:
+    return set(map("".join, zip(text, text[1:], text[2:])))
+
+
+def line_trigrams(text: str) -> Set[str]:
+    """Trigrams of each distinct line; trigrams spanning a newline are not indexed."""
+    grams: Set[str] = set()
+    for line in set(text.splitlines()):
+        grams.update(map("".join, zip(line, line[1:], line[2:])))
+    return grams
+
+
+def _literal_runs(parsed) -> List[str]:
+    """Literal strings every match of a parsed regex must contain (best effort)."""
+    runs: List[str] = []
+    current: List[str] = []
+    for op, arg in parsed:
+        if op is sre_constants.LITERAL:
+            current.append(chr(arg))
+            continue
+        if current:
+            runs.append("".join(current))
+            current = []
+        if op is sre_constants.SUBPATTERN:
+            # a plain group: (group, add_flags, del_flags, pattern)
+            runs.extend(_literal_runs(arg[-1]))
+        elif op is sre_constants.MAX_REPEAT or op is sre_constants.MIN_REPEAT:
+            low, _high, sub = arg
+            if low >= 1:
+                runs.extend(_literal_runs(sub))
+    if current:
+        runs.append("".join(current))
+    return runs
+
+
+def required_trigrams(query: str, regex: bool) -> Set[str]:
+    """Trigrams (lower-cased) that any matching file is guaranteed to contain."""
+    if regex:
+        try:
+            runs = _literal_runs(sre_parse.parse(query))
+        except Exception:
+            return set()
+    else:
+        runs = [query]
+    required: Set[str] = set()
+    for run in runs:
+        for line in run.lower().splitlines():
+            required |= trigrams(line)
+    return required
+
+
+class _IndexedFile:
+    __slots__ = ("text", "lower", "grams", "_line_starts")
+
+    def __init__(self, text: str):
+        self.text = text
+        lower = text.lower()
+        # str.find on the lowered text is much faster than an IGNORECASE regex,
+        # but only usable when lowering keeps every offset in place
+        self.lower = lower if len(lower) == len(text) else None
+        self.grams = line_trigrams(lower)
+        self._line_starts: Optional[List[int]] = None
+
+    def find_all(self, needle: str, case_sensitive: bool):
+        """Start offsets of a literal needle (None if the caller must fall back to a regex)."""
+        if case_sensitive:
+            haystack = self.text
+        elif self.lower is not None:
+            haystack, needle = self.lower, needle.lower()
+        else:
+            return None
+        offsets = []
+        pos = haystack.find(needle)
+        while pos != -1:
+            offsets.append(pos)
+            pos = haystack.find(needle, pos + 1)
+        return offsets
+
+    @property
+    def line_starts(self) -> List[int]:
+        if self._line_starts is None:
+            starts = [0]
+            find = self.text.find
+            pos = find("\n")
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = find("\n", pos + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    def line(self, number: int) -> str:
+        starts = self.line_starts
+        end = starts[number + 1] - 1 if number + 1 < len(starts) else len(self.text)
+        return self.text[starts[number]:end].rstrip("\r")
+
+
+class TrigramIndex:
+    def __init__(self, root: Path):
+        self.root = root.resolve()
+        self._files: Dict[str, _IndexedFile] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, rel_path: str, entry=None):
+        """WorkspaceIndex listener: (re)index a file, or drop it when entry is None."""
+        indexed = None
+        if entry is not None and entry.size <= MAX_FILE_SIZE:
+            try:
+                indexed = _IndexedFile((self.root / rel_path).read_text(encoding="utf-8"))
+            except (OSError, UnicodeDecodeError):
+                indexed = None
+        with self._lock:
+            old = self._files.pop(rel_path, None)
+            if old is not None:
+                for gram in old.grams:
+                    posting = self._postings.get(gram)
+                    if posting is not None:
+                        posting.discard(rel_path)
+                        if not posting:
+                            del self._postings[gram]
+            if indexed is not None:
+                self._files[rel_path] = indexed
+                for gram in indexed.grams:
+                    self._postings.setdefault(gram, set()).add(rel_path)
+
+    def _candidates(self, required: Set[str], prefix: str) -> List[str]:
+        with self._lock:
+            if required:
+                postings = sorted((self._postings.get(g, set()) for g in required), key=len)
+                files = set(postings[0])
+                for posting in postings[1:]:
+                    files &= posting
+                    if not files:
+                        break
+            else:
+                files = set(self._files)
+        return sorted(f for f in files if f.startswith(prefix))
+
+    def search(
+        self,
+        query: str,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        context: int = 0,
+        limit: int = 100,
+        prefix: str = "",
+    ) -> dict:
+        """
+        Find matches of `query` (literal, or a regex with `regex=True`). Raises
+        re.error for invalid patterns. Line and column numbers are 1-based.
+        """
+        start = time.perf_counter()
+        flags = 0 if case_sensitive else re.IGNORECASE
+        pattern = re.compile(query if regex else re.escape(query), flags | re.MULTILINE)
+
+        candidates = self._candidates(required_trigrams(query, regex), prefix)
+        matches = []
+        for rel in candidates:
+            indexed = self._files.get(rel)
+            if indexed is None:
+                continue
+            offsets = indexed.find_all(query, case_sensitive) if not regex and query else None
+            if offsets is None:
+                offsets = [m.start() for m in pattern.finditer(indexed.text) if m.start() != m.end()]
+            for offset in offsets:
+                starts = indexed.line_starts
+                line = bisect.bisect_right(starts, offset) - 1
+                matches.append({
+                    "file": rel,
+                    "line": line + 1,
+                    "column": offset - starts[line] + 1,
+                    "text": indexed.line(line),
+                    "before": [indexed.line(i) for i in range(max(0, line - context), line)],
+                    "after": [indexed.line(i) for i in range(line + 1, min(len(starts), line + 1 + context))],
+                })
+                if len(matches) >= limit:
+                    break
+            if len(matches) >= limit:
+                break
+
+        return {
+            "query": query,
+            "matches": matches,
+            "truncated": len(matches) >= limit,
+            "files_indexed": len(self._files),
+            "files_scanned": len(candidates),
+            "took_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
@@ -0,0 +1,153 @@
+# app/services/snapshots.py
+"""
+Content-addressed workspace snapshots.
+
+File contents are stored once per distinct sha256 as zlib-compressed blobs
+under `objects/ab/cdef...`, and a snapshot is only a small JSON manifest
+mapping relative paths to blob hashes. Taking a snapshot reuses the hashes the
+WorkspaceIndex already keeps, so only files whose content is not yet in the
+store are read and compressed: cost follows what changed, not workspace size.
+"""
+import difflib
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services import file_store
+from app.services.workspace_index import FileEntry
+
+Manifest = Dict[str, str]  # relative path -> sha256
+
+
+class SnapshotNotFound(KeyError):
+    pass
+
+
+class SnapshotStore:
+    def __init__(self, store_dir: Path, workspace: Path):
+        self.store_dir = store_dir
+        self.workspace = workspace.resolve()
+        self.objects_dir = store_dir / "objects"
+        self.snapshots_dir = store_dir / "snapshots"
+        self._known: Optional[set] = None  # blob hashes present on disk
+        self._lock = threading.Lock()
+
+    # ---------- blobs ----------
+    def _blob_path(self, sha: str) -> Path:
+        return self.objects_dir / sha[:2] / sha[2:]
+
+    def _known_blobs(self) -> set:
+        if self._known is None:
+            known = set()
+            if self.objects_dir.exists():
+                for sub in self.objects_dir.iterdir():
+                    if sub.is_dir():
+                        known.update(sub.name + name for name in os.listdir(sub) if not file_store.is_temp_file(name))
+            self._known = known
+        return self._known
+
+    def _store_blob(self, data: bytes) -> str:
+        sha = hashlib.sha256(data).hexdigest()
+        known = self._known_blobs()
+        if sha not in known:
+            file_store.atomic_write(self._blob_path(sha), zlib.compress(data, 6))
+            known.add(sha)
+        return sha
+
+    def read_blob(self, sha: str) -> bytes:
+        return zlib.decompress(self._blob_path(sha).read_bytes())
+
+    # ---------- snapshots ----------
+    def create(self, entries: Iterable[Tuple[str, FileEntry]], message: str = "") -> dict:
+        """
+        Snapshot the workspace from (relative path, FileEntry) pairs as kept by
+        WorkspaceIndex. Returns the manifest summary including how many blobs
+        were newly stored.
+        """
+        files: Manifest = {}
+        new_blobs = 0
+        with self._lock:
+            known = self._known_blobs()
+            for rel, entry in entries:
+                if entry.sha256 in known:
+                    files[rel] = entry.sha256
+                    continue
+                try:
+                    data = (self.workspace / rel).read_bytes()
+                except OSError:
+                    continue  # deleted since it was indexed
+                # hash what we actually read, in case the file moved on since indexing
+                files[rel] = self._store_blob(data)
+                new_blobs += 1
+
+            created = time.time()
+            body = json.dumps(files, sort_keys=True).encode()
+            snapshot_id = f"{int(created * 1000):012x}-{hashlib.sha256(body).hexdigest()[:8]}"
+            manifest = {"id": snapshot_id, "created": created, "message": message, "files": files}
+            file_store.atomic_write(self.snapshots_dir / f"{snapshot_id}.json", json.dumps(manifest).encode())
+        return self._summary(manifest, new_blobs=new_blobs)
+
+    def list(self) -> List[dict]:
+        if not self.snapshots_dir.exists():
+            return []
+        ids = sorted((p.stem for p in self.snapshots_dir.glob("*.json")), reverse=True)
+        return [self._summary(self.get(snapshot_id)) for snapshot_id in ids]
+
+    def get(self, snapshot_id: str) -> dict:
+        path = self.snapshots_dir / f"{snapshot_id}.json"
+        if "/" in snapshot_id or "\\" in snapshot_id or not path.is_file():
+            raise SnapshotNotFound(snapshot_id)
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    @staticmethod
+    def _summary(manifest: dict, **extra) -> dict:
+        return {
+            "id": manifest["id"],
+            "created": manifest["created"],
+            "message": manifest.get("message", ""),
+            "file_count": len(manifest["files"]),
+            **extra,
+        }
+
+    # ---------- diff / restore ----------
+    @staticmethod
+    def diff_manifests(old: Manifest, new: Manifest) -> dict:
+        return {
+            "added": sorted(set(new) - set(old)),
+            "removed": sorted(set(old) - set(new)),
+            "modified": sorted(rel for rel in set(old) & set(new) if old[rel] != new[rel]),
+        }
+
+    def unified_diff(self, rel: str, old_sha: Optional[str], new_sha: Optional[str], new_path: Optional[Path] = None) -> str:
+        """Text diff of one file between two blobs (or a blob and a workspace file)."""
+        def lines(sha: Optional[str], path: Optional[Path] = None) -> List[str]:
+            if path is not None:
+                data = path.read_bytes()
+            elif sha is not None:
+                data = self.read_blob(sha)
+            else:
+                return []
+            return data.decode("utf-8", "replace").splitlines(keepends=True)
+
+        return "".join(difflib.unified_diff(
+            lines(old_sha), lines(new_sha, new_path), fromfile=f"a/{rel}", tofile=f"b/{rel}",
+        ))
+
+    def restore_plan(self, snapshot_id: str, current: Manifest, delete_extra: bool = True):
+        """
+        What restoring `snapshot_id` over the `current` workspace manifest takes:
+        (writes as [(path, bytes)], deletes as [path]). Unchanged files are skipped.
+        """
+        files: Manifest = self.get(snapshot_id)["files"]
+        changes = self.diff_manifests(current, files)
+        writes = [
+            (self.workspace / rel, self.read_blob(files[rel]))
+            for rel in changes["added"] + changes["modified"]
+        ]
+        deletes = [self.workspace / rel for rel in changes["removed"]] if delete_extra else []
+        return writes, deletes
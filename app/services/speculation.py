@@ -0,0 +1,169 @@
+# app/services/speculation.py
+"""
+Speculative LLM prefetch from partial voice transcripts.
+
+The browser sends interim transcripts to POST /voice/partial while the user is
+still speaking. Once one is clearly a code-generation command, its LLM request
+starts right away instead of after the final transcript has arrived and been
+routed. When the final command comes in:
+
+    same command (ignoring case and punctuation)  hit: use the speculative
+        result, awaiting it if it is still in flight
+    different command                             the speculation is wasted
+        and cancelled; the normal call runs
+
+A speculation nobody claims within SPECULATION_TTL seconds is wasted too.
+Each session may waste SPECULATION_MAX_WASTED calls per
+SPECULATION_WASTED_WINDOW (counted from its first waste) before speculation is
+paused for it, so a user whose partials rarely match the final command cannot
+multiply the LLM bill.
+
+In-flight speculations live in the worker that started them. Finished
+results are also put in the shared state, so a final transcript handled by
+another worker can still use them. Outcomes are counted in
+voice_speculation_total and by `stats()`.
+"""
+import asyncio
+import hashlib
+import re
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.shared_state import get_state
+
+RESULT_KEY = "voice:speculation:result:{}:{}"
+WASTED_KEY = "voice:speculation:wasted:{}"
+
+Fetch = Callable[[], Awaitable[dict]]
+
+
+def speculation_key(command: str, language: str) -> str:
+    """Commands that differ only in case, punctuation or spacing get the same answer."""
+    words = re.sub(r"[^\w\s]", " ", command.lower()).split()
+    return f"{language}:{' '.join(words)}"
+
+
+def _digest(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class Speculation:
+    __slots__ = ("key", "task", "expiry")
+
+    def __init__(self, key: str, task: asyncio.Task, expiry: asyncio.TimerHandle):
+        self.key = key
+        self.task = task
+        self.expiry = expiry
+
+
+class Speculator:
+    def __init__(self):
+        self._sessions: Dict[str, Speculation] = {}
+
+    # ---------- partial transcripts ----------
+    async def offer(self, session_id: str, command_lower: str, language: str, fetch: Fetch) -> str:
+        """
+        Speculate on a partial transcript already known to be a code command.
+        Returns what happened: started, running (same command already in
+        flight), too_short, over_budget or disabled.
+        """
+        settings = get_settings()
+        if not settings.speculation_enabled:
+            return "disabled"
+        if len(command_lower.split()) < settings.speculation_min_words:
+            return "too_short"
+        key = speculation_key(command_lower, language)
+        current = self._sessions.get(session_id)
+        if current is not None:
+            if current.key == key:
+                return "running"
+            await self._discard(session_id, current)
+        if await get_state().get(WASTED_KEY.format(session_id), 0) >= settings.speculation_max_wasted:
+            metrics.SPECULATION.labels("over_budget").inc()
+            return "over_budget"
+
+        task = asyncio.create_task(self._run(session_id, key, fetch))
+        task.add_done_callback(_count_failure)
+        expiry = asyncio.get_running_loop().call_later(settings.speculation_ttl, self._expire, session_id, key)
+        self._sessions[session_id] = Speculation(key, task, expiry)
+        metrics.SPECULATION.labels("started").inc()
+        return "started"
+
+    async def _run(self, session_id: str, key: str, fetch: Fetch) -> dict:
+        result = await fetch()
+        await get_state().set(RESULT_KEY.format(session_id, _digest(key)), result, ttl=get_settings().speculation_ttl)
+        return result
+
+    # ---------- final transcripts ----------
+    async def claim(self, session_id: str, command_lower: str, language: str) -> Optional[dict]:
+        """The speculative result for the final command, or None to make the call normally."""
+        key = speculation_key(command_lower, language)
+        current = self._sessions.get(session_id)
+        if current is not None and current.key != key:
+            await self._discard(session_id, current)
+            current = None
+        if current is not None:
+            self._forget(session_id, current)
+            try:
+                result = await current.task
+            except Exception:
+                metrics.SPECULATION.labels("failed").inc()
+                return None
+            await get_state().delete(RESULT_KEY.format(session_id, _digest(key)))
+            metrics.SPECULATION.labels("hit").inc()
+            return result
+
+        # finished by another worker?
+        result_key = RESULT_KEY.format(session_id, _digest(key))
+        result = await get_state().get(result_key)
+        if result is not None:
+            await get_state().delete(result_key)
+            metrics.SPECULATION.labels("hit").inc()
+            return result
+        metrics.SPECULATION.labels("miss").inc()
+        return None
+
+    # ---------- waste ----------
+    def _forget(self, session_id: str, speculation: Speculation):
+        if self._sessions.get(session_id) is speculation:
+            del self._sessions[session_id]
+        speculation.expiry.cancel()
+
+    async def _discard(self, session_id: str, speculation: Speculation):
+        self._forget(session_id, speculation)
+        speculation.task.cancel()  # the HTTP call in its worker thread still finishes, unused
+        await get_state().delete(RESULT_KEY.format(session_id, _digest(speculation.key)))
+        await self._count_waste(session_id)
+
+    def _expire(self, session_id: str, key: str):
+        speculation = self._sessions.get(session_id)
+        if speculation is not None and speculation.key == key:
+            asyncio.create_task(self._discard(session_id, speculation))
+
+    async def _count_waste(self, session_id: str):
+        metrics.SPECULATION.labels("wasted").inc()
+        # atomic across workers; the window starts at the first waste and does not slide
+        await get_state().incr(WASTED_KEY.format(session_id), ttl=get_settings().speculation_wasted_window)
+
+
+def _count_failure(task: asyncio.Task):
+    """Retrieve the error of a speculation, claimed or not, so it is counted rather than logged as never retrieved."""
+    if not task.cancelled() and task.exception() is not None:
+        metrics.ERRORS.labels("speculation").inc()
+
+
+def stats() -> dict:
+    """This worker's speculation outcomes. hit_rate: share of speculative calls that were used."""
+    counts = {
+        outcome: int(metrics.SPECULATION.labels(outcome).value)
+        for outcome in ("started", "hit", "miss", "wasted", "failed", "over_budget")
+    }
+    used = counts["hit"] + counts["wasted"] + counts["failed"]
+    finals = counts["hit"] + counts["miss"] + counts["failed"]
+    counts["hit_rate"] = round(counts["hit"] / used, 3) if used else None
+    counts["coverage"] = round(counts["hit"] / finals, 3) if finals else None  # final code commands served early
+    return counts
+
+
+speculator = Speculator()
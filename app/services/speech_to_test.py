@@ -1,21 +1,31 @@
-import whisper
-import pyautogui
-import sounddevice as sd
-import numpy as np
 import queue
 import time
-import pygetwindow as gw
 import warnings
 import sys
 import threading
 
-warnings.filterwarnings("ignore", message="FP16 is not supported on CPU")
-model = whisper.load_model("base.en", device="cpu")
+from app.core import metrics
+
+# whisper/torch, numpy and the GUI automation libraries take seconds to import
+# and the model even longer to load, so they are loaded on first use instead
+# of whenever this module is imported.
+_model = None
+
+
+def get_model():
+    global _model
+    if _model is None:
+        import whisper
+
+        warnings.filterwarnings("ignore", message="FP16 is not supported on CPU")
+        _model = whisper.load_model("base.en", device="cpu")
+    return _model
+
 
 samplerate = 16000
 blocksize = 4000
 audio_queue = queue.Queue()
-audio_buffer = np.zeros((0,))
+audio_buffer = None
 stop_event = threading.Event()   # <-- thread-safe flag
 
 
@@ -24,6 +34,9 @@ def audio_callback(indata, frames, time_, status):
 
 
 def write_code(text):
+    import pyautogui
+    import pygetwindow as gw
+
     try:
         vscode_window = None
         for w in gw.getWindowsWithTitle("Visual Studio Code"):
@@ -61,6 +74,8 @@ def interpret_and_execute(command: str):
     elif "if statement" in command:
         write_code("if True:\n    print('Condition met')")
     elif "clear" in command:
+        import pyautogui
+
         pyautogui.hotkey("ctrl", "a")
         pyautogui.press("backspace")
     else:
@@ -68,20 +83,27 @@ def interpret_and_execute(command: str):
 
 
 def main():
+    import numpy as np
+    import sounddevice as sd
+
+    global audio_buffer
+    audio_buffer = np.zeros((0,))
+    model = get_model()
     print("🎙️ Listening for voice commands... (say 'stop' or press Ctrl+C to exit)")
     try:
         with sd.InputStream(samplerate=samplerate, channels=1, callback=audio_callback):
             while not stop_event.is_set():
                 while not audio_queue.empty():
                     audio_chunk = audio_queue.get()
-                    global audio_buffer
                     audio_buffer = np.concatenate((audio_buffer, audio_chunk.flatten()))
 
                 if len(audio_buffer) >= samplerate * 4:
                     audio_data = np.copy(audio_buffer).astype(np.float32)
                     audio_buffer = np.zeros((0,))
                     print("⏳ Processing command...")
+                    started = time.perf_counter()
                     result = model.transcribe(audio_data)
+                    metrics.TRANSCRIBE_SECONDS.observe(time.perf_counter() - started)
                     command = result["text"].strip()
                     print(f"🗣️ Command recognized: {command}")
                     interpret_and_execute(command)
@@ -0,0 +1,248 @@
+# app/services/static_analysis.py
+"""
+Static analysis of workspace Python files for the auto-debug feature.
+
+`analyze` runs, in order:
+
+    syntax-error      the file does not parse (nothing else is checked)
+    compile-error     parses but the compiler rejects it, e.g. `return`
+                      outside a function or `nonlocal` of an unknown name
+    unused-import     imported at module level and never used (skipped in
+                      __init__.py, where imports are usually re-exports)
+    unused-variable   assigned in a function and never read
+    unreachable-code  statements after return / raise / break / continue
+    nested-loop       a loop over the same sequence as an enclosing loop,
+                      i.e. O(n^2) work that usually wants a set or dict
+
+It is a pure function of the file name and its bytes, so `Analyzer` runs it
+in a process pool (spawned workers import this module only) and caches the
+issues by content hash: an unchanged file is never analyzed twice by the
+same server process.
+"""
+import ast
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import get_settings
+
+TERMINATORS = (ast.Return, ast.Raise, ast.Break, ast.Continue)
+SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+LOOPS = (ast.For, ast.AsyncFor)
+
+
+def _issue(rule: str, severity: str, node_or_line, message: str, suggestion: str, col: int = 0) -> dict:
+    if isinstance(node_or_line, ast.AST):
+        line, col = node_or_line.lineno, node_or_line.col_offset
+    else:
+        line = node_or_line
+    return {"line": line, "col": col, "rule": rule, "severity": severity, "message": message, "suggestion": suggestion}
+
+
+# ---------- Rules ----------
+def _unused_imports(tree: ast.Module) -> Iterator[dict]:
+    imported: Dict[str, ast.AST] = {}
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imported[alias.asname or alias.name.split(".")[0]] = node
+        elif isinstance(node, ast.ImportFrom) and node.module != "__future__":
+            for alias in node.names:
+                if alias.name != "*":
+                    imported[alias.asname or alias.name] = node
+    if not imported:
+        return
+    used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    # names listed in __all__ and string annotations count as uses
+    used.update(node.value for node in ast.walk(tree) if isinstance(node, ast.Constant) and isinstance(node.value, str))
+    for name, node in imported.items():
+        if name not in used:
+            yield _issue("unused-import", "warning", node, f"'{name}' is imported but never used",
+                         f"Remove the import of '{name}'")
+
+
+def _scope_walk(func: ast.AST) -> Iterator[ast.AST]:
+    """Nodes of a function body, not descending into nested functions or classes"""
+    stack = list(ast.iter_child_nodes(func))
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, SCOPES):
+            stack.extend(ast.iter_child_nodes(node))
+
+
+def _unused_variables(tree: ast.Module) -> Iterator[dict]:
+    for func in ast.walk(tree):
+        if not isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        assigned: Dict[str, ast.AST] = {}
+        declared = set()
+        for node in _scope_walk(func):
+            if isinstance(node, (ast.Global, ast.Nonlocal)):
+                declared.update(node.names)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+                # plain `name = ...` only; unpacking and loop targets are often intentionally unused
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name) and not target.id.startswith("_"):
+                        assigned.setdefault(target.id, target)
+        # reads in nested functions (closures) count
+        read = {node.id for node in ast.walk(func) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+        for name, node in assigned.items():
+            if name not in read and name not in declared:
+                yield _issue("unused-variable", "warning", node, f"Local variable '{name}' in {func.name}() is never used",
+                             f"Remove the assignment or use '{name}'")
+
+
+def _unreachable(tree: ast.Module) -> Iterator[dict]:
+    for node in ast.walk(tree):
+        for field in ("body", "orelse", "finalbody"):
+            block = getattr(node, field, None)
+            if not isinstance(block, list):
+                continue
+            for stmt, following in zip(block, block[1:]):
+                if isinstance(stmt, TERMINATORS):
+                    keyword = type(stmt).__name__.lower()
+                    yield _issue("unreachable-code", "warning", following, f"Code after '{keyword}' never runs",
+                                 f"Remove it or move it before the '{keyword}'")
+                    break
+
+
+def _nested_loops(tree: ast.Module) -> Iterator[dict]:
+    def visit(node: ast.AST, enclosing: Tuple[str, ...]):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, SCOPES):
+                yield from visit(child, ())
+            elif isinstance(child, LOOPS):
+                sequence = ast.dump(child.iter)
+                if sequence in enclosing:
+                    yield _issue(
+                        "nested-loop", "info", child,
+                        f"Nested loop over '{ast.unparse(child.iter)}' again: quadratic in its length",
+                        "Build a set or dict from it once and look items up instead",
+                    )
+                yield from visit(child, enclosing + (sequence,))
+            else:
+                yield from visit(child, enclosing)
+
+    yield from visit(tree, ())
+
+
+RULES = (_unused_imports, _unused_variables, _unreachable, _nested_loops)
+
+
+def analyze(path: str, source: bytes) -> List[dict]:
+    """Issues found in one file, ordered by position"""
+    try:
+        tree = ast.parse(source, filename=path)
+    except SyntaxError as e:
+        return [_issue("syntax-error", "error", e.lineno or 1, e.msg, "Fix the syntax at this position",
+                       col=max((e.offset or 1) - 1, 0))]
+    except ValueError as e:  # null bytes
+        return [_issue("syntax-error", "error", 1, str(e), "Remove the invalid characters")]
+
+    issues = []
+    try:
+        compile(tree, path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        issues.append(_issue("compile-error", "error", e.lineno or 1, e.msg, "Fix this statement",
+                             col=max((e.offset or 1) - 1, 0)))
+    for rule in RULES:
+        if rule is _unused_imports and os.path.basename(path) == "__init__.py":
+            continue
+        issues.extend(rule(tree))
+    return sorted(issues, key=lambda issue: (issue["line"], issue["col"], issue["rule"]))
+
+
+# ---------- Pool and cache ----------
+class Analyzer:
+    """Runs `analyze` in a process pool; issues are cached by file name and content hash."""
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._cache: "OrderedDict[Tuple[str, str], List[dict]]" = OrderedDict()
+
+    @property
+    def workers(self) -> int:
+        return get_settings().analysis_workers or os.cpu_count() or 1
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a server with live threads (threadpool, watchers) is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def check(self, path: str, source: bytes) -> dict:
+        """{"path", "sha256", "cached", "issues"} for one file"""
+        digest = hashlib.sha256(source).hexdigest()
+        key = (os.path.basename(path), digest)
+        issues = self._cache.get(key)
+        cached = issues is not None
+        if cached:
+            self._cache.move_to_end(key)
+        else:
+            try:
+                issues = await asyncio.wrap_future(self._get_pool().submit(analyze, path, source))
+            except BrokenProcessPool:
+                self._pool = None  # a worker died (e.g. killed for memory); start afresh next time
+                raise
+            self._cache[key] = issues
+            if len(self._cache) > get_settings().analysis_cache_size:
+                self._cache.popitem(last=False)
+        metrics.ANALYSIS_FILES.labels("hit" if cached else "miss").inc()
+        return {"path": path, "sha256": digest, "cached": cached, "issues": issues}
+
+    async def _check_file(self, root: Path, rel: str) -> dict:
+        loop = asyncio.get_running_loop()
+        try:
+            file = root / rel
+            size = (await loop.run_in_executor(None, file.stat)).st_size
+            limit = get_settings().max_file_bytes
+            if size > limit:
+                return {"path": rel, "error": f"larger than {limit} bytes, not analyzed"}
+            return await self.check(rel, await loop.run_in_executor(None, file.read_bytes))
+        except (OSError, BrokenProcessPool) as e:
+            return {"path": rel, "error": f"{type(e).__name__}: {e}"}
+
+    async def analyze_files(self, root: Path, rel_paths: List[str]) -> AsyncIterator[dict]:
+        """
+        Yield {"type": "result", ...} per file as its analysis finishes (cached
+        files first), then one {"type": "summary"}.
+        """
+        started = time.monotonic()
+        limit = asyncio.Semaphore(self.workers * 2)  # bounds the sources held in memory at once
+
+        async def bounded(rel: str) -> dict:
+            async with limit:
+                return await self._check_file(root, rel)
+
+        tasks = [asyncio.create_task(bounded(rel.replace(os.sep, "/"))) for rel in sorted(rel_paths)]
+        counts = {"files": len(tasks), "issues": 0, "errors": 0, "cached": 0}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                counts["issues"] += len(result.get("issues", ()))
+                counts["errors"] += sum(1 for issue in result.get("issues", ()) if issue["severity"] == "error")
+                counts["cached"] += bool(result.get("cached"))
+                yield {"type": "result", **result}
+        finally:
+            # also reached when the client disconnects mid-stream
+            for task in tasks:
+                task.cancel()
+        yield {"type": "summary", **counts, "wall_time": round(time.monotonic() - started, 6)}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+analyzer = Analyzer()
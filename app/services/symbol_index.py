@@ -0,0 +1,178 @@
+# app/services/symbol_index.py
+"""
+Symbol index for workspace python files.
+
+Each file is parsed with `ast` to record its function, class and variable
+definitions. Parsing happens on a background worker fed by WorkspaceIndex
+change notifications, and a file is only re-parsed when its content hash
+changes. Lookups support exact, prefix and fuzzy (subsequence) matching.
+"""
+import ast
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class Symbol(NamedTuple):
+    name: str
+    kind: str  # "function", "class", "method" or "variable"
+    file: str
+    line: int
+    column: int
+    container: Optional[str] = None  # enclosing class for methods / attributes
+
+
+def extract_symbols(source: str, rel_path: str) -> List[Symbol]:
+    """Definitions at module and class level (function bodies are not descended into)."""
+    tree = ast.parse(source, filename=rel_path)
+    symbols: List[Symbol] = []
+
+    def visit(body, container: Optional[str]):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if container else "function"
+                symbols.append(Symbol(node.name, kind, rel_path, node.lineno, node.col_offset + 1, container))
+            elif isinstance(node, ast.ClassDef):
+                symbols.append(Symbol(node.name, "class", rel_path, node.lineno, node.col_offset + 1, container))
+                visit(node.body, node.name)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    for name in ast.walk(target):
+                        if isinstance(name, ast.Name):
+                            symbols.append(Symbol(name.id, "variable", rel_path, name.lineno, name.col_offset + 1, container))
+            elif isinstance(node, (ast.If, ast.Try, ast.With)):
+                # definitions guarded by `if TYPE_CHECKING:` / try-import blocks
+                for field in ("body", "orelse", "finalbody"):
+                    visit(getattr(node, field, []) or [], container)
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body, container)
+
+    visit(tree.body, None)
+    return symbols
+
+
+def _fuzzy_score(query: str, name: str) -> Optional[int]:
+    """Lower is better; None when `query` is not a subsequence of `name`."""
+    pos = -1
+    gaps = 0
+    for ch in query:
+        nxt = name.find(ch, pos + 1)
+        if nxt == -1:
+            return None
+        gaps += nxt - pos - 1
+        pos = nxt
+    return gaps + (len(name) - len(query))
+
+
+class SymbolIndex:
+    def __init__(self, root: Path):
+        self.root = root.resolve()
+        self._by_file: Dict[str, Tuple[str, List[Symbol]]] = {}  # rel -> (sha256, symbols)
+        self._by_name: Dict[str, List[Symbol]] = {}  # lower-cased name -> symbols
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[str, Optional[str]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    # ---------- indexing ----------
+    def update(self, rel_path: str, entry=None):
+        """WorkspaceIndex listener: queue a (re)parse, or a removal when entry is None."""
+        if not rel_path.endswith(".py"):
+            return
+        self._queue.put((rel_path, entry.sha256 if entry is not None else None))
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="symbol-index", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        """Stop the background worker once it has drained the queue."""
+        if self._worker is not None:
+            self._queue.put((None, None))
+            self._worker = None
+
+    def wait_idle(self):
+        """Block until every queued file has been processed."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            rel_path, sha = self._queue.get()
+            if rel_path is None:
+                self._queue.task_done()
+                return
+            try:
+                self._apply(rel_path, sha)
+            except Exception as e:
+                print(f"Symbol index error for {rel_path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _apply(self, rel_path: str, sha: Optional[str]):
+        current = self._by_file.get(rel_path)
+        if sha is not None and current is not None and current[0] == sha:
+            return  # content unchanged, nothing to re-parse
+        symbols: List[Symbol] = []
+        if sha is not None:
+            try:
+                source = (self.root / rel_path).read_text(encoding="utf-8")
+                symbols = extract_symbols(source, rel_path)
+            except (OSError, UnicodeDecodeError, SyntaxError, ValueError):
+                # keep the last good symbols while the file is mid-edit
+                if current is not None:
+                    symbols = current[1]
+        with self._lock:
+            if current is not None:
+                for sym in current[1]:
+                    bucket = self._by_name.get(sym.name.lower())
+                    if bucket is not None:
+                        bucket[:] = [s for s in bucket if s.file != rel_path]
+                        if not bucket:
+                            del self._by_name[sym.name.lower()]
+            if sha is None:
+                self._by_file.pop(rel_path, None)
+                return
+            self._by_file[rel_path] = (sha, symbols)
+            for sym in symbols:
+                self._by_name.setdefault(sym.name.lower(), []).append(sym)
+
+    # ---------- queries ----------
+    def lookup(
+        self, query: str, kind: Optional[str] = None, limit: int = 20, max_fuzzy_score: Optional[int] = None
+    ) -> List[Symbol]:
+        """
+        Best matches for `query`: exact names first, then prefix matches, then
+        fuzzy subsequence matches (only those scoring at most `max_fuzzy_score`
+        when given). Case-insensitive; spaces match underscores so spoken names
+        ("bubble sort") find `bubble_sort`.
+        """
+        q = "_".join(query.lower().split())
+        if not q:
+            return []
+        compact = q.replace("_", "")  # "voice assistant" also finds VoiceAssistant
+        with self._lock:
+            names = [(name, list(bucket)) for name, bucket in self._by_name.items()]
+        ranked: List[Tuple[int, int, str]] = []
+        for name, _ in names:
+            if name == q:
+                ranked.append((0, 0, name))
+            elif name.startswith(q):
+                ranked.append((1, len(name), name))
+            else:
+                score = _fuzzy_score(compact, name)
+                if score is not None and (max_fuzzy_score is None or score <= max_fuzzy_score):
+                    ranked.append((2, score, name))
+        ranked.sort()
+        buckets = dict(names)
+        results: List[Symbol] = []
+        for _, _, name in ranked:
+            for sym in buckets[name]:
+                if kind is None or sym.kind == kind:
+                    results.append(sym)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def file_symbols(self, rel_path: str) -> List[Symbol]:
+        current = self._by_file.get(rel_path)
+        return list(current[1]) if current else []
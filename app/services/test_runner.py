@@ -0,0 +1,205 @@
+# app/services/test_runner.py
+"""
+Parallel test runner for workspace code.
+
+Tests are discovered statically from the AST (module-level `test_*` functions
+and `test_*` methods of `Test*` classes in `test_*.py` / `*_test.py` files),
+split into shards balanced on the durations recorded by earlier runs, and run
+by one `test_worker.py` subprocess per shard. Results are yielded as each test
+finishes.
+"""
+import ast
+import asyncio
+import heapq
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List
+
+from anyio import CancelScope
+from fastapi.concurrency import run_in_threadpool
+
+from app.services import code_executor
+from app.services.test_worker import RESULT_MARKER
+
+TEST_WORKER = str(Path(__file__).with_name("test_worker.py"))
+DEFAULT_DURATION = 0.05  # seconds assumed for tests that have never run
+
+
+def is_test_file(name: str) -> bool:
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def _takes_no_args(func: ast.AST, is_method: bool) -> bool:
+    args = func.args
+    positional = args.posonlyargs + args.args
+    required = len(positional) - len(args.defaults) - (1 if is_method else 0)
+    return required <= 0 and not any(d is None for d in args.kw_defaults)
+
+
+def discover_tests(root: Path, rel_paths: Iterable[str]) -> List[str]:
+    """
+    Return test ids for the given workspace-relative files. Tests that need
+    arguments (pytest fixtures) are not supported and are left out.
+    """
+    test_ids: List[str] = []
+    for rel in sorted(rel_paths):
+        if not is_test_file(os.path.basename(rel)):
+            continue
+        rel = rel.replace(os.sep, "/")
+        try:
+            tree = ast.parse((root / rel).read_bytes(), filename=rel)
+        except (OSError, SyntaxError, ValueError):
+            # reported as an error when the worker fails to import the module
+            test_ids.append(f"{rel}::<module>")
+            continue
+        funcs = (ast.FunctionDef, ast.AsyncFunctionDef)
+        for node in tree.body:
+            if isinstance(node, funcs) and node.name.startswith("test") and _takes_no_args(node, False):
+                test_ids.append(f"{rel}::{node.name}")
+            elif isinstance(node, ast.ClassDef) and node.name.startswith("Test"):
+                for item in node.body:
+                    if isinstance(item, funcs) and item.name.startswith("test") and _takes_no_args(item, True):
+                        test_ids.append(f"{rel}::{node.name}::{item.name}")
+    return test_ids
+
+
+class DurationStore:
+    """Last observed duration of every test id, persisted as JSON."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            self.durations: Dict[str, float] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.durations = {}
+
+    def estimate(self, test_id: str) -> float:
+        return self.durations.get(test_id, DEFAULT_DURATION)
+
+    def record(self, test_id: str, duration: float):
+        self.durations[test_id] = duration
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.durations), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def make_shards(test_ids: List[str], workers: int, store: DurationStore) -> List[List[str]]:
+    """Longest-processing-time-first: give each test to the least loaded shard."""
+    workers = max(1, min(workers, len(test_ids)))
+    heap = [(0.0, i) for i in range(workers)]
+    shards: List[List[str]] = [[] for _ in range(workers)]
+    for test_id in sorted(test_ids, key=store.estimate, reverse=True):
+        load, i = heapq.heappop(heap)
+        shards[i].append(test_id)
+        heapq.heappush(heap, (load + store.estimate(test_id), i))
+    return [shard for shard in shards if shard]
+
+
+async def _run_shard(run_dir: Path, shard: List[str], queue: asyncio.Queue, deadline: float):
+    """
+    Run one shard and put exactly one result per test id on `queue`: tests the
+    worker did not report (crash, timeout, or a failure here) become errors.
+    """
+    pending = set(shard)
+    stray: List[str] = []  # worker crash output, kept for the error message
+    reason = "worker exited before running this test"
+    proc = None
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, TEST_WORKER,
+            cwd=str(run_dir),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        proc.stdin.write(json.dumps(shard).encode())
+        proc.stdin.close()
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            line = await asyncio.wait_for(proc.stdout.readline(), remaining)
+            if not line:
+                break
+            text = line.decode("utf-8", "replace")
+            result = None
+            if text.startswith(RESULT_MARKER):
+                try:
+                    result = json.loads(text[len(RESULT_MARKER):])
+                except ValueError:
+                    pass
+            if not isinstance(result, dict) or result.get("test") not in pending:
+                # output written straight to fd 1/2 (e.g. an interpreter crash), or a mangled result
+                if len(stray) < 50:
+                    stray.append(text)
+                continue
+            pending.discard(result["test"])
+            queue.put_nowait(result)
+        await proc.wait()
+    except asyncio.TimeoutError:
+        reason = "timed out"
+    except Exception as e:
+        reason = f"test runner error: {type(e).__name__}: {e}"
+    finally:
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        # the stream waits for one result per test, so every test gets one
+        for test_id in shard:
+            if test_id in pending:
+                queue.put_nowait({"test": test_id, "outcome": "error", "duration": 0.0,
+                                  "message": reason, "output": "".join(stray)})
+
+
+async def run_tests(
+    root: Path, test_ids: List[str], workers: int, timeout: float, store: DurationStore
+) -> AsyncIterator[dict]:
+    """
+    Stage the test files with their local imports, run them in parallel shards
+    and yield {"type": "result", ...} per test followed by one {"type": "summary"}.
+    """
+    started = time.monotonic()
+    shards = make_shards(test_ids, workers, store)
+    files = sorted({root / test_id.split("::")[0] for test_id in test_ids})
+    run_dir = await run_in_threadpool(code_executor.make_run_dir, "test_workspace_")
+    counts = {"passed": 0, "failed": 0, "error": 0, "skipped": 0}
+    serial_time = 0.0
+    tasks: List[asyncio.Task] = []
+    try:
+        await run_in_threadpool(code_executor.stage_files, files, run_dir, root)
+        queue: asyncio.Queue = asyncio.Queue()
+        deadline = started + timeout
+        tasks = [asyncio.create_task(_run_shard(run_dir, shard, queue, deadline)) for shard in shards]
+        for _ in range(len(test_ids)):
+            result = await queue.get()
+            counts[result["outcome"]] = counts.get(result["outcome"], 0) + 1
+            serial_time += result["duration"]
+            if result["outcome"] != "error" or result["duration"]:
+                store.record(result["test"], result["duration"])
+            yield {"type": "result", **result}
+        await asyncio.gather(*tasks)
+    finally:
+        # also reached when the client disconnects mid-stream
+        for task in tasks:
+            task.cancel()
+        with CancelScope(shield=True):  # a disconnect cancels the stream; finish cleaning up anyway
+            await run_in_threadpool(store.save)
+            await run_in_threadpool(code_executor.remove_run_dir, run_dir)
+
+    wall = time.monotonic() - started
+    yield {
+        "type": "summary",
+        "total": len(test_ids),
+        **counts,
+        "workers": len(shards),
+        "wall_time": round(wall, 6),
+        "test_time": round(serial_time, 6),
+        "speedup": round(serial_time / wall, 2) if wall else None,
+    }
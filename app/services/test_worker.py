@@ -0,0 +1,115 @@
+# app/services/test_worker.py
+"""
+Test worker executed *inside* a run subprocess:
+
+    python test_worker.py < ids.json
+
+Reads a JSON list of test ids ("dir/test_x.py::test_name" or
+"dir/test_x.py::TestClass::test_name") from stdin, runs them one by one from
+the current directory and writes one JSON result line per test, prefixed with
+RESULT_MARKER, to the original stdout. Output the tests print themselves is
+captured per test so it cannot interleave with the result stream.
+Only the standard library is used here.
+"""
+import asyncio
+import contextlib
+import importlib.util
+import inspect
+import io
+import json
+import os
+import sys
+import time
+import traceback
+import unittest
+
+RESULT_MARKER = "\x1eRESULT "
+
+_modules = {}
+
+
+def _load_module(rel_path: str):
+    module = _modules.get(rel_path)
+    if module is None:
+        path = os.path.abspath(rel_path)
+        directory = os.path.dirname(path)
+        # like pytest's default "prepend" import mode
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+        name = "_wstest_" + rel_path.replace(os.sep, "_").replace("/", "_").replace(".", "_")
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        _modules[rel_path] = module
+    return module
+
+
+def _call(func):
+    result = func()
+    if inspect.isawaitable(result):
+        asyncio.run(result)
+
+
+def _run_one(test_id: str):
+    parts = test_id.split("::")
+    module = _load_module(parts[0])
+    if len(parts) == 2:
+        _call(getattr(module, parts[1]))
+        return
+    cls = getattr(module, parts[1])
+    if isinstance(cls, type) and issubclass(cls, unittest.TestCase):
+        result = unittest.TestResult()
+        cls(parts[2]).run(result)
+        for _, tb in result.errors:
+            raise RuntimeError(tb)
+        for _, tb in result.failures:
+            raise AssertionError(tb)
+        if result.skipped:
+            raise unittest.SkipTest(result.skipped[0][1])
+        return
+    instance = cls()
+    if hasattr(instance, "setup_method"):
+        instance.setup_method(getattr(instance, parts[2]))
+    try:
+        _call(getattr(instance, parts[2]))
+    finally:
+        if hasattr(instance, "teardown_method"):
+            instance.teardown_method(getattr(instance, parts[2]))
+
+
+def main():
+    test_ids = json.load(sys.stdin)
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1, encoding="utf-8")
+    sys.path.insert(0, os.getcwd())
+
+    for test_id in test_ids:
+        captured = io.StringIO()
+        message = ""
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured):
+                _run_one(test_id)
+            outcome = "passed"
+        except unittest.SkipTest as exc:
+            outcome, message = "skipped", str(exc)
+        except AssertionError:
+            outcome, message = "failed", traceback.format_exc()
+        except BaseException as exc:  # noqa: BLE001 - user code may raise anything
+            if type(exc).__name__ == "Skipped":  # pytest.skip()
+                outcome, message = "skipped", str(exc)
+            else:
+                outcome, message = "error", traceback.format_exc()
+        duration = time.perf_counter() - start
+        out.write(RESULT_MARKER + json.dumps({
+            "test": test_id,
+            "outcome": outcome,
+            "duration": round(duration, 6),
+            "message": message,
+            "output": captured.getvalue(),
+        }) + "\n")
+    out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# app/services/tokens.py
+"""
+Token counting for prompts sent to the LLM.
+
+Uses the tiktoken encoding of the configured model (cl100k_base for the GPT-4
+family). tiktoken downloads its BPE table on first use and caches it (set
+TIKTOKEN_CACHE_DIR to ship it with the app). If that is impossible, e.g. on an
+offline machine, counts fall back to an estimate of one token per four
+characters. The estimate is close enough for budgeting, so chat keeps working.
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.core import metrics
+from app.core.config import get_settings
+
+CHARS_PER_TOKEN = 4  # fallback estimate
+TOKENS_PER_MESSAGE = 4  # role and separators around each chat message
+TOKENS_PER_REPLY = 3  # every reply is primed with <|start|>assistant<|message|>
+
+
+@lru_cache(maxsize=None)
+def get_encoding():
+    """The tiktoken encoding for the configured model, or None when tiktoken can't load."""
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(get_settings().llm_model.split("/")[-1])
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:  # not installed, or the encoding can't be downloaded
+        print(f"⚠️ tiktoken unavailable ({type(e).__name__}), estimating token counts from text length")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Prompt tokens of a chat completion request with these messages."""
+    return TOKENS_PER_REPLY + sum(TOKENS_PER_MESSAGE + count_tokens(m["content"]) for m in messages)
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    """The longest prefix of `text` within `limit` tokens."""
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:limit * CHARS_PER_TOKEN]
+    ids = encoding.encode(text, disallowed_special=())
+    return text if len(ids) <= limit else encoding.decode(ids[:limit])
+
+
+def record_usage(caller: str, prompt_tokens: int, reply: str, usage: Optional[dict] = None) -> Dict[str, int]:
+    """
+    Add one LLM call's tokens to llm_tokens_total. The API's own `usage`
+    numbers win when it sent them; otherwise the local counts are used.
+    """
+    usage = usage or {}
+    counts = {
+        "prompt": usage.get("prompt_tokens", prompt_tokens),
+        "completion": usage["completion_tokens"] if "completion_tokens" in usage else count_tokens(reply),
+    }
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    if cached is not None:
+        counts["cached_prompt"] = cached
+    for kind, count in counts.items():
+        metrics.LLM_TOKENS.labels(caller, kind).inc(count)
+    return counts
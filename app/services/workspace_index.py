@@ -0,0 +1,249 @@
+# app/services/workspace_index.py
+"""
+In-memory index of the files under a workspace directory.
+
+The index is built once, then kept current by the file endpoints (which call
+`refresh`/`remove` after they write) and by a background watcher for edits
+made outside the API. The watcher uses `watchfiles` when it is installed and
+otherwise falls back to a periodic mtime/size scan, so listing never has to
+walk the tree on the request path.
+"""
+import bisect
+import fnmatch
+import hashlib
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core import metrics
+
+_HASH_CHUNK = 1 << 20
+
+
+class FileEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+# Called with (relative path, entry) after a change, entry is None on delete
+Listener = Callable[[str, Optional[FileEntry]], None]
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class WorkspaceIndex:
+    def __init__(self, root: Path, poll_interval: float = 2.0, ignore: Optional[Callable[[str], bool]] = None):
+        self.root = root.resolve()
+        self.poll_interval = poll_interval
+        self.ignore = ignore or (lambda name: False)  # file names never indexed
+        self.version = 0
+        self.total_bytes = 0  # maintained incrementally, for quotas
+        self._entries: Dict[str, FileEntry] = {}
+        self._sorted: List[str] = []  # keys in order, for prefix ranges and pagination
+        self._listeners: List[Listener] = []
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._built = False
+        self._token = uuid.uuid4().hex[:8]  # ETags from a previous process never match
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    # ---------- queries ----------
+    @property
+    def etag(self) -> str:
+        return f'"{self._token}-{self.version}"'
+
+    @property
+    def file_count(self) -> int:
+        return len(self._entries)
+
+    def get(self, rel_path: str) -> Optional[FileEntry]:
+        self.ensure_built()
+        return self._entries.get(rel_path)
+
+    def items(self) -> List[Tuple[str, FileEntry]]:
+        self.ensure_built()
+        with self._lock:
+            return [(key, self._entries[key]) for key in self._sorted]
+
+    def list(
+        self, prefix: str = "", pattern: Optional[str] = None, offset: int = 0, limit: Optional[int] = None
+    ) -> Tuple[List[str], int]:
+        """Return (page of relative paths, total matches) in sorted order."""
+        self.ensure_built()
+        with self._lock:
+            start = bisect.bisect_left(self._sorted, prefix)
+            stop = bisect.bisect_left(self._sorted, prefix + "\uffff") if prefix else len(self._sorted)
+            keys = self._sorted[start:stop]
+        if pattern:
+            keys = [k for k in keys if fnmatch.fnmatchcase(k, pattern)]
+        end = None if limit is None else offset + limit
+        return keys[offset:end], len(keys)
+
+    def subscribe(self, listener: Listener):
+        self._listeners.append(listener)
+
+    # ---------- updates ----------
+    def ensure_built(self):
+        if not self._built:
+            with self._build_lock:
+                if not self._built:
+                    self.build()
+
+    def build(self):
+        entries: Dict[str, FileEntry] = {}
+        for root, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if self.ignore(name):
+                    continue
+                full = Path(root) / name
+                entry = self._stat_entry(full)
+                if entry is not None:
+                    entries[self._rel(full)] = entry
+        with self._lock:
+            self._entries = entries
+            self._sorted = sorted(entries)
+            self.total_bytes = sum(entry.size for entry in entries.values())
+            self._built = True
+            self.version += 1
+        for rel, entry in entries.items():
+            self._notify(rel, entry)
+
+    def refresh(self, rel_path: str) -> Optional[FileEntry]:
+        """Re-read one file after it was written (or removed) and update the index."""
+        self.ensure_built()
+        full = self.root / rel_path
+        if self.ignore(full.name):
+            return None
+        entry = self._stat_entry(full) if full.is_file() else None
+        if entry is None:
+            self.remove(rel_path)
+            return None
+        with self._lock:
+            previous = self._entries.get(rel_path)
+            if previous == entry:
+                return entry
+            if previous is None:
+                bisect.insort(self._sorted, rel_path)
+            else:
+                self.total_bytes -= previous.size
+            self.total_bytes += entry.size
+            self._entries[rel_path] = entry
+            self.version += 1
+        self._notify(rel_path, entry)
+        return entry
+
+    def remove(self, rel_path: str):
+        with self._lock:
+            previous = self._entries.pop(rel_path, None)
+            if previous is None:
+                return
+            self.total_bytes -= previous.size
+            i = bisect.bisect_left(self._sorted, rel_path)
+            del self._sorted[i]
+            self.version += 1
+        self._notify(rel_path, None)
+
+    # ---------- watching ----------
+    def start_watching(self):
+        """Build the index (off the caller's thread) and keep it current from then on."""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="workspace-index", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch(self):
+        self.ensure_built()
+        try:
+            import watchfiles  # optional dependency
+        except ImportError:
+            self._poll_loop()
+        else:
+            self._watch_loop(watchfiles)
+
+    def _watch_loop(self, watchfiles):
+        try:
+            for changes in watchfiles.watch(self.root, stop_event=self._stop):
+                try:
+                    self._apply_changes(changes)
+                except Exception as e:
+                    # one odd path must not stop the watcher; the next rescan repairs the index
+                    self._report("watch", e)
+        except Exception as e:
+            self._report("watch", e)
+            print(f"⚠️ Watching {self.root} failed, polling every {self.poll_interval}s instead")
+            self._poll_loop()
+
+    def _apply_changes(self, changes):
+        for _, changed in changes:
+            changed = Path(changed)
+            if changed.is_dir():
+                self.rescan()
+                return
+            self.refresh(self._rel(changed))
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.rescan()
+            except Exception as e:
+                self._report("poll", e)
+
+    def rescan(self):
+        """Compare the tree against the index by mtime and size; only changed files are re-hashed."""
+        seen = set()
+        for root, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if self.ignore(name):
+                    continue
+                full = Path(root) / name
+                rel = self._rel(full)
+                seen.add(rel)
+                current = self._entries.get(rel)
+                try:
+                    st = full.stat()
+                except OSError:
+                    continue
+                if current is None or (st.st_size, st.st_mtime_ns) != (current.size, current.mtime_ns):
+                    self.refresh(rel)
+        for rel in set(self._entries) - seen:
+            self.remove(rel)
+
+    # ---------- internals ----------
+    def _rel(self, full: Path) -> str:
+        return str(full.relative_to(self.root))
+
+    def _stat_entry(self, full: Path) -> Optional[FileEntry]:
+        try:
+            st = full.stat()
+            return FileEntry(st.st_size, st.st_mtime_ns, hash_file(full))
+        except OSError:
+            return None
+
+    def _notify(self, rel_path: str, entry: Optional[FileEntry]):
+        for listener in self._listeners:
+            try:
+                listener(rel_path, entry)
+            except Exception as e:
+                self._report("listener", e, rel_path)
+
+    def _report(self, stage: str, error: Exception, rel_path: str = ""):
+        metrics.ERRORS.labels(f"workspace_index_{stage}").inc()
+        where = f" for {rel_path}" if rel_path else ""
+        print(f"⚠️ Workspace index {stage} error{where}: {type(error).__name__}: {error}")
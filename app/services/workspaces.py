@@ -0,0 +1,173 @@
+# app/services/workspaces.py
+"""
+Per-user workspaces.
+
+Every user gets a private workspace directory, placed in a hashed two-level
+shard layout (`ab/cd/<sha256 of user id>`) so no single directory grows with
+the number of users. A Workspace bundles the directory with its file index,
+search index, symbol index, snapshot store and test-duration history, so
+every operation is scoped to one user's files. Quotas are checked against the
+byte and file totals the index maintains incrementally, never by rescanning.
+Writers hold the workspace's write lock from the quota check until the
+index has the change, so concurrent writes cannot together exceed it.
+Requests without a user keep using the original shared workspace.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services import file_store, test_runner
+from app.services.search_index import TrigramIndex
+from app.services.snapshots import SnapshotStore
+from app.services.symbol_index import SymbolIndex
+from app.services.workspace_index import WorkspaceIndex
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def shard_path(user_id: str) -> Path:
+    digest = hashlib.sha256(user_id.encode("utf-8")).hexdigest()
+    return Path(digest[:2]) / digest[2:4] / digest
+
+
+class Workspace:
+    def __init__(
+        self,
+        root: Path,
+        state_dir: Path,
+        snapshots_dir: Path,
+        user_id: Optional[str] = None,
+        quota_bytes: Optional[int] = None,
+        quota_files: Optional[int] = None,
+    ):
+        settings = get_settings()
+        root.mkdir(parents=True, exist_ok=True)
+        self.root = root.resolve()
+        self.user_id = user_id
+        self.quota_bytes = quota_bytes if quota_bytes is not None else settings.workspace_quota_bytes
+        self.quota_files = quota_files if quota_files is not None else settings.workspace_quota_files
+        self.index = WorkspaceIndex(self.root, ignore=file_store.is_temp_file)
+        self.search = TrigramIndex(self.root)
+        self.symbols = SymbolIndex(self.root)
+        self.index.subscribe(self.search.update)
+        self.index.subscribe(self.symbols.update)
+        self.snapshots = SnapshotStore(snapshots_dir, self.root)
+        self.test_durations = test_runner.DurationStore(state_dir / "test_durations.json")
+        self.write_lock = threading.Lock()  # quota check + write + index update
+        self.pins = 0  # requests using the workspace; guarded by the registry's lock
+
+    def start(self):
+        self.index.start_watching()
+
+    def close(self):
+        self.index.stop_watching()
+        self.symbols.stop()
+
+    def usage(self) -> dict:
+        self.index.ensure_built()
+        return {
+            "bytes": self.index.total_bytes,
+            "files": self.index.file_count,
+            "quota_bytes": self.quota_bytes,
+            "quota_files": self.quota_files,
+        }
+
+    def check_quota(self, changes: Iterable[Tuple[str, Optional[int]]]):
+        """
+        Raise QuotaExceeded if applying `changes` ((relative path, new size or
+        None for a delete) pairs) would take the workspace over its quota.
+        Call it with `write_lock` held until the changes are applied.
+        """
+        self.index.ensure_built()
+        delta_bytes = 0
+        delta_files = 0
+        for rel, size in changes:
+            current = self.index.get(rel)
+            if current is not None:
+                delta_bytes -= current.size
+                delta_files -= 1
+            if size is not None:
+                delta_bytes += size
+                delta_files += 1
+        if delta_bytes > 0 and self.index.total_bytes + delta_bytes > self.quota_bytes:
+            raise QuotaExceeded(f"Workspace storage quota of {self.quota_bytes} bytes exceeded")
+        if delta_files > 0 and self.index.file_count + delta_files > self.quota_files:
+            raise QuotaExceeded(f"Workspace file quota of {self.quota_files} files exceeded")
+
+
+class WorkspaceRegistry:
+    """
+    Loads workspaces on demand and keeps the most recently used ones warm.
+    A workspace is pinned from acquire() to release() and is never closed by
+    eviction while pinned; the cache may run over `max_loaded` until then.
+    """
+
+    def __init__(self, default_root: Path, users_root: Path, state_root: Path, snapshots_root: Path,
+                 max_loaded: Optional[int] = None):
+        self.users_root = users_root
+        self.state_root = state_root
+        self.snapshots_root = snapshots_root
+        self.max_loaded = max_loaded or get_settings().max_loaded_workspaces
+        self.default = Workspace(default_root, state_root, snapshots_root)
+        self._loaded: "OrderedDict[str, Workspace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, user_id: Optional[str]) -> Workspace:
+        """The user's workspace, pinned until the matching release()."""
+        if not user_id:
+            return self.default
+        with self._lock:
+            ws = self._loaded.get(user_id)
+            if ws is not None:
+                self._loaded.move_to_end(user_id)
+                ws.pins += 1
+                return ws
+            shard = shard_path(user_id)
+            ws = Workspace(
+                self.users_root / shard,
+                self.state_root / "users" / shard,
+                self.snapshots_root / "users" / shard,
+                user_id=user_id,
+            )
+            ws.pins = 1
+            self._loaded[user_id] = ws
+            evicted = self._evict()
+        ws.start()
+        for old in evicted:
+            old.close()
+        return ws
+
+    def release(self, ws: Workspace):
+        if ws is self.default:
+            return
+        with self._lock:
+            ws.pins -= 1
+            evicted = self._evict()
+        for old in evicted:
+            old.close()
+
+    def _evict(self) -> List[Workspace]:
+        """Unload the least recently used unpinned workspaces over `max_loaded` (lock held)."""
+        evicted = []
+        for user_id, ws in list(self._loaded.items()):
+            if len(self._loaded) <= self.max_loaded:
+                break
+            if ws.pins == 0:
+                del self._loaded[user_id]
+                evicted.append(ws)
+        return evicted
+
+    def start(self):
+        self.default.start()
+
+    def close(self):
+        with self._lock:
+            loaded = list(self._loaded.values())
+            self._loaded.clear()
+        for ws in [self.default, *loaded]:
+            ws.close()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark.
+
+Drives the same steps as POST /login (user lookup, password check, session
+token) against the in-memory database, at increasing concurrency, and reports
+logins per second plus the worst event-loop stall seen meanwhile. `--inline`
+hashes on the event loop instead of the hash pool, to show what offloading
+buys: similar throughput, but the loop stops answering anything else.
+
+    python benchmarks/bench_login.py --users 200 --logins 400 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core import security  # noqa: E402
+from app.core.database import Database  # noqa: E402
+
+
+async def login(db: Database, email: str, password: str, inline: bool) -> str:
+    user = await db.find_user(email)
+    if inline:
+        ok = security.verify_password(password, user["password"])
+    else:
+        ok = await security.verify_password_async(password, user["password"])
+    if not ok:
+        raise RuntimeError(f"login failed for {email}")
+    return security.issue_token(str(user["_id"]), email)
+
+
+async def loop_lag_probe(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Largest delay between when a sleep should have woken up and when it did."""
+    worst = 0.0
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - expected)
+    return worst
+
+
+async def run(db: Database, emails, logins: int, concurrency: int, inline: bool):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await login(db, emails[i % len(emails)], "correct horse battery staple", inline)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return logins / elapsed, await probe
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop (for comparison)")
+    args = parser.parse_args()
+
+    db = Database("memory://")
+    await db.connect()
+    password_hash = await security.hash_password_async("correct horse battery staple")
+    emails = [f"user{i}@example.com" for i in range(args.users)]
+    for email in emails:
+        await db.create_user({"username": email, "email": email, "password": password_hash})
+
+    print(f"scrypt n={security.SCRYPT_N}, hash workers={security.HASH_WORKERS}, "
+          f"{'inline' if args.inline else 'offloaded'} hashing")
+    print(f"{'concurrency':>12} {'logins/s':>10} {'max loop lag ms':>16}")
+    for concurrency in args.concurrency:
+        rate, lag = await run(db, emails, args.logins, concurrency, args.inline)
+        print(f"{concurrency:>12} {rate:>10.1f} {lag * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test.
+
+Starts the local OpenRouter stand-in (benchmarks/mock_llm.py) and a server
+pointed at it, with an in-memory database and a scratch workspace, then drives
+a mixed workload at each concurrency level for a fixed time. Each concurrent
+client is a thread with its own keep-alive connection; it picks its next
+operation by weight:
+
+    voice   POST /voice/process with navigation, feature, file and code commands
+    files   GET /code/files, GET or PUT /code/files/{path}
+    run     POST /code/run/{path} on a small script
+    chat    POST /chat (form)
+    ws      ping/pong over a persistent /ws/ws connection
+
+It prints p50/p95/p99 latency and throughput per operation. `--save` writes
+the results as a JSON baseline; `--compare` checks a run against one and exits
+non-zero when p95 latency or throughput regresses past `--tolerance`.
+
+    python benchmarks/load_test.py --concurrency 1 8 32 --duration 10 --save benchmarks/baseline_load.json
+    python benchmarks/load_test.py --compare benchmarks/baseline_load.json
+    python benchmarks/load_test.py --url http://localhost:8000   # an already running server (real LLM!)
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import mock_llm  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+VOICE_COMMANDS = [
+    "go to home", "open menu", "go to ide", "open voice search for bubble sort",
+    "open analytics dashboard", "create new file main.py", "save file",
+    "create function", "for loop", "add a class for a linked list", "binary search",
+]
+DEFAULT_MIX = "voice=5,files=3,run=1,chat=1,ws=2"
+
+
+# ---------- Minimal WebSocket client ----------
+class WebSocketClient:
+    """Just enough RFC 6455 for text ping/pong: handshake, masked text frames, unfragmented replies."""
+
+    def __init__(self, url: str, timeout: float = 10):
+        parts = urlparse(url)
+        self.sock = socket.create_connection((parts.hostname, parts.port or 80), timeout=timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((
+            f"GET {parts.path or '/'} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        response = b""
+        while b"\r\n\r\n" not in response:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("connection closed during WebSocket handshake")
+            response += chunk
+        status_line = response.split(b"\r\n", 1)[0].decode()
+        if " 101 " not in status_line:
+            raise ConnectionError(f"WebSocket handshake failed: {status_line}")
+
+    def send_text(self, text: str):
+        payload = text.encode()
+        header = bytearray([0x81])
+        if len(payload) < 126:
+            header.append(0x80 | len(payload))
+        elif len(payload) < 1 << 16:
+            header += bytes([0x80 | 126]) + struct.pack("!H", len(payload))
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", len(payload))
+        mask = os.urandom(4)
+        self.sock.sendall(bytes(header) + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload)))
+
+    def _read(self, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("WebSocket closed")
+            data += chunk
+        return data
+
+    def recv_text(self) -> str:
+        first, second = self._read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self._read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._read(8))[0]
+        payload = self._read(length)
+        if first & 0x0F == 0x8:
+            raise ConnectionError("WebSocket closed by server")
+        return payload.decode()
+
+    def close(self):
+        self.sock.close()
+
+
+# ---------- Workload ----------
+class Client:
+    def __init__(self, base_url: str, index: int, seed: int):
+        self.base_url = base_url
+        self.index = index
+        self.rng = random.Random(seed * 1000 + index)
+        self.session = requests.Session()
+        self.ws = None
+
+    def voice(self):
+        command = self.rng.choice(VOICE_COMMANDS)
+        return self.session.post(f"{self.base_url}/voice/process", json={"command": command}, timeout=60)
+
+    def files(self):
+        choice = self.rng.random()
+        if choice < 0.3:
+            return self.session.get(f"{self.base_url}/code/files", params={"prefix": "bench/"}, timeout=30)
+        path = f"bench/client_{self.index}_{self.rng.randrange(10)}.py"
+        if choice < 0.6:
+            content = f"# client {self.index}\nvalue = {self.rng.randrange(1000)}\nprint(value)\n"
+            return self.session.put(f"{self.base_url}/code/files/{path}", json={"content": content}, timeout=30)
+        return self.session.get(f"{self.base_url}/code/files/bench/hello.py", timeout=30)
+
+    def run(self):
+        return self.session.post(f"{self.base_url}/code/run/bench/hello.py", timeout=60)
+
+    def chat(self):
+        return self.session.post(f"{self.base_url}/chat", data={"user_message": "what is a closure?"}, timeout=60)
+
+    def ws_ping(self):
+        if self.ws is None:
+            self.ws = WebSocketClient(self.base_url.replace("http", "ws", 1) + "/ws/ws")
+        self.ws.send_text(json.dumps({"type": "ping", "timestamp": time.time()}))
+        reply = json.loads(self.ws.recv_text())
+        if reply.get("type") != "pong":
+            raise ValueError(f"unexpected WebSocket reply {reply}")
+
+    def reconnect(self):
+        self.session.close()
+        self.session = requests.Session()
+
+    def close(self):
+        self.session.close()
+        if self.ws is not None:
+            self.ws.close()
+
+
+OPERATIONS = {"voice": Client.voice, "files": Client.files, "run": Client.run, "chat": Client.chat, "ws": Client.ws_ping}
+
+
+def parse_mix(mix: str):
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed: float) -> dict:
+    latencies = sorted(latency for latency, ok in samples if ok)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, ok in samples if not ok),
+        "throughput": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run_level(base_url: str, concurrency: int, duration: float, weights: dict, seed: int) -> dict:
+    samples = defaultdict(list)  # op -> [(latency, ok)]; list.append is thread-safe
+    errors = defaultdict(set)
+    names, cumulative = list(weights), []
+    total = 0.0
+    for name in names:
+        total += weights[name]
+        cumulative.append(total)
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int):
+        client = Client(base_url, index, seed)
+        try:
+            while time.perf_counter() < deadline:
+                name = client.rng.choices(names, cum_weights=cumulative)[0]
+                start = time.perf_counter()
+                ok = True
+                try:
+                    response = OPERATIONS[name](client)
+                    if response is not None and response.status_code >= 400:
+                        ok = False
+                        errors[name].add(f"HTTP {response.status_code}")
+                        if response.status_code >= 500:
+                            client.reconnect()  # the server drops the connection after an unhandled error
+                except Exception as e:
+                    ok = False
+                    errors[name].add(f"{type(e).__name__}: {e}"[:120])
+                    if name == "ws":
+                        client.ws = None
+                samples[name].append((time.perf_counter() - start, ok))
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    result = {name: summarize(samples[name], elapsed) for name in names if samples[name]}
+    result["all"] = summarize([sample for name in names for sample in samples[name]], elapsed)
+    for name, kinds in errors.items():
+        result[name]["error_kinds"] = sorted(kinds)
+    return result
+
+
+# ---------- Server under test ----------
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int, llm_url: str, workspace: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        OPENROUTER_URL=llm_url,
+        OPENROUTER_API_KEY="load-test",
+        MONGO_URI="memory://",
+        WORKSPACE_DIR=workspace,
+        TRACE_EXPORTER="none",
+        STATE_URL=f"unix://{os.path.join(workspace, '.state.sock')}" if os.name == "posix" else f"tcp://127.0.0.1:{free_port()}",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "run_server.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"server exited with code {server.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return server
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("server did not become healthy within 60s")
+
+
+def prepare(base_url: str):
+    with requests.Session() as session:
+        response = session.put(
+            f"{base_url}/code/files/bench/hello.py",
+            json={"content": "total = sum(i * i for i in range(10000))\nprint(total)\n"},
+            timeout=30,
+        )
+        response.raise_for_status()
+
+
+# ---------- Baselines ----------
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Regressions as messages: p95 latency up, or throughput down, by more than `tolerance`."""
+    regressions = []
+    for level, ops in results.items():
+        for name, current in ops.items():
+            previous = baseline.get("results", {}).get(level, {}).get(name)
+            if not previous:
+                continue
+            if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"c={level} {name}: p95 {current['p95_ms']:.1f}ms vs baseline {previous['p95_ms']:.1f}ms"
+                )
+            if previous["throughput"] and current["throughput"] < previous["throughput"] * (1 - tolerance):
+                regressions.append(
+                    f"c={level} {name}: {current['throughput']:.1f} req/s vs baseline {previous['throughput']:.1f} req/s"
+                )
+    return regressions
+
+
+def print_level(concurrency: int, result: dict):
+    print(f"\nconcurrency {concurrency}")
+    print(f"{'operation':>10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in result.items():
+        print(f"{name:>10} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput']:>8.1f} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+        if stats.get("error_kinds"):
+            print(f"{'':>10} errors: {', '.join(stats['error_kinds'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark this running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started server")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--llm-token-delay-ms", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write results to this JSON baseline")
+    parser.add_argument("--compare", help="compare against this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression, as a fraction")
+    args = parser.parse_args()
+    weights = parse_mix(args.mix)
+
+    server = llm = None
+    workspace = tempfile.TemporaryDirectory(prefix="voicecode-load-")
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            llm = mock_llm.start(
+                latency=args.llm_latency_ms / 1000, jitter=args.llm_jitter_ms / 1000,
+                token_delay=args.llm_token_delay_ms / 1000,
+            )
+            port = free_port()
+            server = start_server(port, args.workers, mock_llm.url(llm), workspace.name)
+            base_url = f"http://127.0.0.1:{port}"
+        prepare(base_url)
+
+        print(f"Load test against {base_url}: mix {args.mix}, {args.duration:g}s per level")
+        results = {}
+        for concurrency in args.concurrency:
+            results[str(concurrency)] = run_level(base_url, concurrency, args.duration, weights, args.seed)
+            print_level(concurrency, results[str(concurrency)])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+        if llm is not None:
+            llm.shutdown()
+        workspace.cleanup()
+
+    report = {
+        "config": {
+            "mix": args.mix, "duration": args.duration, "workers": args.workers, "external": bool(args.url),
+            "llm_latency_ms": args.llm_latency_ms, "llm_jitter_ms": args.llm_jitter_ms,
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
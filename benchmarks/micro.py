@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the pure functions on the request hot path.
+
+Each function runs over generated inputs of increasing size, with no server or
+network involved:
+
+    classify_command            voice command routing (process_command_type)
+    extract_filename            extract_filename_from_command
+    parse_code_response         splitting an LLM reply on ``` code blocks
+    resolve_safe_path           _resolve_safe_path, by path depth
+    list_files                  GET /code/files on an indexed workspace, by file count
+
+For each case it reports calls per second (best of several timed runs) and the
+peak memory a single call allocates, measured with tracemalloc. `--save`
+writes a JSON baseline. `--compare` exits non-zero when throughput drops, or
+allocation grows, by more than `--tolerance` against that baseline. Timings
+depend on the machine, so compare against a baseline from the same one.
+
+    python benchmarks/micro.py --save benchmarks/baseline_micro.json
+    python benchmarks/micro.py --compare benchmarks/baseline_micro.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("TRACE_EXPORTER", "none")
+
+from fastapi import Response  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app.api import routes_code, routes_voice  # noqa: E402
+from app.services.workspaces import Workspace  # noqa: E402
+
+CORPUS_SIZE = 200
+ALLOC_SLACK_BYTES = 256  # allocation changes smaller than this are noise, not regressions
+
+PHRASES = [
+    "go to home", "open menu", "open voice input", "deactivate voice", "open voice search for sorting",
+    "show analytics", "create file utils.py", "delete file old.py", "create function", "for loop",
+    "binary search", "add a class for a queue",
+]
+FILLER = "please could you quickly and carefully just now".split()
+
+
+# ---------- Corpora ----------
+def command_corpus(words: int, rng: random.Random):
+    """Voice commands padded with filler words to about `words` words."""
+    corpus = []
+    for _ in range(CORPUS_SIZE):
+        phrase = rng.choice(PHRASES).split()
+        padding = [rng.choice(FILLER) for _ in range(max(0, words - len(phrase)))]
+        cut = rng.randrange(len(padding) + 1)
+        corpus.append(" ".join(padding[:cut] + phrase + padding[cut:]))
+    return corpus
+
+
+def reply_corpus(code_lines: int, rng: random.Random):
+    """LLM replies with an explanation around a python code block of `code_lines` lines."""
+    corpus = []
+    for _ in range(20):
+        code = "\n".join(f"    value_{i} = compute({i}, {rng.randrange(100)})" for i in range(code_lines))
+        corpus.append(f"Here is the code you asked for:\n```python\ndef generated():\n{code}\n```\nIt computes values.")
+    return corpus
+
+
+def path_corpus(depth: int, rng: random.Random):
+    corpus = []
+    for _ in range(CORPUS_SIZE):
+        parts = [f"dir{rng.randrange(10)}" for _ in range(depth - 1)]
+        corpus.append("/".join(parts + [f"file{rng.randrange(100)}.py"]))
+    return corpus
+
+
+def make_workspace(files: int, base: Path) -> Workspace:
+    root = base / f"ws_{files}"
+    for i in range(files):
+        path = root / f"pkg{i % 20}" / f"module_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"def function_{i}():\n    return {i}\n", encoding="utf-8")
+    ws = Workspace(root, base / f"state_{files}", base / f"snapshots_{files}")
+    ws.index.ensure_built()
+    return ws
+
+
+# ---------- Cases ----------
+def build_cases(tmp: Path):
+    """[(name, size, inputs, call)]: `call(x)` is timed for every x in `inputs`."""
+    rng = random.Random(1)
+    cases = []
+    for words in (4, 32, 256):
+        corpus = command_corpus(words, rng)
+        cases.append(("classify_command", words, corpus, routes_voice.classify_command))
+        cases.append(("extract_filename", words, corpus, routes_voice.extract_filename_from_command))
+    for lines in (10, 100, 1000):
+        cases.append((
+            "parse_code_response", lines, reply_corpus(lines, rng),
+            lambda reply: routes_voice.parse_code_response(reply, "python"),
+        ))
+    root = tmp / "paths"
+    root.mkdir()
+    for depth in (1, 4, 16):
+        cases.append((
+            "resolve_safe_path", depth, path_corpus(depth, rng),
+            lambda rel, root=root: routes_code._resolve_safe_path(rel, root),
+        ))
+    request = Request({"type": "http", "method": "GET", "path": "/code/files", "headers": []})
+    for files in (100, 1000, 5000):
+        ws = make_workspace(files, tmp)
+        cases.append((
+            "list_files", files, [None],
+            lambda _, ws=ws: routes_code.list_files(request, Response(), ws=ws),
+        ))
+    return cases
+
+
+# ---------- Measurement ----------
+def calls_per_second(call, inputs, min_time: float, repeat: int = 5) -> float:
+    def run(loops: int) -> float:
+        start = time.perf_counter()
+        for _ in range(loops):
+            for item in inputs:
+                call(item)
+        return time.perf_counter() - start
+
+    loops = 1
+    while run(loops) < min_time / repeat:  # calibrate, like timeit
+        loops *= 2
+    best = min(run(loops) for _ in range(repeat))
+    return loops * len(inputs) / best
+
+
+def bytes_per_call(call, inputs) -> float:
+    """Average peak memory allocated by one call."""
+    tracemalloc.start()
+    try:
+        total = 0
+        for item in inputs:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call(item)
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / len(inputs)
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if not previous:
+            continue
+        if current["calls_per_sec"] < previous["calls_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {current['calls_per_sec']:,.0f} calls/s vs baseline {previous['calls_per_sec']:,.0f}"
+            )
+        allowed = max(previous["bytes_per_call"] * (1 + tolerance), previous["bytes_per_call"] + ALLOC_SLACK_BYTES)
+        if current["bytes_per_call"] > allowed:
+            regressions.append(
+                f"{key}: {current['bytes_per_call']:,.0f} B/call vs baseline {previous['bytes_per_call']:,.0f}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds of timing per case")
+    parser.add_argument("--save", help="write results to this JSON baseline")
+    parser.add_argument("--compare", help="compare against this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="voicecode-micro-") as tmp:
+        print(f"{'case':<28} {'size':>6} {'calls/s':>14} {'B/call':>10}")
+        for name, size, inputs, call in build_cases(Path(tmp)):
+            if args.filter and args.filter not in name:
+                continue
+            rate = calls_per_second(call, inputs, args.min_time)
+            allocated = bytes_per_call(call, inputs)
+            results[f"{name}[{size}]"] = {"calls_per_sec": round(rate, 1), "bytes_per_call": round(allocated, 1)}
+            print(f"{name:<28} {size:>6} {rate:>14,.0f} {allocated:>10,.0f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenRouter chat completions API.
+
+Answers any POST with a canned coding reply after a configurable delay, so
+benchmarks run offline and measure this server rather than the network. With
+`"stream": true` in the request it sends the reply as server-sent events, one
+token per chunk with `--token-delay-ms` between them, like the real API.
+
+    python benchmarks/mock_llm.py --port 8099 --latency-ms 300 --jitter-ms 100
+    OPENROUTER_URL=http://127.0.0.1:8099/api/v1/chat/completions OPENROUTER_API_KEY=mock python run_server.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "Here is a loop that prints the first ten numbers:\n"
+    "```python\n"
+    "for i in range(10):\n"
+    "    print(i)\n"
+    "```\n"
+    "Each iteration prints the current value of i."
+)
+TOKENS = re.findall(r"\s*\S+", REPLY)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.3
+    jitter = 0.1
+    token_delay = 0.02
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        request = json.loads(body or b"{}")
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        if request.get("stream"):
+            self._stream(request)
+        else:
+            self._reply(request)
+
+    def _reply(self, request):
+        payload = json.dumps({
+            "id": "mock",
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": REPLY}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4,
+                "completion_tokens": len(TOKENS),
+            },
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, request):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in TOKENS:
+            event = {"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(self.token_delay)
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port: int = 0, latency: float = 0.3, jitter: float = 0.1, token_delay: float = 0.02) -> ThreadingHTTPServer:
+    """Serve in a daemon thread; the URL to point OPENROUTER_URL at is `url(server)`."""
+    handler = type("Handler", (MockLLMHandler,), {"latency": latency, "jitter": jitter, "token_delay": token_delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+def url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_port}/api/v1/chat/completions"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--token-delay-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    server = start(args.port, args.latency_ms / 1000, args.jitter_ms / 1000, args.token_delay_ms / 1000)
+    print(f"Mock LLM on {url(server)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,23 @@ VoiceCode Server Startup Script
 Run this script to start the Voice-Enabled Code Assistant server
 """
 
+import argparse
 import uvicorn
 import os
+import secrets
 import sys
 
+from app.core.config import get_settings
+
 def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Start the VoiceCode server (defaults from app/core/config.py)")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--reload", action="store_true", help="restart on code changes (development)")
+    parser.add_argument("--workers", type=int, default=settings.uvicorn_workers)
+    args = parser.parse_args()
+
     print("🚀 Starting VoiceCode - Voice-Enabled Code Assistant")
     print("=" * 50)
     
@@ -18,22 +30,42 @@ def main():
         sys.exit(1)
     
     # Create workspace directory if it doesn't exist
-    workspace_dir = "workspace"
+    workspace_dir = str(settings.workspace_path)
     if not os.path.exists(workspace_dir):
         os.makedirs(workspace_dir)
         print(f"📁 Created workspace directory: {workspace_dir}")
     
-    print("🌐 Server will be available at: http://localhost:8000")
-    print("📖 API documentation: http://localhost:8000/docs")
+    print(f"🌐 Server will be available at: http://localhost:{args.port}")
+    print(f"📖 API documentation: http://localhost:{args.port}/docs")
     print("🎤 Voice commands will be processed via WebSocket")
+
+    workers = 1 if args.reload else args.workers
+    if workers > 1:
+        # Workers inherit the environment: make them share state even if the
+        # worker count came from the command line rather than the settings.
+        os.environ["UVICORN_WORKERS"] = str(workers)
+        if not settings.session_secret:
+            # one signing key for all workers, or a login cookie only verifies on the worker that issued it
+            os.environ["SESSION_SECRET"] = secrets.token_urlsafe(32)
+            print("🔑 SESSION_SECRET not set: generated one for the workers, sessions end when the server stops")
+        if settings.state_backend in ("auto", "socket"):
+            from app.core.shared_state import StateServer
+
+            os.environ["STATE_BACKEND"] = "socket"
+            StateServer(settings.state_url).serve_in_thread()
+            print(f"🔗 {workers} workers sharing state via {settings.state_url}")
     print("=" * 50)
     
     try:
         uvicorn.run(
-            "app.main:app",
-            host="0.0.0.0",
-            port=8000,
-            reload=True,
+            "app.main:create_app",
+            factory=True,
+            host=args.host,
+            port=args.port,
+            reload=args.reload,
+            # only our code triggers a restart, not edits in the user workspaces
+            reload_dirs=["app"] if args.reload else None,
+            workers=None if args.reload else workers,
             log_level="info"
         )
     except KeyboardInterrupt:
@@ -0,0 +1,22 @@
+"""
+Settings for the test run. They are read from the environment when first
+used, so they are set here before any app module is imported: MongoDB,
+shared state and the LLM are local stand-ins, and tracing is off.
+"""
+import os
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="voicecode_tests_")
+
+os.environ.update({
+    "MONGO_URI": "memory://",
+    "SESSION_SECRET": "test-secret",
+    "STATE_BACKEND": "local",
+    "TRACE_EXPORTER": "none",
+    "OPENROUTER_API_KEY": "test-key",
+    "OPENROUTER_URL": "http://127.0.0.1:9/api/v1/chat/completions",  # discard port: calls fail fast
+    "WORKSPACE_DIR": os.path.join(_scratch, "workspace"),
+    "USER_WORKSPACES_DIR": os.path.join(_scratch, "user_workspaces"),
+    "SNAPSHOTS_DIR": os.path.join(_scratch, "snapshots"),
+    "STATE_DIR": os.path.join(_scratch, "state"),
+})
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import security
+from app.core.database import Database, db
+from app.main import create_app
+
+
+@pytest.fixture
+def users():
+    database = Database("memory://")
+    asyncio.run(database.connect())
+    return database
+
+
+def test_duplicate_signup_is_refused(users):
+    async def scenario():
+        assert await users.create_user({"email": "a@example.com", "password": "h1"})
+        assert not await users.create_user({"email": "a@example.com", "password": "h2"})
+        return await users.find_user("a@example.com")
+
+    assert asyncio.run(scenario())["password"] == "h1"
+
+
+def test_concurrent_signups_only_one_succeeds(users):
+    async def scenario():
+        return await asyncio.gather(*(
+            users.create_user({"email": "race@example.com", "password": f"h{i}"}) for i in range(2)
+        ))
+
+    assert sorted(asyncio.run(scenario())) == [False, True]
+
+
+def test_find_user_and_set_password(users):
+    async def scenario():
+        assert await users.find_user("b@example.com") is None
+        await users.create_user({"email": "b@example.com", "password": "old"})
+        await users.set_password("b@example.com", "new")
+        return await users.find_user("b@example.com")
+
+    user = asyncio.run(scenario())
+    assert user["email"] == "b@example.com" and user["password"] == "new"
+
+
+def test_login_upgrades_a_plaintext_password():
+    with TestClient(create_app()) as client:
+        client.portal.call(db.create_user, {"username": "old", "email": "legacy@example.com", "password": "hunter2"})
+        response = client.post(
+            "/login", data={"email": "legacy@example.com", "password": "hunter2"}, follow_redirects=False
+        )
+        assert response.status_code == 303
+        assert security.verify_token(response.cookies[security.SESSION_COOKIE])["email"] == "legacy@example.com"
+        stored = client.portal.call(db.find_user, "legacy@example.com")["password"]
+    assert security.is_password_hash(stored)
+    assert security.verify_password("hunter2", stored)
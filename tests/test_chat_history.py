@@ -0,0 +1,53 @@
+import pytest
+
+from app.services import chat_history, tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    """Count one token per four characters, with or without tiktoken's table"""
+    monkeypatch.setattr(tokens, "get_encoding", lambda: None)
+
+
+def turn(question: str, reply: str = "ok"):
+    return [question, reply, 10]
+
+
+def test_compact_drops_the_oldest_turns_first():
+    history = {"summary": [], "turns": [turn(f"question {i}") for i in range(5)]}
+    chat_history.compact(history, history_tokens=20, summary_tokens=1000)
+    assert [t[0] for t in history["turns"]] == ["question 3", "question 4"]
+    assert history["summary"] == ["Asked: question 0", "Asked: question 1", "Asked: question 2"]
+
+
+def test_compact_keeps_turns_that_fit():
+    history = {"summary": ["Asked: before"], "turns": [turn("a"), turn("b")]}
+    chat_history.compact(history, history_tokens=20, summary_tokens=1000)
+    assert [t[0] for t in history["turns"]] == ["a", "b"]
+    assert history["summary"] == ["Asked: before"]
+
+
+def test_summary_is_capped_keeping_the_newest_lines():
+    history = {"summary": [], "turns": [turn(f"question number {i}") for i in range(20)]}
+    chat_history.compact(history, history_tokens=0, summary_tokens=30)
+    assert history["turns"] == []
+    assert tokens.count_tokens("\n".join(history["summary"])) <= 30
+    assert history["summary"][-1] == "Asked: question number 19"
+    assert len(history["summary"]) < 20
+
+
+def test_summary_lines_are_truncated():
+    history = {"summary": [], "turns": [turn("why " * 500)]}
+    chat_history.compact(history, history_tokens=0, summary_tokens=1000)
+    [line] = history["summary"]
+    assert tokens.count_tokens(line[len("Asked: "):]) <= chat_history.SUMMARY_LINE_TOKENS
+
+
+def test_chat_request_asks_for_a_concise_answer():
+    from app.main import CHAT_MESSAGE_SUFFIX, chat_request
+
+    history = {"summary": [], "turns": [["earlier", "reply", 10]]}
+    data, _, sent = chat_request(history, "what is a list?")
+    assert data["messages"][-1]["content"] == "what is a list?" + CHAT_MESSAGE_SUFFIX
+    assert data["messages"][-3]["content"] == "earlier"  # stored turns go out as they were
+    assert sent == "what is a list?"  # kept in the history without the suffix
@@ -0,0 +1,116 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.api import routes_code
+from app.services import code_executor
+
+
+@pytest.fixture
+def bytecode_cache(monkeypatch):
+    monkeypatch.setattr(code_executor, "_bytecode_cache", type(code_executor._bytecode_cache)())
+    return code_executor._bytecode_cache
+
+
+def test_syntax_error_info():
+    with pytest.raises(code_executor.CompileFailed) as failed:
+        code_executor.compile_pyc(b"x = 1\ndef f(:\n    pass\n", "pkg/mod.py")
+    info = failed.value.info()
+    assert set(info) == {"filename", "line", "col", "end_line", "end_col", "message", "text"}
+    assert info["filename"] == "pkg/mod.py"
+    assert info["line"] == 2 and info["col"] == 6
+    assert info["text"] == "def f(:"
+    assert info["message"]
+
+
+@pytest.mark.parametrize("source, message", [
+    (b"x = " + b"-" * 1000000 + b"1", "too deeply nested"),
+    (b"#" * (2 * 1024 * 1024), "larger than"),
+])
+def test_sources_the_server_will_not_compile(source, message):
+    with pytest.raises(code_executor.CompileFailed) as failed:
+        code_executor.compile_pyc(source, "big.py")
+    assert message in failed.value.info()["message"]
+
+
+def test_bytecode_cache_hit_miss_and_eviction(bytecode_cache, monkeypatch):
+    monkeypatch.setattr(code_executor, "BYTECODE_CACHE_ENTRIES", 2)
+    results = code_executor.metrics.BYTECODE_CACHE
+    hits, misses = results.labels("hit").value, results.labels("miss").value
+
+    first = code_executor.compile_pyc(b"a = 1\n", "a.py")
+    assert code_executor.compile_pyc(b"a = 1\n", "a.py") is first
+    assert (results.labels("hit").value - hits, results.labels("miss").value - misses) == (1, 1)
+
+    code_executor.compile_pyc(b"b = 1\n", "b.py")
+    code_executor.compile_pyc(b"a = 1\n", "a.py")  # a is now the most recently used
+    code_executor.compile_pyc(b"c = 1\n", "c.py")  # evicts b
+    assert [name for name, _ in bytecode_cache] == ["a.py", "c.py"]
+    assert results.labels("miss").value - misses == 3
+
+
+def test_project_run_loads_bytecode_from_pycache(tmp_path):
+    src, run_dir = tmp_path / "src", tmp_path / "run"
+    src.mkdir(), run_dir.mkdir()
+    (src / "main.py").write_text("import helper\nprint(helper.VALUE, __file__ == __import__('sys').argv[0])\n")
+    (src / "helper.py").write_text("VALUE = 'compiled'\n")
+    compiled = code_executor.compile_closure(src / "main.py", project=True)
+    target = code_executor.stage_project(src / "main.py", run_dir)
+    code_executor.stage_bytecode(run_dir, compiled)
+    # the pycs are unchecked: python never looks at these sources again
+    (run_dir / "helper.py").write_text("VALUE = 'source'\n")
+    (run_dir / "main.py").write_text("print('source')\n")
+
+    proc = subprocess.run([sys.executable, routes_code.PYC_RUNNER, str(target)], capture_output=True, text=True)
+    assert proc.stdout == "compiled True\n", proc.stderr
+
+
+def test_run_keeps_the_script_path(tmp_path):
+    (tmp_path / "where.py").write_text("import sys\nprint(__file__)\nprint(sys.argv[0])\n")
+    result = routes_code._run_python_file_safely(tmp_path / "where.py", project=True)
+    file_, argv0 = result.stdout.splitlines()
+    assert file_ == argv0 and Path(file_).name == "where.py"
+
+
+def test_no_reflink_attempt_across_devices(tmp_path, monkeypatch):
+    import fcntl
+
+    attempts = []
+    real_ioctl = fcntl.ioctl
+
+    def ioctl(fd, request, *args):
+        if request == code_executor._FICLONE:
+            attempts.append(fd)
+        return real_ioctl(fd, request, *args)
+
+    monkeypatch.setattr(fcntl, "ioctl", ioctl)
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "main.py").write_text("import helper\n")
+    (src / "helper.py").write_text("VALUE = 1\n")
+    assert code_executor._can_reflink(src, tmp_path)
+
+    monkeypatch.setattr(code_executor, "_can_reflink", lambda src_root, run_dir: False)
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    code_executor.stage_project(src / "main.py", run_dir)
+    assert attempts == []
+    assert (run_dir / "helper.py").read_text() == "VALUE = 1\n"
+
+
+def test_import_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(code_executor, "_import_cache", type(code_executor._import_cache)())
+    monkeypatch.setattr(code_executor, "IMPORT_CACHE_ENTRIES", 2)
+    files = []
+    for name in "abc":
+        files.append(tmp_path / f"{name}.py")
+        files[-1].write_text(f"import {name}_dep\n")
+    a, b, c = files
+
+    assert code_executor.parse_imports(a) == ((0, "a_dep", ()),)
+    code_executor.parse_imports(b)
+    code_executor.parse_imports(a)  # a is now the most recently used
+    code_executor.parse_imports(c)  # evicts b
+    assert list(code_executor._import_cache) == [a, c]
@@ -0,0 +1,44 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.main import create_app
+
+
+@pytest.fixture
+def client():
+    with TestClient(create_app()) as client:
+        yield client
+
+
+def test_batch_rejects_directory_targets_before_writing(client):
+    (get_settings().workspace_path / "pkg_dir").mkdir()
+    response = client.post("/code/files/batch", json={"operations": [
+        {"op": "create", "filename": "batch_first.py", "content": "x = 1\n"},
+        {"op": "update", "filename": "pkg_dir", "content": "y = 2\n"},
+    ]})
+    assert response.status_code == 409
+    assert client.get("/code/files/batch_first.py").status_code == 404
+
+
+def test_restore_after_file_removed_on_disk(client):
+    workspace = get_settings().workspace_path
+    snapshot = client.post("/code/snapshots").json()["id"]
+    assert client.post("/code/files", json={"filename": "restore_extra.py", "content": "x = 1\n"}).status_code == 201
+    client.get("/code/files")  # the index now lists it
+    (workspace / "restore_extra.py").unlink()  # removed behind the index's back
+    response = client.post(f"/code/snapshots/{snapshot}/restore")
+    assert response.status_code == 200
+    assert not (workspace / "restore_extra.py").exists()
+
+
+def test_workspace_follows_the_session_not_the_header(client):
+    from app.core import security
+
+    client.cookies.set(security.SESSION_COOKIE, security.issue_token("alice", "alice@example.com"))
+    assert client.post("/code/files", json={"filename": "alice_private.py", "content": "x = 1\n"}).status_code == 201
+    assert "alice_private.py" in client.get("/code/files").json()
+
+    client.cookies.clear()
+    assert "alice_private.py" not in client.get("/code/files", headers={"X-User-Id": "alice"}).json()
+    assert client.get("/code/files/alice_private.py", headers={"X-User-Id": "alice"}).status_code == 404
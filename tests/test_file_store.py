@@ -0,0 +1,27 @@
+import pytest
+
+from app.services import file_store
+
+
+def test_apply_batch_failure_cleans_up_and_reports_applied(tmp_path):
+    (tmp_path / "b.py").mkdir()  # os.replace onto a directory fails
+    applied = []
+    writes = [(tmp_path / "a.py", b"a = 1\n"), (tmp_path / "b.py", b"b = 2\n"), (tmp_path / "c.py", b"c = 3\n")]
+    with pytest.raises(OSError):
+        file_store.apply_batch(writes, on_applied=applied.append)
+    assert applied == [tmp_path / "a.py"]
+    assert (tmp_path / "a.py").read_bytes() == b"a = 1\n"
+    assert not (tmp_path / "c.py").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.py", "b.py"]  # no temp files left
+
+
+def test_apply_batch_returns_changed_paths(tmp_path):
+    (tmp_path / "old.py").write_text("x = 1\n")
+    changed = file_store.apply_batch([(tmp_path / "new.py", b"y = 2\n")], [tmp_path / "old.py"])
+    assert changed == [tmp_path / "new.py", tmp_path / "old.py"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["new.py"]
+
+
+def test_apply_batch_delete_of_missing_file_is_a_no_op(tmp_path):
+    gone = tmp_path / "gone.py"
+    assert file_store.apply_batch([], [gone]) == [gone]
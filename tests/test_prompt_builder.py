@@ -0,0 +1,55 @@
+import pytest
+
+from app.core.config import get_settings
+from app.services import prompt_builder, tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    monkeypatch.setattr(tokens, "get_encoding", lambda: None)
+
+
+@pytest.mark.parametrize("command, intent, max_tokens", [
+    ("write a bubble sort", "program", 500),
+    ("create a rest api endpoint", "program", 500),
+    ("fibonacci sequence", "program", 500),
+    ("explain this code", "explain", 400),
+    ("fix the error on line three", "explain", 400),
+    ("create a function that adds two numbers", "definition", 300),
+    ("make a class for a bank account", "definition", 300),
+    ("write a for loop", "snippet", 150),
+    ("print hello world", "snippet", 150),
+    ("sort function", "program", 500),  # first match wins
+])
+def test_each_intent_gets_its_budget(command, intent, max_tokens):
+    prompt = prompt_builder.build_code_prompt(command, "python")
+    assert (prompt.intent, prompt.max_tokens) == (intent, max_tokens)
+    assert prompt_builder.classify_intent(command) == (intent, max_tokens)
+
+
+def test_budget_is_capped_by_voice_max_tokens(monkeypatch):
+    monkeypatch.setattr(get_settings(), "voice_max_tokens", 200)
+    assert prompt_builder.build_code_prompt("write a bubble sort", "python").max_tokens == 200
+    assert prompt_builder.build_code_prompt("write a for loop", "python").max_tokens == 150
+
+
+def test_system_prompt_is_the_same_for_every_request():
+    first = prompt_builder.build_code_prompt("write a for loop", "python").messages
+    second = prompt_builder.build_code_prompt("explain recursion", "javascript").messages
+    assert first[0] == second[0] == {"role": "system", "content": prompt_builder.SYSTEM_PROMPT}
+    assert "javascript" in second[1]["content"] and "explain recursion" in second[1]["content"]
+
+
+@pytest.mark.parametrize("command, expected", [
+    ("write a for loop", True),
+    ("create a dictionary of names", True),
+    ("import numpy", True),
+    ("binary search", True),
+    ("debug this", True),
+    ("make a class", True),
+    ("shower thoughts", False),
+    ("what time is it", False),
+    ("hello there", False),
+])
+def test_is_code_request(command, expected):
+    assert prompt_builder.is_code_request(command) is expected
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import security
+from app.main import create_app
+
+
+def test_token_round_trip_and_revocation():
+    async def scenario():
+        token = security.issue_token("u1", "u1@example.com")
+        assert (await security.authenticate(token))["sub"] == "u1"
+        await security.revoke_token(token)
+        return await security.authenticate(token)
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_logout_revokes_the_session_for_every_request():
+    with TestClient(create_app()) as client:
+        token = security.issue_token("u2", "u2@example.com")
+        client.cookies.set(security.SESSION_COOKIE, token)
+        client.get("/logout", follow_redirects=False)
+        assert client.portal.call(security.authenticate, token) is None
+
+
+@pytest.mark.parametrize("token", ["é.é", "abc.é", "é", "..", "x.y", "", None])
+def test_malformed_tokens_are_rejected(token):
+    assert security.verify_token(token) is None
+
+
+def test_tampered_token_is_rejected():
+    payload, signature = security.issue_token("u1", "u1@example.com").split(".")
+    assert security.verify_token(f"{payload}x.{signature}") is None
+
+
+def test_crafted_session_cookie_does_not_break_requests():
+    with TestClient(create_app()) as client:
+        cookie = f"{security.SESSION_COOKIE}=é.é".encode("latin-1")  # raw bytes, as a hostile client sends them
+        assert client.get("/health", headers={"cookie": cookie}).status_code == 200
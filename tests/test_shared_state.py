@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.shared_state import SharedState, SocketState, StateServer
+
+
+@pytest.fixture
+def url(tmp_path):
+    return f"unix://{tmp_path / 'state.sock'}"
+
+
+def test_shared_state_is_abstract():
+    with pytest.raises(TypeError):
+        SharedState()
+
+
+def test_calls_fail_and_reconnect_when_the_server_goes_away(url):
+    async def scenario():
+        server = StateServer(url)
+        await server.start()
+        client = SocketState(url)
+        await client.start()
+        await client.set("k", 1)
+        await server.close()
+        await asyncio.sleep(0.05)
+        # nobody serves the store any more: the client serves it itself, empty
+        assert await client.get("k", "gone") == "gone"
+        await client.set("k", 2)
+        assert await client.get("k") == 2
+        await client.close()
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+
+
+def test_subscriptions_resume_after_reconnect(url):
+    async def scenario():
+        server = StateServer(url)
+        await server.start()
+        client = SocketState(url)
+        await client.start()
+        received = []
+
+        async def listener(message):
+            received.append(message)
+
+        await client.subscribe("ch", listener)
+        first = client._writer
+        await server.close()
+        for _ in range(50):  # reconnects in the background, serving the store itself
+            if client._writer not in (None, first):
+                break
+            await asyncio.sleep(0.05)
+        publisher = SocketState(url)
+        await publisher.start()
+        await publisher.publish("ch", "hello")
+        await asyncio.sleep(0.05)
+        await publisher.close()
+        await client.close()
+        return received
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 5)) == ["hello"]
+
+
+def test_calls_time_out_when_the_server_does_not_answer(url, monkeypatch):
+    monkeypatch.setattr(get_settings(), "state_timeout", 0.2)
+
+    async def scenario():
+        async def silent(reader, writer):
+            await reader.read()
+
+        server = await asyncio.start_unix_server(silent, path=url[len("unix://"):])
+        client = SocketState(url)
+        await client.start()
+        with pytest.raises(asyncio.TimeoutError):
+            await client.get("k")
+        assert client._pending == {}
+        await client.close()
+        server.close()
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+
+
+def test_redis_errors_are_raised_like_socket_errors():
+    from types import SimpleNamespace
+
+    from app.core.shared_state import RedisState
+
+    class RedisTimeout(Exception):
+        pass
+
+    class RedisConnectionError(Exception):
+        pass
+
+    class Client:
+        async def get(self, key):
+            raise RedisTimeout("Timeout reading from socket")
+
+        async def delete(self, key):
+            raise RedisConnectionError("Error 111 connecting to localhost:6379")
+
+    # the shapes of redis.exceptions, which is an optional dependency
+    state = RedisState("redis://localhost:6379/0")
+    state._exceptions = SimpleNamespace(TimeoutError=RedisTimeout, ConnectionError=RedisConnectionError)
+    state._redis = Client()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(state.get("k"))
+    with pytest.raises(ConnectionError):
+        asyncio.run(state.delete("k"))
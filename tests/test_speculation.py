@@ -0,0 +1,94 @@
+import asyncio
+import gc
+
+import pytest
+
+from app.core import metrics, shared_state
+from app.core.config import get_settings
+from app.core.shared_state import LocalState, SocketState, StateServer
+from app.services import speculation
+
+
+@pytest.fixture
+def socket_state(tmp_path, monkeypatch):
+    """Shared state over a real socket, so concurrent calls interleave as across workers"""
+    url = f"unix://{tmp_path / 'state.sock'}"
+    state = SocketState(url)
+    monkeypatch.setattr(shared_state, "_state", state)
+    return state
+
+
+def test_concurrent_wastes_are_all_counted(socket_state):
+    async def scenario():
+        await socket_state.start()
+        speculator = speculation.Speculator()
+        await asyncio.gather(*(speculator._count_waste("s1") for _ in range(20)))
+        count = await socket_state.get(speculation.WASTED_KEY.format("s1"))
+        await socket_state.close()
+        return count
+
+    assert asyncio.run(scenario()) == 20
+
+
+@pytest.mark.parametrize("make_state", [LocalState, None])
+def test_incr_window_does_not_slide(make_state, socket_state):
+    state = make_state() if make_state else socket_state
+
+    async def scenario():
+        await state.start()
+        assert await state.incr("w", ttl=0.3) == 1
+        await asyncio.sleep(0.2)
+        assert await state.incr("w", ttl=0.3) == 2  # does not extend the window
+        await asyncio.sleep(0.15)
+        value = await state.get("w", 0)
+        await state.close()
+        return value
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_unclaimed_failures_are_counted_not_logged(monkeypatch):
+    monkeypatch.setattr(shared_state, "_state", LocalState())
+    monkeypatch.setattr(get_settings(), "speculation_min_words", 1)
+    failures = metrics.ERRORS.labels("speculation")
+    before = failures.value
+
+    async def fetch():
+        raise ConnectionError("upstream down")
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        unhandled = []
+        loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+        speculator = speculation.Speculator()
+        assert await speculator.offer("s2", "write a sorting function", "python", fetch) == "started"
+        await asyncio.sleep(0.01)
+        await speculator._discard("s2", speculator._sessions["s2"])
+        gc.collect()
+        return unhandled
+
+    assert asyncio.run(scenario()) == []
+    assert failures.value == before + 1
+
+
+def test_claim_failure_still_asks_the_llm(monkeypatch):
+    from app.api import routes_voice
+
+    async def claim(session_id, command, language):
+        raise asyncio.TimeoutError
+
+    async def completion(command, language, source):
+        return {"choices": [{"message": {"content": "Sorted.\n```python\nsorted(items)\n```"}}]}
+
+    monkeypatch.setattr(speculation.speculator, "claim", claim)
+    monkeypatch.setattr(routes_voice, "request_code_completion", completion)
+    errors = metrics.ERRORS.labels("speculation_claim")
+    before = errors.value
+
+    async def scenario():
+        routes_voice.current_voice_session.set("s3")
+        return await routes_voice.handle_code_command("write a sorting function", "python")
+
+    kind, _, _, code = asyncio.run(scenario())
+    assert (kind, code) == ("code", "sorted(items)")
+    assert errors.value == before + 1
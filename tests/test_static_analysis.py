@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.main import create_app
+from app.services import static_analysis
+
+
+def rules(source: str, path: str = "main.py"):
+    return [(issue["rule"], issue["line"]) for issue in static_analysis.analyze(path, source.encode())]
+
+
+def test_unused_import():
+    source = "import os\nimport sys\nfrom json import dumps, loads\n\nprint(sys.argv, loads)\n"
+    assert rules(source) == [("unused-import", 1), ("unused-import", 3)]
+    assert rules(source, "pkg/__init__.py") == []  # re-exports
+
+
+def test_unused_variable():
+    source = "def f(items):\n    total = 0\n    count = len(items)\n    return count\n"
+    assert rules(source) == [("unused-variable", 2)]
+
+
+def test_unreachable_code():
+    source = "def f(x):\n    return x\n    print(x)\n\nfor i in range(3):\n    break\n    i += 1\n"
+    assert rules(source) == [("unreachable-code", 3), ("unreachable-code", 7)]
+
+
+def test_nested_loop():
+    source = (
+        "def dupes(items, other):\n"
+        "    for a in items:\n"
+        "        for b in other:\n"
+        "            pass\n"
+        "        for c in items:\n"
+        "            print(a, b, c)\n"
+    )
+    assert rules(source) == [("nested-loop", 5)]
+
+
+def test_syntax_error_stops_the_checks():
+    assert rules("import os\ndef f(:\n") == [("syntax-error", 2)]
+
+
+def test_unchanged_source_is_cached():
+    analyzer = static_analysis.Analyzer()
+
+    async def scenario():
+        first = await analyzer.check("main.py", b"import os\n")
+        again = await analyzer.check("main.py", b"import os\n")
+        changed = await analyzer.check("main.py", b"import os\nos.getcwd()\n")
+        return first, again, changed
+
+    try:
+        first, again, changed = asyncio.run(scenario())
+    finally:
+        analyzer.close()
+    assert (first["cached"], again["cached"], changed["cached"]) == (False, True, False)
+    assert again["issues"] == first["issues"] and [i["rule"] for i in first["issues"]] == ["unused-import"]
+    assert changed["issues"] == []
+
+
+def test_check_rejects_oversized_source(monkeypatch):
+    monkeypatch.setattr(get_settings(), "max_file_bytes", 64)
+    monkeypatch.setattr(static_analysis.analyzer, "check", pytest.fail)  # never submitted
+    with TestClient(create_app()) as client:
+        response = client.post("/debug/check", json={"code": "x = 1\n" * 20})
+    assert response.status_code == 413
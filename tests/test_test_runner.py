@@ -0,0 +1,44 @@
+import asyncio
+
+from app.services import test_runner
+from app.services.test_worker import RESULT_MARKER
+
+
+def run(root, test_ids, workers=2, timeout=10):
+    async def collect():
+        store = test_runner.DurationStore(root / ".durations.json")
+        return [event async for event in test_runner.run_tests(root, test_ids, workers, timeout, store)]
+
+    return asyncio.run(asyncio.wait_for(collect(), 20))
+
+
+def test_runs_tests_in_parallel_shards(tmp_path):
+    (tmp_path / "test_math.py").write_text("def test_ok():\n    assert 1 + 1 == 2\n\ndef test_bad():\n    assert False\n")
+    test_ids = test_runner.discover_tests(tmp_path, ["test_math.py"])
+    events = run(tmp_path, test_ids)
+    assert {e["test"]: e["outcome"] for e in events[:-1]} == {
+        "test_math.py::test_ok": "passed", "test_math.py::test_bad": "failed",
+    }
+    assert events[-1]["type"] == "summary" and events[-1]["total"] == 2
+
+
+def test_malformed_result_lines_do_not_hang_the_stream(tmp_path, monkeypatch):
+    worker = tmp_path / "bad_worker.py"
+    worker.write_text(f"import sys\nsys.stdin.read()\nprint({RESULT_MARKER + '{not json'!r})\n")
+    monkeypatch.setattr(test_runner, "TEST_WORKER", str(worker))
+    (tmp_path / "test_a.py").write_text("def test_one():\n    pass\n")
+    events = run(tmp_path, ["test_a.py::test_one"])
+    assert events[0]["outcome"] == "error"
+    assert "not json" in events[0]["output"]
+    assert events[-1]["error"] == 1
+
+
+def test_worker_start_failure_reports_every_test(tmp_path, monkeypatch):
+    async def cannot_start(*args, **kwargs):
+        raise OSError("no more processes")
+
+    monkeypatch.setattr(test_runner.asyncio, "create_subprocess_exec", cannot_start)
+    (tmp_path / "test_a.py").write_text("def test_one():\n    pass\n\ndef test_two():\n    pass\n")
+    events = run(tmp_path, ["test_a.py::test_one", "test_a.py::test_two"])
+    assert [e["outcome"] for e in events[:-1]] == ["error", "error"]
+    assert "no more processes" in events[0]["message"]
@@ -0,0 +1,42 @@
+import json
+import threading
+
+from app.core import tracing
+
+
+def make_trace(name):
+    trace = tracing.Trace()
+    root = tracing.Span(trace, name, None, {})
+    root.end = root.start
+    trace.spans.append(root)
+    return trace
+
+
+def test_jsonl_export_writes_on_the_writer_thread(tmp_path, monkeypatch):
+    writers = []
+
+    def recording_open(*args, **kwargs):
+        writers.append(threading.current_thread())
+        return open(*args, **kwargs)
+
+    monkeypatch.setattr(tracing, "open", recording_open, raising=False)
+    exporter = tracing.JsonlExporter(tmp_path / "traces" / "t.jsonl")
+    try:
+        for i in range(50):
+            exporter.export(make_trace(f"request {i}"))
+        exporter.flush()
+        lines = (tmp_path / "traces" / "t.jsonl").read_text().splitlines()
+        assert [json.loads(line)["name"] for line in lines] == [f"request {i}" for i in range(50)]
+        assert writers and threading.current_thread() not in writers
+    finally:
+        exporter.close()
+
+
+def test_close_writes_what_is_queued(tmp_path):
+    exporter = tracing.JsonlExporter(tmp_path / "t.jsonl")
+    exporter.export(make_trace("last"))
+    exporter.close()
+    assert json.loads((tmp_path / "t.jsonl").read_text())["name"] == "last"
+    exporter.export(make_trace("after"))  # a closed exporter starts a new writer
+    exporter.close()
+    assert len((tmp_path / "t.jsonl").read_text().splitlines()) == 2
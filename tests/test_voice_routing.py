@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.api import routes_code, routes_voice
+from app.services.symbol_index import SymbolIndex
+from app.services.workspace_index import FileEntry
+
+
+@pytest.mark.parametrize("command, kind", [
+    ("open voice search for bubble sort", "feature"),
+    ("voice search", "feature"),
+    ("analytics dashboard", "feature"),
+    ("start the debugger", "feature"),
+    ("code explained", "feature"),
+    ("open file main.py", "file"),
+    ("open file explain.py", "file"),
+    ("create new file main.py", "file"),
+    ("go to home", "navigation"),
+    ("open menu", "navigation"),
+    ("open analytics dashboard", "navigation"),  # navigation verbs come before features
+    ("show the debug panel", "navigation"),
+    ("go to debug_helper", "navigation"),  # a symbol, not the debug feature
+    ("open voice input", "voice_control"),
+    ("write a for loop", "code"),
+])
+def test_classify_command(command, kind):
+    assert routes_voice.classify_command(command) == kind
+
+
+def test_voice_search_passes_the_query():
+    kind, action_data, _, _ = asyncio.run(routes_voice.process_command_type("open voice search for bubble sort", "python", "code"))
+    assert kind == "feature"
+    assert action_data == {"action": "open_voice_search", "query": "bubble sort"}
+
+
+@pytest.fixture
+def symbols(tmp_path):
+    """A workspace with a few definitions, made current for voice navigation"""
+    (tmp_path / "shapes.py").write_text(
+        "def divide(a, b):\n    return a / b\n\n"
+        "def background_task():\n    pass\n\n"
+        "def bubble_sort(items):\n    return sorted(items)\n\n"
+        "def do_something_with_lots_of_letters():\n    pass\n"
+    )
+    index = SymbolIndex(tmp_path)
+    index.update("shapes.py", FileEntry(0, 0, "sha"))
+    index.wait_idle()
+    token = routes_code.current_workspace.set(SimpleNamespace(symbols=index))
+    yield index
+    routes_code.current_workspace.reset(token)
+    index.stop()
+
+
+def navigate(command):
+    return asyncio.run(routes_voice.handle_navigation_command(command))[1]
+
+
+@pytest.mark.parametrize("command, name", [
+    ("go to divide", "divide"),  # not the IDE
+    ("go to background_task", "background_task"),  # not "back"
+    ("go to bubble sort", "bubble_sort"),
+    ("go to the function bubble", "bubble_sort"),  # prefix
+])
+def test_navigation_jumps_to_symbols(symbols, command, name):
+    action_data = navigate(command)
+    assert action_data["action"] == "go_to_symbol"
+    assert action_data["name"] == name
+
+
+@pytest.mark.parametrize("command, target", [
+    ("go to the function bubble sort", "bubble sort"),
+    ("go to the definition of divide", "divide"),
+    ("go to breathe slowly", "breathe slowly"),  # "the" inside a word stays
+    ("go to theme_class", "theme_class"),
+    ("open method_table", "method_table"),
+    ("shower thoughts", ""),  # no navigation verb
+    ("switch to the editor", "editor"),
+])
+def test_navigation_target(command, target):
+    assert routes_voice.navigation_target(command) == target
+
+
+@pytest.mark.parametrize("command, action", [
+    ("go to ide", "go_to_ide"),
+    ("go back", "go_back"),
+    ("open menu", "toggle_menu"),
+    ("go to dolt", "unknown"),  # only a distant fuzzy match
+])
+def test_navigation_ui_targets(symbols, command, action):
+    assert navigate(command)["action"] == action
+
+
+def test_intent_metric_times_routing_only(monkeypatch):
+    async def slow_handler(command_lower):
+        await asyncio.sleep(0.05)
+        return "navigation", {"action": "go_to_home"}, "", ""
+
+    monkeypatch.setattr(routes_voice, "handle_navigation_command", slow_handler)
+    series = routes_voice.metrics.VOICE_INTENT_SECONDS.labels("navigation")
+    count, total = sum(series.counts), series.sum
+    asyncio.run(routes_voice.process_command_type("go to home", "python", "code"))
+    assert sum(series.counts) == count + 1
+    assert series.sum - total < 0.01
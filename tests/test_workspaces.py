@@ -0,0 +1,57 @@
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app.api import routes_code
+from app.services import file_store
+from app.services.workspaces import Workspace, WorkspaceRegistry
+
+
+def make_registry(tmp_path, max_loaded):
+    return WorkspaceRegistry(tmp_path / "default", tmp_path / "users", tmp_path / "state", tmp_path / "snapshots",
+                             max_loaded=max_loaded)
+
+
+def test_eviction_skips_pinned_workspaces(tmp_path, monkeypatch):
+    closed = []
+    monkeypatch.setattr(Workspace, "close", lambda self: closed.append(self.user_id))
+    registry = make_registry(tmp_path, max_loaded=1)
+
+    alice = registry.acquire("alice")
+    bob = registry.acquire("bob")  # over the limit, but alice is still in use
+    assert closed == []
+    registry.release(alice)  # unpinned and least recently used: now evicted
+    assert closed == ["alice"]
+    assert registry.acquire("bob") is bob  # still loaded
+    registry.release(bob)
+    registry.release(bob)
+    assert closed == ["alice"]
+
+
+def test_concurrent_writes_stay_within_the_quota(tmp_path, monkeypatch):
+    ws = Workspace(tmp_path / "ws", tmp_path / "state", tmp_path / "snapshots", quota_bytes=150, quota_files=10)
+    write = file_store.atomic_write
+
+    def slow_write(path, data):
+        time.sleep(0.1)  # both requests are past the quota check before either has written
+        write(path, data)
+
+    monkeypatch.setattr(file_store, "atomic_write", slow_write)
+    statuses = []
+
+    def create(name):
+        try:
+            routes_code.create_file(routes_code.FileCreate(filename=name, content="x" * 100), ws)
+            statuses.append(201)
+        except HTTPException as e:
+            statuses.append(e.status_code)
+
+    threads = [threading.Thread(target=create, args=(f"f{i}.txt",)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ws.close()
+    assert sorted(statuses) == [201, 413]
+    assert ws.index.total_bytes == 100